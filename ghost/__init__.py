@@ -23,11 +23,21 @@ For more information, visit: https://github.com/ghosttest/ghost
 __version__ = "0.2.2.4"
 __author__ = "Ghost Team"
 
-from .cli import main
-from .config import GhostConfig, get_config
-from .console import Console, GhostSpinner
-from .job_queue import JobQueue
-from .providers import get_provider, list_available_providers
+import importlib
+
+# Public names and the submodule that defines each. They are imported on
+# first access (PEP 562) so `ghost --help` / `ghost version` don't pay for
+# config, providers and the job queue at startup.
+_LAZY_EXPORTS = {
+    "main": "ghost.cli",
+    "GhostConfig": "ghost.config",
+    "get_config": "ghost.config",
+    "get_provider": "ghost.providers",
+    "list_available_providers": "ghost.providers",
+    "Console": "ghost.console",
+    "GhostSpinner": "ghost.console",
+    "JobQueue": "ghost.job_queue",
+}
 
 __all__ = [
     "main",
@@ -40,3 +50,16 @@ __all__ = [
     "JobQueue",
     "__version__",
 ]
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
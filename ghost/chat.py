@@ -1,15 +1,387 @@
-import json
+import ast
+import functools
+import hashlib
 import logging
+import os
 import re
-import tomllib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
 
+from ghost import jsonio, tomlio
 from ghost.config import GhostConfig, get_api_key, get_config
-from ghost.providers import BaseProvider, get_provider
-from ghost.rate_limiter import RateLimiter
+from ghost.llm_cache import ResponseCache
+from ghost.providers import BaseProvider, get_provider, run_cancellable
+from ghost.rate_limiter import RateLimiter, estimate_tokens
 from ghost.runner import get_project_tree
 
+# Markdown code fence and the language tags stripped after it (longest first)
+_FENCE = "```"
+_FENCE_TAGS = ("python", "py")
+# A fence that starts a line; backticks anywhere else are part of the code
+_LINE_FENCE_RE = re.compile(r"^[ \t]*```", re.MULTILINE)
+# First line of an unfenced test file: the mandatory header comment or an import
+_CODE_START_RE = re.compile(r"^(?:#|import |from )", re.MULTILINE)
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# PROMPT TEMPLATES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_CODEGEN_SYSTEM_PROMPT = (
+    "You are a code generator. Output only valid Python code. No markdown, no explanations."
+)
+
+_JUDGE_SYSTEM_PROMPT = (
+    "You are a code defect analyzer. Output only one of these two strings: "
+    "'BUG_IN_CODE' or 'FIX_TEST'. No other text."
+)
+
+# Every template keeps its static rules first and all per-request values
+# (paths, timestamps, source, errors) at the end. Providers that cache
+# prompt prefixes can then reuse the long rules block between requests.
+
+_GENERATE_RULES = """
+ROLE:
+You are a deterministic, automated QA agent specialized in Python test generation.
+PRIMARY OBJECTIVE:
+Generate a COMPLETE, EXECUTABLE Python test file using the specified testing framework: {framework}.
+CONTEXT:
+    - You are working in a specific project structure.
+    - You must verify imports based on the PROJECT STRUCTURE provided in the TARGET section.
+The output must be immediately runnable without modification.
+1. You MUST include this code block at the very top of the test file, before any other imports:
+
+    import sys
+    import os
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+    2. After that block, import the module normally (e.g., 'from app import main').
+    3. Do NOT use relative imports (like 'from ..app import').
+ABSOLUTE OUTPUT CONSTRAINTS (NON-NEGOTIABLE):
+1. Output ONLY valid Python source code.
+2. Do NOT include Markdown, backticks, explanations, annotations, or conversational text.
+3. The output MUST be directly saveable as a .py file.
+4. The output MUST contain an explicit import of the testing framework:
+   import {framework}
+5. Do NOT emit placeholder code, TODOs, or pseudocode.
+6. Do NOT modify, rewrite, or inline the source code under test.
+7. Do NOT reference files, modules, or symbols not present in GLOBAL CONTEXT.
+8. Tests MUST be deterministic, repeatable, and isolated.
+
+FILE HEADER (MANDATORY):
+The very first lines of the file MUST be a Python comment in EXACTLY this format,
+using the Timestamp and Source path given in the TARGET section:
+# Generated at: <Timestamp> | Source: <Source path>
+
+TEST CONSTRUCTION RULES:
+- Use the idiomatic style required by {framework}.
+- If {framework} supports fixtures, setup/teardown, or parameterization, use them where appropriate.
+- If {framework} requires class-based tests, use them correctly.
+- Follow naming conventions required for automatic test discovery by {framework}.
+- Assert behavior explicitly; never rely on implicit truthiness.
+- Validate return values, side effects, and raised exceptions.
+- Cover:
+  • Standard / expected behavior
+  • Edge cases
+  • Error or failure paths (invalid input, exceptions)
+- Write separate tests for each public function or class.
+
+MOCKING & ISOLATION REQUIREMENTS:
+- Mock ALL external dependencies, including but not limited to:
+  • File system access
+  • Network or HTTP calls
+  • Environment variables
+  • Time, randomness, UUIDs
+  • Subprocesses or OS interactions
+- Use the most appropriate mocking mechanism compatible with {framework}
+  (e.g., monkeypatch, unittest.mock, fixtures, stubs).
+
+IMPORT RULES:
+- Import ONLY from:
+  • Python standard library
+  • {framework}
+  • Modules listed in GLOBAL CONTEXT
+- Avoid wildcard imports.
+
+FINAL ENFORCEMENT:
+Return ONLY raw Python code.
+Any additional text, formatting, or explanation makes the response invalid.
+"""
+
+# Project-wide sections first and per-request values (timestamp, source) last, so
+# consecutive requests share the longest possible prefix for provider prompt caching
+_GENERATE_PROMPT = _GENERATE_RULES + """
+PROJECT STRUCTURE:
+{project_structure}
+
+GLOBAL CONTEXT (AVAILABLE MODULES / FILES):
+{global_context}
+
+TARGET:
+- Test file: {source_path}/tests/test_{filename}
+- Source file: {filename}
+- Source path: {source_path}
+- Timestamp: {now}
+
+SOURCE CODE UNDER TEST:
+{source_code}
+"""
+
+_WORD_RE = re.compile(r"\w+")
+
+# Part of the generated-tests cache key, so editing the prompts retires old entries
+_PROMPT_VERSION = hashlib.sha256(
+    (_CODEGEN_SYSTEM_PROMPT + _GENERATE_PROMPT).encode("utf-8")
+).hexdigest()[:12]
+
+# Several small files in one request; each output file starts with a sentinel line
+_BATCH_SENTINEL = "### FILE: {name} ###"
+_BATCH_SENTINEL_RE = re.compile(r"^[ \t]*### FILE: (\S+) ###[ \t]*$", re.MULTILINE)
+# A fence opened for the next section, left at the end of the previous one
+_DANGLING_OPENER_RE = re.compile(r"\n```(?:python|py)?[ \t]*$")
+
+_BATCH_GENERATE_PROMPT = _GENERATE_RULES + """
+BATCH OUTPUT FORMAT:
+This request covers {count} source files. Generate one complete test file per TARGET.
+Begin each test file with a line containing ONLY its Sentinel, exactly as given,
+then that file's Python code. The Sentinel lines are the only non-code lines allowed.
+Emit the files in the order the targets are listed.
+
+PROJECT STRUCTURE:
+{project_structure}
+
+GLOBAL CONTEXT (AVAILABLE MODULES / FILES):
+{global_context}
+{targets}"""
+
+_BATCH_TARGET = """
+TARGET {index}:
+- Sentinel: {sentinel}
+- Test file: {source_path}/tests/test_{filename}
+- Source file: {filename}
+- Source path: {source_path}
+- Timestamp: {now}
+
+SOURCE CODE UNDER TEST:
+{source_code}
+"""
+
+_HEAL_PROMPT = """
+You are an expert Python test engineer. Your task is to fix errors in a previously generated test file.
+1. You MUST include this code block at the very top of the test file, before any other imports:
+
+    import sys
+    import os
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+2. After that block, import the module normally (e.g., 'from app import main').
+3. Do NOT use relative imports (like 'from ..app import').
+CRITICAL: Output ONLY valid Python code. No markdown, no backticks, no explanations.
+
+## Requirements
+
+### Code Quality
+- Fix ALL syntax errors, import errors, and runtime issues
+- Ensure all imports are valid based on project structure
+- Use correct {framework} syntax and conventions
+- Follow {framework}'s test discovery naming patterns
+
+### Import Rules
+- Import {framework} explicitly at the top
+- Only import from: standard library, {framework}, or modules in project structure
+- Verify all imports against the project structure below
+- No wildcard imports
+
+### Test Structure
+- Keep all existing test logic unless it's the source of errors
+- Maintain test coverage for: normal cases, edge cases, error conditions
+- Use {framework}-idiomatic patterns (fixtures, parametrization, etc.)
+- Each test must be independent and deterministic
+
+### Mocking
+- Mock external dependencies: filesystem, network, time, random, environment
+- Use {framework}-compatible mocking (monkeypatch, unittest.mock, etc.)
+
+OUTPUT: Return only the corrected Python code, ready to save as the test file below.
+
+## Context
+- Test file: {test_file_path}
+- Source file: {filename}
+- Framework: {framework}
+
+## Project Structure
+{project_structure}
+
+## Available Modules
+{global_context}
+
+## Previous Code (with errors)
+{existing_code}
+
+## Errors to Fix
+{errors}
+"""
+
+_JUDGE_PROMPT = """
+You are a code defect analyzer. A unit test failed with an assertion error.
+Determine the root cause: is the source code buggy, or is the test incorrect?
+
+## Analysis Task
+
+Compare the source code logic against the test expectations:
+
+**If source code has a defect** (wrong logic, incorrect calculation, bug in implementation):
+→ Output: BUG_IN_CODE
+
+**If source code is correct** but test has wrong expectations or flawed assertions:
+→ Output: FIX_TEST
+
+## Critical Rules
+1. Analyze the actual logic and expected behavior carefully
+2. Consider edge cases and business logic intent
+3. Check if error stems from code implementation vs test assumptions
+4. Output EXACTLY one of these strings: "BUG_IN_CODE" or "FIX_TEST"
+5. NO explanations, NO additional text, NO punctuation
+
+OUTPUT: OUTPUT ONLY ONE OF THESE TWO STRINGS. NO EXPLANATION.
+
+## Context
+- Test file: {test_file_path}
+- Source file: {filename}
+
+## Project Structure
+{project_structure}
+
+## Available Modules
+{global_context}
+
+## Source Code Being Tested
+{source_code}
+
+## Failed Test Code
+{test_code}
+
+## Error Output
+{errors}
+"""
+
+
+@functools.lru_cache(maxsize=32)
+def _parse_toml(path: str, mtime_ns: int, size: int) -> dict:
+    with open(path, "rb") as f:
+        return tomlio.load(f)
+
+
+@functools.lru_cache(maxsize=32)
+def _parse_context(path: str, mtime_ns: int, size: int) -> dict:
+    with open(path, "rb") as f:
+        return jsonio.loads(f.read())
+
+
+@functools.lru_cache(maxsize=32)
+def _render_context(path: str, mtime_ns: int, size: int) -> str:
+    return jsonio.dumps_indented(_parse_context(path, mtime_ns, size))
+
+
+def _load_toml(path: str) -> dict:
+    """Parse ghost.toml, reusing the result until the file changes on disk."""
+    st = os.stat(path)
+    return _parse_toml(path, st.st_mtime_ns, st.st_size)
+
+
+def _load_context(path: str) -> dict:
+    """Parse .ghost/context.json, reusing the result until the file changes on disk."""
+    st = os.stat(path)
+    return _parse_context(path, st.st_mtime_ns, st.st_size)
+
+
+def _load_context_text(path: str) -> str:
+    """Return .ghost/context.json pretty-printed for prompts, serialized once per version."""
+    st = os.stat(path)
+    return _render_context(path, st.st_mtime_ns, st.st_size)
+
+
+def _strip_leading_prose(code: str) -> str:
+    """
+    Drop a chatty preamble ("Here are the tests:") from an unfenced response.
+
+    Only applied when the preamble is what keeps the response from parsing, so
+    an unusual first line of real code is never thrown away.
+    """
+    first_code = _CODE_START_RE.search(code)
+    if first_code is None or first_code.start() == 0:
+        return code
+    try:
+        ast.parse(code)
+        return code
+    except SyntaxError:
+        pass
+    stripped = code[first_code.start() :]
+    try:
+        ast.parse(stripped)
+    except SyntaxError:
+        return code
+    return stripped
+
+
+def _prune_tree(tree: str, max_level: int) -> str:
+    """Drop the entries of a get_project_tree() listing nested deeper than *max_level*."""
+    limit = 4 * (max_level + 1)
+    return "\n".join(line for line in tree.split("\n") if len(line) - len(line.lstrip(" ")) < limit)
+
+
+def _tree_depth(tree: str) -> int:
+    return max((len(line) - len(line.lstrip(" "))) // 4 for line in tree.split("\n"))
+
+
+def _relevant_context(context: dict, code: str) -> str:
+    """Render only the context.json entries for modules whose names appear in *code*."""
+    words = set(_WORD_RE.findall(code))
+    relevant = {
+        path: summary
+        for path, summary in context.items()
+        if os.path.splitext(os.path.basename(path))[0] in words
+    }
+    return jsonio.dumps_indented(relevant)
+
+
+def _opens_with_fence(raw_text: str, fence_start: int) -> bool:
+    """
+    Whether the fence at *fence_start* opens the reply, with at most prose before it.
+
+    Code ahead of the fence means the reply is unfenced and the "fence" is
+    inside a string literal; so does a reply that parses as Python as a whole.
+    """
+    before = raw_text[:fence_start]
+    if not before.strip():
+        return True
+    if _CODE_START_RE.search(before):
+        return False
+    try:
+        ast.parse(raw_text)
+    except SyntaxError:
+        return True
+    return False
+
+
+@functools.lru_cache(maxsize=8)
+def _shared_provider(
+    provider_name: str, api_key: Optional[str], base_url: Optional[str]
+) -> BaseProvider:
+    """
+    Provider instance for these settings, shared by every TestGenerator.
+
+    Reusing one provider keeps its HTTP client, and the pooled connections,
+    alive across generations instead of rebuilding them per file event.
+    """
+    kwargs = {}
+    if api_key:
+        kwargs["api_key"] = api_key
+    if base_url:
+        kwargs["base_url"] = base_url
+    return get_provider(provider_name, **kwargs)
+
 
 class TestGenerator:
     """AI-powered test generator supporting multiple providers.
@@ -33,6 +405,7 @@ class TestGenerator:
 
         # Set rate limit based on config
         RateLimiter.set_interval(60.0 / max(self.config.ai.rate_limit_rpm, 1))
+        RateLimiter.set_token_budget(self.config.ai.rate_limit_tpm)
 
     @property
     def provider(self) -> BaseProvider:
@@ -41,22 +414,51 @@ class TestGenerator:
             provider_name = self.config.ai.provider.lower()
             api_key = self._api_key or self.config.ai.api_key or get_api_key(provider_name)
 
-            kwargs = {}
-            if api_key:
-                kwargs["api_key"] = api_key
-            if self.config.ai.base_url:
-                kwargs["base_url"] = self.config.ai.base_url
-
-            self._provider = get_provider(provider_name, **kwargs)
+            self._provider = _shared_provider(provider_name, api_key, self.config.ai.base_url)
 
         return self._provider
 
-    def _call_api(self, messages: list, temperature: float = 0.1) -> str:
+    def _call_api(
+        self,
+        messages: list,
+        temperature: float = 0.0,
+        source_path: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        stop_at_fence: bool = True,
+    ) -> str:
         """
         Call the AI API with automatic provider detection.
+
+        When *source_path* is given and caching is enabled, identical
+        low-temperature requests are answered from the project's response cache.
+        *max_tokens* caps the response length when set. Streamed responses end
+        after their first code block unless *stop_at_fence* is False.
         """
         model = self.config.ai.model
-        return self.provider.chat(messages, model=model, temperature=temperature)
+        cache = None
+        if source_path and self.config.ai.cache and ResponseCache.is_cacheable(temperature):
+            cache = ResponseCache.for_project(source_path, ttl=self.config.ai.cache_ttl_seconds)
+            key = ResponseCache.make_key(
+                model,
+                messages,
+                temperature,
+                provider=self.config.ai.provider,
+                max_tokens=max_tokens,
+            )
+            cached = cache.get(key)
+            if cached is not None:
+                logging.debug("LLM cache hit: %s", key)
+                return cached
+
+        # Only passed when set, so providers without the arguments keep working
+        options = {} if max_tokens is None else {"max_tokens": max_tokens}
+        if not stop_at_fence:
+            options["stop_at_fence"] = False
+        response = self.provider.chat(messages, model=model, temperature=temperature, **options)
+
+        if cache is not None and response:
+            cache.set(key, response)
+        return response
 
     def get_test_code(
         self,
@@ -66,266 +468,421 @@ class TestGenerator:
         testing=False,
         test_file_path="",
         errors=None,
+        existing_code=None,
     ):
+        source_cache = None
         if testing:
             prompt = self.create_prompt_test(
-                source_code, source_path, filename, test_file_path, errors
+                source_code, source_path, filename, test_file_path, errors, existing_code
             )
         else:
+            source_cache, source_key, cached = self._lookup_source_cache(
+                source_code, source_path, filename
+            )
+            if cached is not None:
+                return self.clean_llm_response(cached)
             prompt = self.create_prompt(source_code, source_path, filename)
         logging.debug("Prompt generated!")
 
         response = self._call_api(
             messages=[
-                {
-                    "role": "system",
-                    "content": "You are a code generator. Output only valid Python code. No markdown, no explanations.",
-                },
+                {"role": "system", "content": _CODEGEN_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt},
             ],
-            temperature=0.1,
+            temperature=self.config.ai.temperature,
+            source_path=source_path,
         )
 
+        if source_cache is not None and response:
+            source_cache.set(source_key, response)
+
         cleaned_code = self.clean_llm_response(response)
         return cleaned_code
 
+    def _lookup_source_cache(self, source_code, source_path, filename):
+        """
+        Look up generated tests by source fingerprint.
+
+        Returns (cache, key, cached_response); cache is None when caching
+        doesn't apply, and cached_response is None on a miss.
+        """
+        if not (
+            self.config.ai.cache
+            and source_code
+            and ResponseCache.is_cacheable(self.config.ai.temperature)
+        ):
+            return None, None, None
+        cache = ResponseCache.for_project(source_path, ttl=self.config.ai.cache_ttl_seconds)
+        key = ResponseCache.make_source_key(
+            self.config.ai.model,
+            self.config.tests.framework,
+            filename,
+            source_code,
+            prompt_version=_PROMPT_VERSION,
+            provider=self.config.ai.provider,
+        )
+        cached = cache.get(key)
+        if cached is not None:
+            logging.debug("Source fingerprint cache hit for %s", filename)
+        return cache, key, cached
+
+    def get_test_codes_batched(
+        self,
+        items: List[Dict[str, Any]],
+        max_ctx: int = 60_000,
+        max_files: int = 8,
+        max_concurrency: int = 4,
+    ) -> List[str]:
+        """
+        Generate tests for several files, packing small files into shared requests.
+
+        Files are packed greedily (in order, per source path) until the estimated
+        prompt size would exceed *max_ctx* tokens or a request holds *max_files*
+        files; two files with the same name never share a request. Files that
+        don't share a request, or whose section is missing from the batched
+        response, fall back to :meth:`get_test_code`. Requests run concurrently.
+
+        Args:
+            items: Dicts with ``source_code``, ``filename`` and optional ``source_path``.
+            max_ctx: Token budget for a single batched prompt.
+            max_files: Maximum number of files per batched prompt.
+            max_concurrency: Maximum number of requests in flight at once.
+
+        Returns:
+            The generated test code, in the same order as *items*.
+        """
+        results: List[Optional[str]] = [None] * len(items)
+
+        # Group cache misses by project so a batch shares one tree/context header
+        pending: Dict[str, List[int]] = {}
+        for index, item in enumerate(items):
+            source_path = item.get("source_path", ".")
+            _, _, cached = self._lookup_source_cache(
+                item["source_code"], source_path, item.get("filename", "")
+            )
+            if cached is not None:
+                results[index] = self.clean_llm_response(cached)
+            else:
+                pending.setdefault(source_path, []).append(index)
+
+        batches: List[Tuple[str, List[int]]] = []
+        for source_path, indices in pending.items():
+            header_tokens = estimate_tokens(
+                [{"content": self._create_batch_prompt(source_path, [])}]
+            )
+            batch: List[int] = []
+            batch_tokens = header_tokens
+            for index in indices:
+                cost = estimate_tokens([{"content": items[index]["source_code"]}])
+                # Sections are keyed by file name, so a repeated name starts a new batch
+                name = items[index].get("filename", "")
+                if batch and (
+                    batch_tokens + cost > max_ctx
+                    or len(batch) >= max_files
+                    or any(items[i].get("filename", "") == name for i in batch)
+                ):
+                    batches.append((source_path, batch))
+                    batch, batch_tokens = [], header_tokens
+                batch.append(index)
+                batch_tokens += cost
+            if batch:
+                batches.append((source_path, batch))
+
+        if batches:
+            with ThreadPoolExecutor(max_workers=max(min(max_concurrency, len(batches)), 1)) as pool:
+                for future in [
+                    pool.submit(self._run_batch, items, batch, source_path, results)
+                    for source_path, batch in batches
+                ]:
+                    future.result()
+
+        return results
+
+    def _run_batch(self, items, batch, source_path, results):
+        """Generate tests for the files in *batch*, filling *results* in place."""
+        if len(batch) == 1:
+            index = batch[0]
+            results[index] = self.get_test_code(
+                items[index]["source_code"], source_path, items[index].get("filename", "")
+            )
+            return
+
+        batch_items = [items[i] for i in batch]
+        prompt = self._create_batch_prompt(source_path, batch_items)
+        response = self._call_api(
+            messages=[
+                {"role": "system", "content": _CODEGEN_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=self.config.ai.temperature,
+            source_path=source_path,
+            stop_at_fence=False,  # Each file's section has its own code block
+        )
+        sections = self.split_batch_response(response or "")
+
+        for index, item in zip(batch, batch_items):
+            filename = item.get("filename", "")
+            section = sections.get(f"test_{filename}")
+            if section is None:
+                logging.debug("Batched response missing %s, retrying alone", filename)
+                results[index] = self.get_test_code(item["source_code"], source_path, filename)
+                continue
+            cache, key, _ = self._lookup_source_cache(item["source_code"], source_path, filename)
+            if cache is not None:
+                cache.set(key, section)
+            results[index] = self.clean_llm_response(section)
+
+    def _create_batch_prompt(self, source_path, batch_items):
+        conf = _load_toml(f"{source_path}/ghost.toml")
+        framework = conf.get("tests", {}).get("framework", "pytest")
+        global_context = _load_context_text(f"{source_path}/.ghost/context.json")
+        now = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+        targets = "".join(
+            _BATCH_TARGET.format(
+                index=number,
+                sentinel=_BATCH_SENTINEL.format(name=f"test_{item.get('filename', '')}"),
+                source_path=source_path,
+                filename=item.get("filename", ""),
+                now=now,
+                source_code=item["source_code"],
+            )
+            for number, item in enumerate(batch_items, start=1)
+        )
+        return _BATCH_GENERATE_PROMPT.format(
+            framework=framework,
+            count=len(batch_items),
+            project_structure=get_project_tree(source_path),
+            global_context=global_context,
+            targets=targets,
+        )
+
+    @staticmethod
+    def split_batch_response(raw_text: str) -> Dict[str, str]:
+        """Split a batched response into ``{test file name: section text}``."""
+        matches = list(_BATCH_SENTINEL_RE.finditer(raw_text))
+        sections = {}
+        for match, following in zip(matches, matches[1:] + [None]):
+            end = following.start() if following is not None else len(raw_text)
+            section = _DANGLING_OPENER_RE.sub("", raw_text[match.end() : end].strip())
+            # A fence wrapped around the whole response leaves a dangling closer
+            if section.endswith(_FENCE) and section.count(_FENCE) % 2 == 1:
+                section = section[: -len(_FENCE)].rstrip()
+            if section:
+                sections[match.group(1)] = section
+        return sections
+
+    async def get_test_code_async(self, *args, **kwargs) -> str:
+        """
+        Async variant of :meth:`get_test_code`, run on a worker thread.
+
+        Prompt construction (ghost.toml, context.json and test file reads) and
+        the provider call all happen on that thread, so disk and network waits
+        never block the event loop and overlap across concurrent requests.
+        """
+        import asyncio  # only the async APIs need it; keeps CLI startup lean
+
+        return await asyncio.to_thread(self.get_test_code, *args, **kwargs)
+
+    async def get_test_codes(
+        self, items: List[Dict[str, Any]], max_concurrency: int = 4
+    ) -> List[str]:
+        """
+        Generate tests for several files concurrently.
+
+        Args:
+            items: Keyword arguments for :meth:`get_test_code`, one dict per file.
+            max_concurrency: Maximum number of requests in flight at once.
+
+        Returns:
+            The generated test code, in the same order as *items*.
+        """
+        import asyncio
+
+        semaphore = asyncio.Semaphore(max(max_concurrency, 1))
+
+        async def _run(item: Dict[str, Any]) -> str:
+            async with semaphore:
+                return await self.get_test_code_async(**item)
+
+        return await asyncio.gather(*(_run(item) for item in items))
+
+    def _format_prompt(self, template, source_path, code, /, **fields):
+        """
+        Fill *template* with the project tree, context.json and *fields*.
+
+        Prompts estimated above ``ai.max_prompt_tokens`` lose the deepest levels
+        of the tree first, then the context entries for modules *code* never
+        names. The source and test code are never trimmed.
+        """
+        context_source = f"{source_path}/.ghost/context.json"
+        project_structure = get_project_tree(source_path)
+        global_context = _load_context_text(context_source)
+        prompt = template.format(
+            project_structure=project_structure, global_context=global_context, **fields
+        )
+        budget = self.config.ai.max_prompt_tokens
+        if not budget or estimate_tokens([{"content": prompt}]) <= budget:
+            return prompt
+
+        tree = project_structure
+        # Level 0 is the root folder; keep it and its direct entries
+        for level in range(_tree_depth(tree) - 1, 0, -1):
+            project_structure = _prune_tree(tree, level)
+            prompt = template.format(
+                project_structure=project_structure, global_context=global_context, **fields
+            )
+            if estimate_tokens([{"content": prompt}]) <= budget:
+                return prompt
+
+        global_context = _relevant_context(_load_context(context_source), code)
+        prompt = template.format(
+            project_structure=project_structure, global_context=global_context, **fields
+        )
+        if estimate_tokens([{"content": prompt}]) > budget:
+            logging.debug("Prompt still exceeds %d tokens after trimming context", budget)
+        return prompt
+
     def create_prompt(self, source_code, source_path, filename):
         try:
             logging.debug("Creating prompt...")
             ghost_path = f"{source_path}/ghost.toml"
-            conf = tomllib.load(open(ghost_path, "rb"))
+            conf = _load_toml(ghost_path)
             framework = conf.get("tests", {}).get("framework", "pytest")
-            context_source = f"{source_path}/.ghost/context.json"
-            with open(context_source, "r") as f:
-                global_context = json.load(f)
             now = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
-            project_structure = get_project_tree(source_path)
-            return f"""
-            ROLE:
-            You are a deterministic, automated QA agent specialized in Python test generation.
-            This code you generate will reside in the {source_path}/tests/test_{filename}.
-            THis is from the source file {filename}.
-            PRIMARY OBJECTIVE:
-            Generate a COMPLETE, EXECUTABLE Python test file using the specified testing framework: {framework}.
-            CONTEXT:
-                - You are working in a specific project structure.
-                - You must verify imports based on the PROJECT MAP provided.
-                
-                {project_structure}
-            The output must be immediately runnable without modification.
-            1. You MUST include this code block at the very top of the test file, before any other imports:
-
-                import sys
-                import os
-                sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-                
-                2. After that block, import the module normally (e.g., 'from app import main').
-                3. Do NOT use relative imports (like 'from ..app import').
-            ABSOLUTE OUTPUT CONSTRAINTS (NON-NEGOTIABLE):
-            1. Output ONLY valid Python source code.
-            2. Do NOT include Markdown, backticks, explanations, annotations, or conversational text.
-            3. The output MUST be directly saveable as a .py file.
-            4. The output MUST contain an explicit import of the testing framework:
-               import {framework}
-            5. Do NOT emit placeholder code, TODOs, or pseudocode.
-            6. Do NOT modify, rewrite, or inline the source code under test.
-            7. Do NOT reference files, modules, or symbols not present in GLOBAL CONTEXT.
-            8. Tests MUST be deterministic, repeatable, and isolated.
-    
-            FILE HEADER (MANDATORY):
-            The very first lines of the file MUST be a Python comment in EXACTLY this format:
-            # Generated at: {now} | Source: {source_path}
-    
-            TEST CONSTRUCTION RULES:
-            - Use the idiomatic style required by {framework}.
-            - If {framework} supports fixtures, setup/teardown, or parameterization, use them where appropriate.
-            - If {framework} requires class-based tests, use them correctly.
-            - Follow naming conventions required for automatic test discovery by {framework}.
-            - Assert behavior explicitly; never rely on implicit truthiness.
-            - Validate return values, side effects, and raised exceptions.
-            - Cover:
-              • Standard / expected behavior
-              • Edge cases
-              • Error or failure paths (invalid input, exceptions)
-            - Write separate tests for each public function or class.
-    
-            MOCKING & ISOLATION REQUIREMENTS:
-            - Mock ALL external dependencies, including but not limited to:
-              • File system access
-              • Network or HTTP calls
-              • Environment variables
-              • Time, randomness, UUIDs
-              • Subprocesses or OS interactions
-            - Use the most appropriate mocking mechanism compatible with {framework}
-              (e.g., monkeypatch, unittest.mock, fixtures, stubs).
-    
-            IMPORT RULES:
-            - Import ONLY from:
-              • Python standard library
-              • {framework}
-              • Modules listed in GLOBAL CONTEXT
-            - Avoid wildcard imports.
-    
-            GLOBAL CONTEXT (AVAILABLE MODULES / FILES):
-            {json.dumps(global_context, indent=2)}
-    
-            SOURCE CODE UNDER TEST:
-            {source_code}
-    
-            FINAL ENFORCEMENT:
-            Return ONLY raw Python code.
-            Any additional text, formatting, or explanation makes the response invalid.
-            """
+            return self._format_prompt(
+                _GENERATE_PROMPT,
+                source_path,
+                source_code,
+                source_path=source_path,
+                filename=filename,
+                framework=framework,
+                now=now,
+                source_code=source_code,
+            )
         except Exception as e:
             logging.error("Error creating prompt: %s", e)
             raise
 
-    def create_prompt_test(self, source_code, source_path, filename, test_file_path, errors):
+    def create_prompt_test(
+        self, source_code, source_path, filename, test_file_path, errors, existing_code=None
+    ):
         ghost_path = f"{source_path}/ghost.toml"
-        conf = tomllib.load(open(ghost_path, "rb"))
+        conf = _load_toml(ghost_path)
         framework = conf.get("tests", {}).get("framework", "pytest")
-        context_source = f"{source_path}/.ghost/context.json"
-        with open(context_source, "r") as f:
-            global_context = json.load(f)
-        with open(test_file_path, "r") as f:
-            existing_code = f.read()
-        project_structure = get_project_tree(source_path)
-        return f"""
-                    You are an expert Python test engineer. Your task is to fix errors in a previously generated test file.
-                    1. You MUST include this code block at the very top of the test file, before any other imports:
-
-                    import sys
-                    import os
-                    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-                    
-                    2. After that block, import the module normally (e.g., 'from app import main').
-                    3. Do NOT use relative imports (like 'from ..app import').
-                CRITICAL: Output ONLY valid Python code. No markdown, no backticks, no explanations.
-                
-                ## Context
-                - Test file: {test_file_path}
-                - Source file: {filename}
-                - Framework: {framework}
-                
-                ## Project Structure
-                {project_structure}
-                
-                ## Available Modules
-                {json.dumps(global_context, indent=2)}
-                
-                ## Previous Code (with errors)
-                {existing_code}
-                
-                ## Errors to Fix
-                {errors}
-                
-                ## Requirements
-                
-                ### Code Quality
-                - Fix ALL syntax errors, import errors, and runtime issues
-                - Ensure all imports are valid based on project structure
-                - Use correct {framework} syntax and conventions
-                - Follow {framework}'s test discovery naming patterns
-                
-                ### Import Rules
-                - Import {framework} explicitly at the top
-                - Only import from: standard library, {framework}, or modules in project structure
-                - Verify all imports against the project structure above
-                - No wildcard imports
-                
-                ### Test Structure
-                - Keep all existing test logic unless it's the source of errors
-                - Maintain test coverage for: normal cases, edge cases, error conditions
-                - Use {framework}-idiomatic patterns (fixtures, parametrization, etc.)
-                - Each test must be independent and deterministic
-                
-                ### Mocking
-                - Mock external dependencies: filesystem, network, time, random, environment
-                - Use {framework}-compatible mocking (monkeypatch, unittest.mock, etc.)
-                
-                OUTPUT: Return only the corrected Python code, ready to save as {test_file_path}
-                """
+        if existing_code is None:
+            with open(test_file_path, "r") as f:
+                existing_code = f.read()
+        return self._format_prompt(
+            _HEAL_PROMPT,
+            source_path,
+            source_code + "\n" + existing_code,
+            test_file_path=test_file_path,
+            filename=filename,
+            framework=framework,
+            existing_code=existing_code,
+            errors=errors,
+        )
 
     def clean_llm_response(self, raw_text):
         """
         Removes markdown backticks, conversational filler, and extracts just the Python code.
         """
-        # Pattern to find code inside ```python ... ``` blocks
-        pattern = r"```python(.*?)```"
-        match = re.search(pattern, raw_text, re.DOTALL)
+        # Locate the first fence at the start of a line; without one it's raw code already
+        fence = _LINE_FENCE_RE.search(raw_text)
+        if fence is None or not _opens_with_fence(raw_text, fence.start()):
+            return _strip_leading_prose(raw_text.strip())
 
-        if match:
-            # Return the content inside the backticks
-            return match.group(1).strip()
+        # Skip an optional language tag (```python / ```py)
+        body_start = fence.end()
+        for tag in _FENCE_TAGS:
+            if raw_text.startswith(tag, body_start):
+                body_start += len(tag)
+                break
 
-        # Fallback: If no backticks, it might be raw code already.
-        # Just strip whitespace and return.
-        return raw_text.strip()
+        end = _LINE_FENCE_RE.search(raw_text, body_start)
+        if end is None:
+            # Unterminated fence: keep everything, just strip whitespace
+            return raw_text.strip()
 
-    def consult_the_judge(self, source_code, source_path, filename, test_file_path, errors):
-        context_source = f"{source_path}/.ghost/context.json"
-        with open(context_source, "r") as f:
-            global_context = json.load(f)
-        project_structure = get_project_tree(source_path)
-        with open(test_file_path, "r") as f:
-            test_code = f.read()
-        prompt = f"""
-        You are a code defect analyzer. A unit test failed with an assertion error.
-        Determine the root cause: is the source code buggy, or is the test incorrect?
-        
-        ## Context
-        - Test file: {test_file_path}
-        - Source file: {filename}
-        
-        ## Project Structure
-        {project_structure}
-        
-        ## Available Modules
-        {json.dumps(global_context, indent=2)}
-        
-        ## Source Code Being Tested
-        {source_code}
-        
-        ## Failed Test Code
-        {test_code}
-        
-        ## Error Output
-        {errors}
-        
-        ## Analysis Task
-        
-        Compare the source code logic against the test expectations:
-        
-        **If source code has a defect** (wrong logic, incorrect calculation, bug in implementation):
-        → Output: BUG_IN_CODE
-        
-        **If source code is correct** but test has wrong expectations or flawed assertions:
-        → Output: FIX_TEST
-        
-        ## Critical Rules
-        1. Analyze the actual logic and expected behavior carefully
-        2. Consider edge cases and business logic intent
-        3. Check if error stems from code implementation vs test assumptions
-        4. Output EXACTLY one of these strings: "BUG_IN_CODE" or "FIX_TEST"
-        5. NO explanations, NO additional text, NO punctuation
-        
-        OUTPUT: OUTPUT ONLY ONE OF THESE TWO STRINGS. NO EXPLANATION.
-        """
+        # Return the content inside the backticks
+        return raw_text[body_start : end.start()].strip()
+
+    def consult_the_judge(
+        self, source_code, source_path, filename, test_file_path, errors, test_code=None
+    ):
+        if test_code is None:
+            with open(test_file_path, "r") as f:
+                test_code = f.read()
+        prompt = self._format_prompt(
+            _JUDGE_PROMPT,
+            source_path,
+            source_code + "\n" + test_code,
+            test_file_path=test_file_path,
+            filename=filename,
+            source_code=source_code,
+            test_code=test_code,
+            errors=errors,
+        )
+        messages = [
+            {"role": "system", "content": _JUDGE_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ]
+        max_tokens = self.config.ai.judge_max_tokens or None
         response = self._call_api(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a code defect analyzer. Output only one of these two strings: 'BUG_IN_CODE' or 'FIX_TEST'. No other text.",
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.1,
+            messages=messages,
+            temperature=0.0,  # Pure classification, no sampling needed
+            source_path=source_path,
+            # The verdict is a single word; don't pay for a longer answer
+            max_tokens=max_tokens,
         )
+        ans = response.strip().upper()
+        if max_tokens and "BUG_IN_CODE" not in ans and "FIX_TEST" not in ans:
+            # The cap cut the model off before its verdict (e.g. while reasoning)
+            logging.debug("Judge verdict truncated at %d tokens, asking again", max_tokens)
+            response = self._call_api(messages=messages, temperature=0.0, source_path=source_path)
+            ans = response.strip().upper()
 
         # Clean and validate response
-        ans = response.strip().upper()
         if "BUG_IN_CODE" in ans:
             return "BUG_IN_CODE"
         elif "FIX_TEST" in ans:
             return "FIX_TEST"
         return ans
+
+    def consult_the_judge_with_fix(
+        self, source_code, source_path, filename, test_file_path, errors, test_code
+    ) -> Tuple[str, Future]:
+        """
+        Ask the judge while a fixed test file is drafted in parallel.
+
+        The fix only depends on the failing run, not on the verdict, so it is
+        requested alongside the judge call instead of after it and the two
+        round-trips overlap. Returns (verdict, future of the fixed test code).
+        On BUG_IN_CODE the fix is cancelled, dropping its stream if it's still
+        being generated, and the future must not be waited on.
+        """
+        cancel = threading.Event()
+        pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ghost-fix")
+        try:
+            fix = pool.submit(
+                run_cancellable,
+                cancel,
+                self.get_test_code,
+                source_code,
+                source_path,
+                filename,
+                True,
+                test_file_path,
+                errors,
+                existing_code=test_code,
+            )
+            verdict = self.consult_the_judge(
+                source_code, source_path, filename, test_file_path, errors, test_code=test_code
+            )
+            if verdict == "BUG_IN_CODE":
+                fix.cancel()
+                cancel.set()
+        finally:
+            # Don't wait here: on BUG_IN_CODE nobody needs the fix
+            pool.shutdown(wait=False)
+        return verdict, fix
@@ -15,6 +15,7 @@ Usage:
 """
 
 import os
+import re
 import signal
 import subprocess
 import sys
@@ -34,49 +35,90 @@ __version__ = "0.2.2.4"
 GHOST_CONFIG_FILE = "ghost.toml"
 GHOST_DIR = ".ghost"
 
+# Providers offered by `ghost init`, with their blurb, default model and key variable
+_PROVIDERS_LIST = ("groq", "openai", "ollama", "anthropic", "openrouter", "lmstudio")
+_PROVIDER_DESC = {
+    "groq": "Fast & free tier available",
+    "openai": "GPT-4, GPT-4o models",
+    "ollama": "Local models (free, private)",
+    "anthropic": "Claude models",
+    "openrouter": "Multiple providers, one API",
+    "lmstudio": "Local LM Studio server",
+}
+_DEFAULT_MODELS = {
+    "groq": "llama-3.3-70b-versatile",
+    "openai": "gpt-4o-mini",
+    "ollama": "llama3.2",
+    "anthropic": "claude-3-5-sonnet-20241022",
+    "openrouter": "openrouter/auto",
+    "lmstudio": "local-model",
+}
+# Pre-rendered "name - description" rows for the init provider menu
+_PROVIDER_LINES = tuple(
+    (p, f"{Colors.CYAN}{p}{Colors.RESET} {Colors.DIM}- {_PROVIDER_DESC[p]}{Colors.RESET}")
+    for p in _PROVIDERS_LIST
+)
+_MARKER_ACTIVE = f"{Colors.GREEN}●{Colors.RESET}"
+_MARKER_INACTIVE = f"{Colors.DIM}○{Colors.RESET}"
+# (icon, label) shown by `ghost providers` for configured / unconfigured providers
+_STATUS_AVAILABLE = (
+    f"{Colors.BRIGHT_GREEN}{Icons.SUCCESS}{Colors.RESET}",
+    f"{Colors.GREEN}Available{Colors.RESET}",
+)
+_STATUS_UNAVAILABLE = (
+    f"{Colors.DIM}{Icons.CIRCLE}{Colors.RESET}",
+    f"{Colors.DIM}Not configured{Colors.RESET}",
+)
+_PROVIDER_ENV = {
+    "groq": "GROQ_API_KEY",
+    "openai": "OPENAI_API_KEY",
+    "anthropic": "ANTHROPIC_API_KEY",
+    "openrouter": "OPENROUTER_API_KEY",
+}
+
+# ghost.toml keys rewritten by `ghost config`
+_PROVIDER_RE = re.compile(r'provider\s*=\s*"[^"]*"')
+_MODEL_RE = re.compile(r'model\s*=\s*"[^"]*"')
+
+# [table] header lines in ghost.toml (array-of-tables headers excluded)
+_TOML_TABLE_RE = re.compile(r"^[ \t]*\[([^\[\]]+)\][ \t]*(?:#.*)?$", re.MULTILINE)
+
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # HELPER FUNCTIONS
 # ═══════════════════════════════════════════════════════════════════════════════
 
 
-def _save_api_key_to_env(env_file: Path, key_name: str, key_value: str):
-    """Save an API key to a .env file."""
-    # Read existing content
-    existing_lines = []
-    if env_file.exists():
-        with open(env_file, "r") as f:
-            existing_lines = f.readlines()
-
-    # Check if key already exists and update it
-    key_found = False
-    new_lines = []
-    for line in existing_lines:
-        if line.startswith(f"{key_name}="):
-            new_lines.append(f'{key_name}="{key_value}"\n')
-            key_found = True
-        else:
-            new_lines.append(line)
+def _resolve_path(path: str) -> Path:
+    """Make a command-line path absolute, skipping resolve() when it's already absolute."""
+    if path in (".", ""):
+        return Path.cwd()
+    candidate = Path(path)
+    return candidate if candidate.is_absolute() else candidate.resolve()
 
-    # Add new key if not found
-    if not key_found:
-        new_lines.append(f'{key_name}="{key_value}"\n')
 
-    # Write back
-    with open(env_file, "w") as f:
-        f.writelines(new_lines)
+def _save_api_key_to_env(env_file: Path, key_name: str, key_value: str):
+    """Save an API key to a .env file."""
+    entry = f'{key_name}="{key_value}"'
+    content = env_file.read_text() if env_file.exists() else ""
+
+    # Update the key in place if it's already there, otherwise append it
+    key_line = re.compile(rf"^{re.escape(key_name)}=.*$", re.MULTILINE)
+    content, replaced = key_line.subn(lambda _: entry, content)
+    if not replaced:
+        if content and not content.endswith("\n"):
+            content += "\n"
+        content += entry + "\n"
+    env_file.write_text(content)
 
     # Add .env to .gitignore if not already there
     gitignore = env_file.parent / ".gitignore"
-    if gitignore.exists():
-        with open(gitignore, "r") as f:
-            content = f.read()
-        if ".env" not in content:
-            with open(gitignore, "a") as f:
-                f.write("\n# Environment variables\n.env\n")
-    else:
-        with open(gitignore, "w") as f:
-            f.write("# Environment variables\n.env\n")
+    ignored = gitignore.read_text() if gitignore.exists() else ""
+    if ".env" not in ignored:
+        if ignored:
+            # Keep a blank line between existing rules and ours
+            ignored += "\n" if ignored.endswith("\n") else "\n\n"
+        gitignore.write_text(ignored + "# Environment variables\n.env\n")
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -158,7 +200,7 @@ def init(path: str, provider: str, model: Optional[str], framework: str):
     """
     Console.banner()
 
-    target_path = Path(path).resolve()
+    target_path = _resolve_path(path)
 
     if not target_path.exists():
         Console.error(f"Path does not exist: {target_path}")
@@ -193,39 +235,22 @@ def init(path: str, provider: str, model: Optional[str], framework: str):
     Console.newline()
     Console.section("Provider Setup")
 
-    providers_list = ["groq", "openai", "ollama", "anthropic", "openrouter", "lmstudio"]
-    Console.print(f"  {Colors.DIM}Available providers:{Colors.RESET}")
-    for i, p in enumerate(providers_list, 1):
-        marker = (
-            f"{Colors.GREEN}●{Colors.RESET}" if p == provider else f"{Colors.DIM}○{Colors.RESET}"
-        )
-        desc = {
-            "groq": "Fast & free tier available",
-            "openai": "GPT-4, GPT-4o models",
-            "ollama": "Local models (free, private)",
-            "anthropic": "Claude models",
-            "openrouter": "Multiple providers, one API",
-            "lmstudio": "Local LM Studio server",
-        }.get(p, "")
-        Console.print(
-            f"    {marker} {i}. {Colors.CYAN}{p}{Colors.RESET} {Colors.DIM}- {desc}{Colors.RESET}"
-        )
+    with Console.buffered():
+        Console.print(f"  {Colors.DIM}Available providers:{Colors.RESET}")
+        for i, (p, line) in enumerate(_PROVIDER_LINES, 1):
+            marker = _MARKER_ACTIVE if p == provider else _MARKER_INACTIVE
+            Console.print(f"    {marker} {i}. {line}")
 
     Console.newline()
     provider = click.prompt(
         f"  {Icons.ARROW} Select provider",
-        type=click.Choice(providers_list),
+        type=click.Choice(_PROVIDERS_LIST),
         default=provider if provider != "auto" else "groq",
     )
 
     # API Key setup (not needed for local providers)
     api_key = None
-    env_var_name = {
-        "groq": "GROQ_API_KEY",
-        "openai": "OPENAI_API_KEY",
-        "anthropic": "ANTHROPIC_API_KEY",
-        "openrouter": "OPENROUTER_API_KEY",
-    }.get(provider)
+    env_var_name = _PROVIDER_ENV.get(provider)
 
     if env_var_name:
         existing_key = os.environ.get(env_var_name)
@@ -257,36 +282,24 @@ def init(path: str, provider: str, model: Optional[str], framework: str):
     Console.newline()
     Console.section("Model Selection")
 
-    default_models = {
-        "groq": "llama-3.3-70b-versatile",
-        "openai": "gpt-4o-mini",
-        "ollama": "llama3.2",
-        "anthropic": "claude-3-5-sonnet-20241022",
-        "openrouter": "openrouter/auto",
-        "lmstudio": "local-model",
-    }
-
     # Show available models for the provider
     available_models = PROVIDER_MODELS.get(provider, [])
     if available_models:
-        Console.print(f"  {Colors.DIM}Popular models for {provider}:{Colors.RESET}")
-        for m in available_models[:6]:  # Show top 6
-            marker = (
-                f"{Colors.GREEN}●{Colors.RESET}"
-                if m == default_models.get(provider)
-                else f"{Colors.DIM}○{Colors.RESET}"
-            )
-            Console.print(f"    {marker} {Colors.WHITE}{m}{Colors.RESET}")
-        Console.newline()
+        with Console.buffered():
+            Console.print(f"  {Colors.DIM}Popular models for {provider}:{Colors.RESET}")
+            for m in available_models[:6]:  # Show top 6
+                marker = _MARKER_ACTIVE if m == _DEFAULT_MODELS.get(provider) else _MARKER_INACTIVE
+                Console.print(f"    {marker} {Colors.WHITE}{m}{Colors.RESET}")
+            Console.newline()
 
     # Ensure model is set (either from CLI arg or prompt)
     if not model:
         model = click.prompt(
-            f"  {Icons.ARROW} Enter model name", default=default_models.get(provider, "auto")
+            f"  {Icons.ARROW} Enter model name", default=_DEFAULT_MODELS.get(provider, "auto")
         )
 
     # Fallback to ensure model is never None
-    model = model or default_models.get(provider, "auto")
+    model = model or _DEFAULT_MODELS.get(provider, "auto")
 
     # Create configuration
     with GhostSpinner(
@@ -301,9 +314,11 @@ def init(path: str, provider: str, model: Optional[str], framework: str):
 
     # Create .ghost directory
     ghost_dir = target_path / GHOST_DIR
-    if not ghost_dir.exists():
+    try:
         ghost_dir.mkdir()
         Console.success(f"Created {GHOST_DIR}/ directory")
+    except FileExistsError:
+        pass
 
     # Scan project and generate context
     with GhostSpinner(
@@ -312,7 +327,12 @@ def init(path: str, provider: str, model: Optional[str], framework: str):
         try:
             from ghost import init as ghost_init_module
 
-            context = ghost_init_module.walk_and_generate_json(str(target_path))
+            # ghost.toml was just written from the defaults; no need to re-read it
+            context = ghost_init_module.walk_and_generate_json(
+                str(target_path),
+                ignore_dirs=ghost_init_module.DEFAULT_IGNORE_DIRS,
+                ignore_files=ghost_init_module.DEFAULT_IGNORE_FILES,
+            )
             file_count = len(context)
             spinner.stop(message=f"Scanned {file_count} Python files")
         except Exception as e:
@@ -347,13 +367,14 @@ def init(path: str, provider: str, model: Optional[str], framework: str):
     Console.newline()
 
 
-def _create_ghost_config(path: Path, provider: str, model: str, framework: str):
-    """Create the ghost.toml configuration file."""
-    config_content = f"""# Ghost Configuration
-# Generated by Ghost v{__version__}
+# Default requests-per-minute written to ghost.toml; anything else gets 500
+_DEFAULT_RATE_LIMITS = {"groq": 30, "anthropic": 30, "openrouter": 60}
+
+_CONFIG_TEMPLATE = """# Ghost Configuration
+# Generated by Ghost v{version}
 
 [project]
-name = "{path.name}"
+name = "{name}"
 language = "python"
 
 [ai]
@@ -365,30 +386,27 @@ model = "{model}"
 # base_url = "http://localhost:11434/v1"
 
 # Rate limiting (requests per minute) - adjust based on your API tier
-rate_limit_rpm = {30 if provider in ['groq', 'anthropic'] else 60 if provider == 'openrouter' else 500}
+rate_limit_rpm = {rate_limit}
+
+# Optional: how long identical low-temperature responses are reused from .ghost/llm_cache
+# cache_ttl_seconds = 604800
+
+# Optional: output-token cap for the judge's one-word verdict (0 = no cap). Leave it
+# at 0 for reasoning models, which spend output tokens before answering
+# judge_max_tokens = 16
+
+# Optional: estimated prompt size above which the project tree and context are trimmed
+# max_prompt_tokens = 32000
 
 [scanner]
 # Directories to ignore when scanning for Python files
 ignore_dirs = [
-    ".venv", 
-    "venv",
-    "node_modules", 
-    ".git", 
-    "__pycache__", 
-    "dist", 
-    "build",
-    ".ghost", 
-    "tests",
-    ".tox",
-    ".pytest_cache",
-    ".mypy_cache"
+{ignore_dirs}
 ]
 
 # Specific files to ignore
 ignore_files = [
-    "setup.py",
-    "conftest.py",
-    "__init__.py"
+{ignore_files}
 ]
 
 [tests]
@@ -406,13 +424,37 @@ use_judge = true
 # Debounce time in seconds (ignore rapid consecutive saves)
 debounce_seconds = 15
 
+# Process a file at the latest this long after its first unprocessed save
+max_wait_seconds = 60
+
+# Files processed in parallel (LLM calls overlap; console output may interleave)
+max_workers = 1
+
 # File patterns to watch
 patterns = ["*.py"]
 """
 
-    config_path = path / GHOST_CONFIG_FILE
-    with open(config_path, "w") as f:
-        f.write(config_content)
+
+def _toml_string_list(items) -> str:
+    """Render strings as the indented body of a multi-line TOML array."""
+    return ",\n".join(f'    "{item}"' for item in items)
+
+
+def _create_ghost_config(path: Path, provider: str, model: str, framework: str):
+    """Create the ghost.toml configuration file."""
+    from ghost.init import DEFAULT_IGNORE_DIRS, DEFAULT_IGNORE_FILES
+
+    config_content = _CONFIG_TEMPLATE.format(
+        version=__version__,
+        name=path.name,
+        provider=provider,
+        model=model,
+        rate_limit=_DEFAULT_RATE_LIMITS.get(provider, 500),
+        ignore_dirs=_toml_string_list(DEFAULT_IGNORE_DIRS),
+        ignore_files=_toml_string_list(DEFAULT_IGNORE_FILES),
+        framework=framework,
+    )
+    (path / GHOST_CONFIG_FILE).write_text(config_content)
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -438,7 +480,7 @@ def watch(path: str, verbose: bool):
     """
     Console.banner()
 
-    target_path = Path(path).resolve()
+    target_path = _resolve_path(path)
 
     # Check for ghost.toml
     ghost_file = target_path / GHOST_CONFIG_FILE
@@ -448,6 +490,11 @@ def watch(path: str, verbose: bool):
         ctx = click.get_current_context()
         ctx.invoke(init, path=str(target_path))
 
+        # Init can be cancelled; don't load the watcher for an unconfigured project
+        if not ghost_file.exists():
+            Console.error("Cannot watch without ghost.toml")
+            raise SystemExit(1)
+
     Console.section("Starting File Watcher")
 
     # Import and start watcher from main module
@@ -519,7 +566,7 @@ def start(path: str, detach: bool):
     """
     Console.mini_banner()
 
-    target_path = Path(path).resolve()
+    target_path = _resolve_path(path)
 
     # Check for ghost.toml
     ghost_file = target_path / GHOST_CONFIG_FILE
@@ -611,7 +658,7 @@ def stop(path: str):
     """
     Console.mini_banner()
 
-    target_path = Path(path).resolve()
+    target_path = _resolve_path(path)
     pid = _check_daemon(target_path)
 
     if pid is None:
@@ -669,7 +716,7 @@ def status(path: str):
     """
     Console.mini_banner()
 
-    target_path = Path(path).resolve()
+    target_path = _resolve_path(path)
     pid = _check_daemon(target_path)
     log_file = _daemon_log_file(target_path)
     pid_file = _daemon_pid_file(target_path)
@@ -683,6 +730,16 @@ def status(path: str):
     else:
         Console.warning("Not running", prefix="")
 
+    from ghost.llm_cache import ResponseCache
+
+    cache_stats = ResponseCache.for_project(target_path).stats()
+    lookups = cache_stats["hits"] + cache_stats["misses"]
+    if lookups:
+        Console.info(
+            f"LLM cache: {cache_stats['hits']}/{lookups} hits "
+            f"({cache_stats['hits'] / lookups:.0%})"
+        )
+
     # Show recent log entries
     if log_file.exists():
         Console.newline()
@@ -726,12 +783,14 @@ def logs(path: str, follow: bool, lines: int):
     """
     Console.mini_banner()
 
-    target_path = Path(path).resolve()
+    target_path = _resolve_path(path)
     log_file = _daemon_log_file(target_path)
 
     if not log_file.exists():
         # Check if there's a project root with ghost.toml
-        project_root = _find_project_root(target_path)
+        from ghost.config import find_project_root
+
+        project_root = find_project_root(target_path)
         if project_root:
             log_file = _daemon_log_file(project_root)
             if not log_file.exists():
@@ -800,52 +859,74 @@ def logs(path: str, follow: bool, lines: int):
 
 
 @cli.command()
-@click.argument("file", type=click.Path(exists=True))
+@click.argument("files", nargs=-1, required=True, type=click.Path(exists=True))
 @click.option("--output", "-o", type=click.Path(), help="Output test file path")
 @click.option("--force", "-f", is_flag=True, help="Overwrite existing test file")
-def generate(file: str, output: Optional[str], force: bool):
+def generate(files: tuple, output: Optional[str], force: bool):
     """
-    Generate tests for a specific file.
+    Generate tests for one or more files.
+
+    Several files are sent to the AI provider concurrently.
 
     \b
     Examples:
       ghost generate app.py
       ghost generate src/utils.py -o tests/test_utils.py
       ghost generate app.py --force
+      ghost generate src/models.py src/views.py
     """
     Console.mini_banner()
 
-    file_path = Path(file).resolve()
-
-    if not file_path.suffix == ".py":
-        Console.error("Only Python files are supported")
+    if output and len(files) > 1:
+        Console.error("--output can only be used with a single file")
         raise SystemExit(1)
 
-    # Find project root (where ghost.toml is)
-    project_root = _find_project_root(file_path)
-    if not project_root:
-        Console.error("Could not find ghost.toml. Run 'ghost init' first.")
-        raise SystemExit(1)
+    project_root = None
+    targets = []  # (source file, test file, source code)
+    for file in files:
+        file_path = _resolve_path(file)
 
-    Console.generating(file_path.name)
+        if not file_path.suffix == ".py":
+            Console.error("Only Python files are supported")
+            raise SystemExit(1)
 
-    # Determine output path
-    if output:
-        test_path = Path(output).resolve()
-    else:
-        tests_dir = project_root / "tests"
-        tests_dir.mkdir(exist_ok=True)
-        test_path = tests_dir / f"test_{file_path.name}"
-
-    # Check if test file exists
-    if test_path.exists() and not force:
-        if not click.confirm(f"  {Icons.WARNING} Test file exists. Overwrite?", default=False):
-            Console.info("Generation cancelled")
-            return
+        # Find project root (where ghost.toml is)
+        from ghost.config import find_project_root
+
+        file_root = find_project_root(file_path)
+        if not file_root:
+            Console.error("Could not find ghost.toml. Run 'ghost init' first.")
+            raise SystemExit(1)
+        if project_root is None:
+            project_root = file_root
+        elif file_root != project_root:
+            Console.error("All files must belong to the same Ghost project")
+            raise SystemExit(1)
 
-    # Read source file
-    with open(file_path, "r") as f:
-        source_code = f.read()
+        Console.generating(file_path.name)
+
+        # Determine output path
+        if output:
+            test_path = _resolve_path(output)
+        else:
+            tests_dir = project_root / "tests"
+            tests_dir.mkdir(exist_ok=True)
+            test_path = tests_dir / f"test_{file_path.name}"
+
+        # Check if test file exists
+        if test_path.exists() and not force:
+            if not click.confirm(
+                f"  {Icons.WARNING} {test_path.name} exists. Overwrite?", default=False
+            ):
+                Console.info(f"Skipping {file_path.name}")
+                continue
+
+        # Read source file
+        targets.append((file_path, test_path, file_path.read_text(encoding="utf-8")))
+
+    if not targets:
+        Console.info("Generation cancelled")
+        return
 
     # Generate tests
     with GhostSpinner(
@@ -858,15 +939,25 @@ def generate(file: str, output: Optional[str], force: bool):
             config = get_config(project_root)
             generator = TestGenerator(config=config)
 
-            test_code = generator.get_test_code(
-                source_code=source_code, source_path=str(project_root), filename=file_path.name
-            )
+            items = [
+                {
+                    "source_code": source_code,
+                    "source_path": str(project_root),
+                    "filename": file_path.name,
+                }
+                for file_path, _, source_code in targets
+            ]
+            if len(items) == 1:
+                test_codes = [generator.get_test_code(**items[0])]
+            else:
+                test_codes = generator.get_test_codes_batched(items)
 
-            # Write test file
-            with open(test_path, "w") as f:
-                f.write(test_code)
+            # Write test files
+            for (_, test_path, _), test_code in zip(targets, test_codes):
+                test_path.write_text(test_code, encoding="utf-8")
 
-            spinner.stop(message=f"Tests written to {test_path.name}")
+            names = ", ".join(test_path.name for _, test_path, _ in targets)
+            spinner.stop(message=f"Tests written to {names}")
 
         except Exception as e:
             spinner.fail(f"Generation failed: {e}")
@@ -874,37 +965,29 @@ def generate(file: str, output: Optional[str], force: bool):
 
     # Run the tests
     Console.info("Running generated tests...")
-    with GhostSpinner("Running pytest", style=SpinnerStyle.DOTS2, color=Colors.YELLOW) as spinner:
-        try:
-            from ghost.runner import run_test
+    for _, test_path, _ in targets:
+        with GhostSpinner(
+            "Running pytest", style=SpinnerStyle.DOTS2, color=Colors.YELLOW
+        ) as spinner:
+            try:
+                from ghost.runner import run_test
 
-            return_code, stdout, stderr = run_test(str(test_path), str(project_root))
+                return_code, stdout, stderr = run_test(str(test_path), str(project_root))
 
-            if return_code == 0:
-                spinner.stop(message="All tests passed!")
-                Console.test_passed(test_path.name)
-            else:
-                spinner.fail("Some tests failed")
-                Console.test_failed(test_path.name)
-                Console.info("Run with --force to regenerate")
+                if return_code == 0:
+                    spinner.stop(message="All tests passed!")
+                    Console.test_passed(test_path.name)
+                else:
+                    spinner.fail("Some tests failed")
+                    Console.test_failed(test_path.name)
+                    Console.info("Run with --force to regenerate")
 
-        except Exception as e:
-            spinner.fail(f"Test run failed: {e}")
+            except Exception as e:
+                spinner.fail(f"Test run failed: {e}")
 
     Console.newline()
-    Console.success(f"Test file: {test_path}")
-
-
-def _find_project_root(start_path: Path) -> Optional[Path]:
-    """Find the project root by looking for ghost.toml."""
-    current = start_path if start_path.is_dir() else start_path.parent
-
-    while current != current.parent:
-        if (current / GHOST_CONFIG_FILE).exists():
-            return current
-        current = current.parent
-
-    return None
+    for _, test_path, _ in targets:
+        Console.success(f"Test file: {test_path}")
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -935,7 +1018,9 @@ def config(
     """
     Console.mini_banner()
 
-    project_root = _find_project_root(Path.cwd())
+    from ghost.config import find_project_root
+
+    project_root = find_project_root(Path.cwd())
 
     if show or (not set_provider and not set_model and not set_api_key):
         _show_config(project_root)
@@ -958,6 +1043,28 @@ def config(
         Console.info("Add to your .bashrc or .zshrc for persistence")
 
 
+def _read_toml_sections(config_path: Path, sections) -> dict:
+    """
+    Parse only the given top-level tables of a TOML file.
+
+    The rest of the file (e.g. long [scanner] ignore lists) is skipped rather
+    than tokenized; falls back to a full parse if the slice doesn't parse.
+    """
+    from ghost import tomlio
+
+    text = config_path.read_text(encoding="utf-8")
+    headers = list(_TOML_TABLE_RE.finditer(text))
+    wanted = [
+        text[header.start() : following.start() if following else len(text)]
+        for header, following in zip(headers, headers[1:] + [None])
+        if header.group(1).strip() in sections
+    ]
+    try:
+        return tomlio.loads("\n".join(wanted))
+    except tomlio.DecodeError:
+        return tomlio.loads(text)
+
+
 def _show_config(project_root: Optional[Path]):
     """Display current configuration."""
     Console.section("Current Configuration")
@@ -967,32 +1074,30 @@ def _show_config(project_root: Optional[Path]):
         Console.info("Run 'ghost init' to create a new project")
         return
 
-    import tomllib
-
     config_path = project_root / GHOST_CONFIG_FILE
-    with open(config_path, "rb") as f:
-        config = tomllib.load(f)
+    config = _read_toml_sections(config_path, ("ai", "tests"))
 
-    Console.print(
-        f"  {Colors.DIM}Project:{Colors.RESET}    {Colors.BRIGHT_WHITE}{project_root.name}{Colors.RESET}"
-    )
-    Console.print(
-        f"  {Colors.DIM}Config:{Colors.RESET}     {Colors.BRIGHT_WHITE}{config_path}{Colors.RESET}"
-    )
-    Console.newline()
+    with Console.buffered():
+        Console.print(
+            f"  {Colors.DIM}Project:{Colors.RESET}    {Colors.BRIGHT_WHITE}{project_root.name}{Colors.RESET}"
+        )
+        Console.print(
+            f"  {Colors.DIM}Config:{Colors.RESET}     {Colors.BRIGHT_WHITE}{config_path}{Colors.RESET}"
+        )
+        Console.newline()
 
-    ai_config = config.get("ai", {})
-    Console.print(f"  {Colors.CYAN}AI Settings:{Colors.RESET}")
-    Console.print(f"    Provider:   {ai_config.get('provider', 'not set')}")
-    Console.print(f"    Model:      {ai_config.get('model', 'not set')}")
-    Console.print(f"    Rate Limit: {ai_config.get('rate_limit_rpm', 30)} RPM")
-    Console.newline()
+        ai_config = config.get("ai", {})
+        Console.print(f"  {Colors.CYAN}AI Settings:{Colors.RESET}")
+        Console.print(f"    Provider:   {ai_config.get('provider', 'not set')}")
+        Console.print(f"    Model:      {ai_config.get('model', 'not set')}")
+        Console.print(f"    Rate Limit: {ai_config.get('rate_limit_rpm', 30)} RPM")
+        Console.newline()
 
-    test_config = config.get("tests", {})
-    Console.print(f"  {Colors.CYAN}Test Settings:{Colors.RESET}")
-    Console.print(f"    Framework:  {test_config.get('framework', 'pytest')}")
-    Console.print(f"    Output Dir: {test_config.get('output_dir', 'tests')}")
-    Console.print(f"    Auto Heal:  {test_config.get('auto_heal', True)}")
+        test_config = config.get("tests", {})
+        Console.print(f"  {Colors.CYAN}Test Settings:{Colors.RESET}")
+        Console.print(f"    Framework:  {test_config.get('framework', 'pytest')}")
+        Console.print(f"    Output Dir: {test_config.get('output_dir', 'tests')}")
+        Console.print(f"    Auto Heal:  {test_config.get('auto_heal', True)}")
 
 
 def _update_config(project_root: Path, provider: Optional[str] = None, model: Optional[str] = None):
@@ -1005,15 +1110,11 @@ def _update_config(project_root: Path, provider: Optional[str] = None, model: Op
 
     # Update provider
     if provider:
-        import re
-
-        content = re.sub(r'provider\s*=\s*"[^"]*"', f'provider = "{provider}"', content)
+        content = _PROVIDER_RE.sub(f'provider = "{provider}"', content)
 
     # Update model
     if model:
-        import re
-
-        content = re.sub(r'model\s*=\s*"[^"]*"', f'model = "{model}"', content)
+        content = _MODEL_RE.sub(f'model = "{model}"', content)
 
     # Write back
     with open(config_path, "w") as f:
@@ -1043,55 +1144,56 @@ def providers(check: bool):
 
     status = list_available_providers()
 
-    # Local providers
-    Console.print(f"\n  {Colors.BOLD}Local (Free){Colors.RESET}")
-    _print_provider_status(
-        "Ollama", status.get("ollama", False), "ollama serve", "http://localhost:11434"
-    )
-    _print_provider_status(
-        "LM Studio", status.get("lmstudio", False), "Start LM Studio", "http://localhost:1234"
-    )
-
-    # Cloud providers
-    Console.print(f"\n  {Colors.BOLD}Cloud APIs{Colors.RESET}")
-    _print_provider_status("Groq", status.get("groq", False), "GROQ_API_KEY", "Free tier: 30 RPM")
-    _print_provider_status("OpenAI", status.get("openai", False), "OPENAI_API_KEY", "Paid")
-    _print_provider_status("Anthropic", status.get("anthropic", False), "ANTHROPIC_API_KEY", "Paid")
-    _print_provider_status(
-        "OpenRouter", status.get("openrouter", False), "OPENROUTER_API_KEY", "Pay per use"
-    )
+    with Console.buffered():
+        # Local providers
+        Console.print(f"\n  {Colors.BOLD}Local (Free){Colors.RESET}")
+        _print_provider_status(
+            "Ollama", status.get("ollama", False), "ollama serve", "http://localhost:11434"
+        )
+        _print_provider_status(
+            "LM Studio", status.get("lmstudio", False), "Start LM Studio", "http://localhost:1234"
+        )
 
-    Console.newline()
-    Console.section("Popular Models")
+        # Cloud providers
+        Console.print(f"\n  {Colors.BOLD}Cloud APIs{Colors.RESET}")
+        _print_provider_status(
+            "Groq", status.get("groq", False), "GROQ_API_KEY", "Free tier: 30 RPM"
+        )
+        _print_provider_status("OpenAI", status.get("openai", False), "OPENAI_API_KEY", "Paid")
+        _print_provider_status(
+            "Anthropic", status.get("anthropic", False), "ANTHROPIC_API_KEY", "Paid"
+        )
+        _print_provider_status(
+            "OpenRouter", status.get("openrouter", False), "OPENROUTER_API_KEY", "Pay per use"
+        )
 
-    Console.print(f"\n  {Colors.DIM}{'Model':<25} {'Provider':<12} {'Description'}{Colors.RESET}")
-    Console.print(f"  {Colors.DIM}{'─' * 70}{Colors.RESET}")
+        Console.newline()
+        Console.section("Popular Models")
 
-    for name, model in list(POPULAR_MODELS.items())[:10]:
-        provider = model.provider.value
         Console.print(
-            f"  {Colors.BRIGHT_WHITE}{name:<25}{Colors.RESET} {provider:<12} {Colors.DIM}{model.description}{Colors.RESET}"
+            f"\n  {Colors.DIM}{'Model':<25} {'Provider':<12} {'Description'}{Colors.RESET}"
         )
+        Console.print(f"  {Colors.DIM}{'─' * 70}{Colors.RESET}")
 
-    Console.newline()
-    Console.info("Set up a provider:")
-    Console.print(f"  {Colors.CYAN}# For Groq (recommended - free & fast):{Colors.RESET}")
-    Console.print("  export GROQ_API_KEY='your-key-here'")
-    Console.print(f"\n  {Colors.CYAN}# For local Ollama:{Colors.RESET}")
-    Console.print("  ollama serve  # Start server")
-    Console.print("  ollama pull llama3.2  # Download model")
-    Console.newline()
+        for name, model in list(POPULAR_MODELS.items())[:10]:
+            provider = model.provider.value
+            Console.print(
+                f"  {Colors.BRIGHT_WHITE}{name:<25}{Colors.RESET} {provider:<12} {Colors.DIM}{model.description}{Colors.RESET}"
+            )
+
+        Console.newline()
+        Console.info("Set up a provider:")
+        Console.print(f"  {Colors.CYAN}# For Groq (recommended - free & fast):{Colors.RESET}")
+        Console.print("  export GROQ_API_KEY='your-key-here'")
+        Console.print(f"\n  {Colors.CYAN}# For local Ollama:{Colors.RESET}")
+        Console.print("  ollama serve  # Start server")
+        Console.print("  ollama pull llama3.2  # Download model")
+        Console.newline()
 
 
 def _print_provider_status(name: str, available: bool, setup_hint: str, note: str):
     """Print provider status line."""
-    if available:
-        status = f"{Colors.BRIGHT_GREEN}{Icons.SUCCESS}{Colors.RESET}"
-        status_text = f"{Colors.GREEN}Available{Colors.RESET}"
-    else:
-        status = f"{Colors.DIM}{Icons.CIRCLE}{Colors.RESET}"
-        status_text = f"{Colors.DIM}Not configured{Colors.RESET}"
-
+    status, status_text = _STATUS_AVAILABLE if available else _STATUS_UNAVAILABLE
     Console.print(f"    {status} {name:<12} {status_text:<20} {Colors.DIM}{note}{Colors.RESET}")
 
 
@@ -1108,12 +1210,13 @@ def version():
 
 def show_version():
     """Display version info."""
-    Console.print(
-        f"\n  {Colors.BRIGHT_MAGENTA}{Icons.GHOST} Ghost{Colors.RESET} {Colors.BRIGHT_WHITE}v{__version__}{Colors.RESET}"
-    )
-    Console.print(f"  {Colors.DIM}AI-Powered Test Generation & Healing{Colors.RESET}")
-    Console.print(f"  {Colors.DIM}Python {sys.version.split()[0]}{Colors.RESET}")
-    Console.newline()
+    with Console.buffered():
+        Console.print(
+            f"\n  {Colors.BRIGHT_MAGENTA}{Icons.GHOST} Ghost{Colors.RESET} {Colors.BRIGHT_WHITE}v{__version__}{Colors.RESET}"
+        )
+        Console.print(f"  {Colors.DIM}AI-Powered Test Generation & Healing{Colors.RESET}")
+        Console.print(f"  {Colors.DIM}Python {sys.version.split()[0]}{Colors.RESET}")
+        Console.newline()
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -1144,17 +1247,21 @@ def doctor():
         all_ok = False
 
     # Check required packages
+    # find_spec only locates the package; importing groq/openai would load httpx, pydantic...
+    import importlib.util
+
     packages = ["groq", "openai", "watchdog", "pytest", "click"]
     for pkg in packages:
-        try:
-            __import__(pkg)
+        if importlib.util.find_spec(pkg) is not None:
             Console.success(f"{pkg} installed")
-        except ImportError:
+        else:
             Console.error(f"{pkg} not installed")
             all_ok = False
 
     # Check for ghost.toml
-    project_root = _find_project_root(Path.cwd())
+    from ghost.config import find_project_root
+
+    project_root = find_project_root(Path.cwd())
     if project_root:
         Console.success(f"Project found: {project_root.name}")
     else:
@@ -1184,9 +1291,16 @@ def doctor():
 # ═══════════════════════════════════════════════════════════════════════════════
 
 
+# Invocations answered without building a Click context
+_VERSION_ARGS = (("version",), ("-v",), ("--version",))
+
+
 def main():
     """Main entry point for the CLI."""
     try:
+        if tuple(sys.argv[1:]) in _VERSION_ARGS:
+            show_version()
+            return
         cli()
     except KeyboardInterrupt:
         Console.newline()
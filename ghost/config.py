@@ -7,18 +7,20 @@ Supports loading from:
 3. Default values
 """
 
+import copy
 import os
-import tomllib
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
 
 from dotenv import load_dotenv
 
+from ghost import tomlio
+
 load_dotenv()
 
 
-@dataclass
+@dataclass(slots=True)
 class AIConfig:
     """AI provider configuration."""
 
@@ -27,11 +29,16 @@ class AIConfig:
     api_key: Optional[str] = None
     base_url: Optional[str] = None
     rate_limit_rpm: int = 30
-    temperature: float = 0.1
+    rate_limit_tpm: int = 0
+    temperature: float = 0.0
     max_retries: int = 5
+    cache: bool = True
+    cache_ttl_seconds: int = 7 * 24 * 60 * 60
+    judge_max_tokens: int = 0
+    max_prompt_tokens: int = 32_000
 
 
-@dataclass
+@dataclass(slots=True)
 class ScannerConfig:
     """File scanner configuration."""
 
@@ -55,7 +62,7 @@ class ScannerConfig:
     )
 
 
-@dataclass
+@dataclass(slots=True)
 class TestConfig:
     """Test generation configuration."""
 
@@ -66,15 +73,17 @@ class TestConfig:
     use_judge: bool = True
 
 
-@dataclass
+@dataclass(slots=True)
 class WatcherConfig:
     """File watcher configuration."""
 
     debounce_seconds: int = 15
+    max_wait_seconds: int = 60
+    max_workers: int = 1
     patterns: List[str] = field(default_factory=lambda: ["*.py"])
 
 
-@dataclass
+@dataclass(slots=True)
 class GhostConfig:
     """Complete Ghost configuration."""
 
@@ -89,45 +98,71 @@ class GhostConfig:
     def from_dict(cls, data: Dict[str, Any]) -> "GhostConfig":
         """Create config from dictionary (parsed TOML)."""
         project = data.get("project", {})
-        ai_data = data.get("ai", {})
-        scanner_data = data.get("scanner", {})
-        test_data = data.get("tests", {})
-        watcher_data = data.get("watcher", {})
-
         return cls(
             project_name=project.get("name", "my-project"),
             language=project.get("language", "python"),
-            ai=AIConfig(
-                provider=ai_data.get("provider", "ollama"),
-                model=ai_data.get("model", "llama3.2"),
-                api_key=ai_data.get("api_key"),
-                base_url=ai_data.get("base_url"),
-                rate_limit_rpm=ai_data.get("rate_limit_rpm", 30),
-                temperature=ai_data.get("temperature", 0.1),
-                max_retries=ai_data.get("max_retries", 5),
-            ),
-            scanner=ScannerConfig(
-                ignore_dirs=scanner_data.get("ignore_dirs", ScannerConfig().ignore_dirs),
-                ignore_files=scanner_data.get("ignore_files", ScannerConfig().ignore_files),
-            ),
-            tests=TestConfig(
-                framework=test_data.get("framework", "pytest"),
-                output_dir=test_data.get("output_dir", "tests"),
-                auto_heal=test_data.get("auto_heal", True),
-                max_heal_attempts=test_data.get("max_heal_attempts", 3),
-                use_judge=test_data.get("use_judge", True),
-            ),
-            watcher=WatcherConfig(
-                debounce_seconds=watcher_data.get("debounce_seconds", 15),
-                patterns=watcher_data.get("patterns", ["*.py"]),
-            ),
+            ai=_build_section(AIConfig, data.get("ai", {})),
+            scanner=_build_section(ScannerConfig, data.get("scanner", {})),
+            tests=_build_section(TestConfig, data.get("tests", {})),
+            watcher=_build_section(WatcherConfig, data.get("watcher", {})),
         )
 
 
+# Field names of each ghost.toml section, computed once
+_SECTION_FIELDS: Dict[type, frozenset] = {
+    section: frozenset(f.name for f in fields(section))
+    for section in (AIConfig, ScannerConfig, TestConfig, WatcherConfig)
+}
+
+
+def _build_section(section: type, table: Dict[str, Any]) -> Any:
+    """Instantiate a section dataclass from its TOML table; absent keys keep the field defaults."""
+    names = _SECTION_FIELDS[section]
+    return section(**{key: value for key, value in table.items() if key in names})
+
+
+# Parsed ghost.toml per project, keyed by the file's (mtime_ns, size)
+_config_cache: Dict[Path, Tuple[Tuple[int, int], GhostConfig]] = {}
+
+# Project roots found by find_project_root(), keyed by resolved start path
+_project_root_cache: Dict[Path, Path] = {}
+
+# (mtime_ns, size) of each .env file as of its last load
+_dotenv_stamps: Dict[Path, Tuple[int, int]] = {}
+
+
+def _stat_key(path: Path) -> Tuple[int, int]:
+    """(mtime_ns, size) of path, or (-1, -1) when it doesn't exist."""
+    try:
+        st = path.stat()
+    except OSError:
+        return -1, -1
+    return st.st_mtime_ns, st.st_size
+
+
+def load_project_env(env_file: Path) -> bool:
+    """
+    Load env_file into os.environ, overriding existing values.
+
+    Skipped when the file is missing or unchanged since it was last loaded.
+    Returns True if the file was (re)loaded.
+    """
+    stamp = _stat_key(env_file)
+    if stamp[0] < 0 or _dotenv_stamps.get(env_file) == stamp:
+        return False
+    load_dotenv(env_file, override=True)
+    _dotenv_stamps[env_file] = stamp
+    return True
+
+
 def get_config(project_path: Optional[Path] = None) -> GhostConfig:
     """
     Load Ghost configuration from ghost.toml.
 
+    The parsed file is memoized per project and reused until ghost.toml
+    changes on disk. Environment overrides are re-applied on every call,
+    and each caller gets its own copy.
+
     Args:
         project_path: Path to the project root. If None, searches from CWD.
 
@@ -144,24 +179,33 @@ def get_config(project_path: Optional[Path] = None) -> GhostConfig:
     project_path = Path(project_path)
 
     # Load .env from project directory
-    env_file = project_path / ".env"
-    if env_file.exists():
-        load_dotenv(env_file, override=True)
+    load_project_env(project_path / ".env")
 
     config_path = project_path / "ghost.toml"
+    stamp = _stat_key(config_path)
+    cached = _config_cache.get(project_path)
+    if cached is None or cached[0] != stamp:
+        if stamp[0] < 0:
+            _config_cache.pop(project_path, None)
+            return GhostConfig()
 
-    if not config_path.exists():
-        return GhostConfig()
-
-    with open(config_path, "rb") as f:
-        data = tomllib.load(f)
+        with open(config_path, "rb") as f:
+            data = tomlio.load(f)
 
-    config = GhostConfig.from_dict(data)
+        cached = (stamp, GhostConfig.from_dict(data))
+        _config_cache[project_path] = cached
 
     # Override with environment variables
-    config = _apply_env_overrides(config)
+    return _apply_env_overrides(copy.deepcopy(cached[1]))
 
-    return config
+
+def _clear_caches() -> None:
+    _config_cache.clear()
+    _project_root_cache.clear()
+    _dotenv_stamps.clear()
+
+
+get_config.cache_clear = _clear_caches  # type: ignore[attr-defined]
 
 
 def find_project_root(start_path: Optional[Path] = None) -> Optional[Path]:
@@ -169,46 +213,70 @@ def find_project_root(start_path: Optional[Path] = None) -> Optional[Path]:
     if start_path is None:
         start_path = Path.cwd()
 
-    current = start_path.resolve()
+    start = start_path.resolve()
 
+    # Only hits are cached; a miss may turn into a hit after `ghost init`
+    root = _project_root_cache.get(start)
+    if root is not None:
+        if (root / "ghost.toml").exists():
+            return root
+        del _project_root_cache[start]
+
+    current = start
     while current != current.parent:
         if (current / "ghost.toml").exists():
+            _project_root_cache[start] = current
             return current
         current = current.parent
 
     return None
 
 
+# Environment variables holding each provider's API key (first match wins)
+_PROVIDER_ENV_KEYS: Dict[str, Tuple[str, ...]] = {
+    "groq": ("GROQ_API_KEY", "GROQ_API_KEY3"),  # Support legacy key name
+    "openai": ("OPENAI_API_KEY",),
+    "anthropic": ("ANTHROPIC_API_KEY",),
+    "openrouter": ("OPENROUTER_API_KEY",),
+}
+
+
+def _first_env(env: Mapping[str, str], keys: Iterable[str]) -> Optional[str]:
+    """Return the first non-empty value among *keys* in *env*."""
+    return next((env[key] for key in keys if env.get(key)), None)
+
+
 def _apply_env_overrides(config: GhostConfig) -> GhostConfig:
     """Apply environment variable overrides to config."""
+    env = os.environ
 
     # API key overrides based on provider
-    env_keys = {
-        "groq": "GROQ_API_KEY",
-        "openai": "OPENAI_API_KEY",
-        "anthropic": "ANTHROPIC_API_KEY",
-        "openrouter": "OPENROUTER_API_KEY",
-    }
-
     provider = config.ai.provider.lower()
-    if provider in env_keys:
-        env_key = env_keys[provider]
-        api_key = os.environ.get(env_key)
+    if provider in _PROVIDER_ENV_KEYS:
+        api_key = env.get(_PROVIDER_ENV_KEYS[provider][0])
         if api_key:
             config.ai.api_key = api_key
 
     # Also check for generic API key
     if not config.ai.api_key:
-        config.ai.api_key = os.environ.get("GHOST_API_KEY")
+        config.ai.api_key = env.get("GHOST_API_KEY")
+
+    # Sampling temperature override
+    temperature = env.get("GHOST_TEMPERATURE")
+    if temperature:
+        try:
+            config.ai.temperature = float(temperature)
+        except ValueError:
+            pass
 
     # Base URL override
-    base_url = os.environ.get("GHOST_BASE_URL")
+    base_url = env.get("GHOST_BASE_URL")
     if base_url:
         config.ai.base_url = base_url
 
     # Ollama host override
     if provider == "ollama":
-        ollama_host = os.environ.get("OLLAMA_HOST")
+        ollama_host = env.get("OLLAMA_HOST")
         if ollama_host:
             config.ai.base_url = ollama_host
 
@@ -217,30 +285,15 @@ def _apply_env_overrides(config: GhostConfig) -> GhostConfig:
 
 def get_api_key(provider: Optional[str] = None) -> Optional[str]:
     """Get API key for a specific provider from environment."""
-    env_keys = {
-        "groq": ["GROQ_API_KEY", "GROQ_API_KEY3"],  # Support legacy key name
-        "openai": ["OPENAI_API_KEY"],
-        "anthropic": ["ANTHROPIC_API_KEY"],
-        "openrouter": ["OPENROUTER_API_KEY"],
-    }
+    env = os.environ
 
     if provider:
-        provider = provider.lower()
-        keys = env_keys.get(provider, [])
-
-        for key in keys:
-            value = os.environ.get(key)
-            if value:
-                return value
+        value = _first_env(env, _PROVIDER_ENV_KEYS.get(provider.lower(), ()))
+        if value:
+            return value
 
     # Try all keys if no provider specified
-    for keys_list in env_keys.values():
-        for key in keys_list:
-            value = os.environ.get(key)
-            if value:
-                return value
-
-    return None
+    return _first_env(env, (key for keys in _PROVIDER_ENV_KEYS.values() for key in keys))
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -4,11 +4,13 @@ Ghost Console - Beautiful CLI output with animations and styling.
 A professional console output system inspired by tools like Vercel, Cargo, and npm.
 """
 
+import io
 import itertools
 import shutil
 import sys
 import threading
 import time
+from contextlib import contextmanager, redirect_stdout
 from datetime import datetime
 from enum import Enum
 from typing import Optional
@@ -347,6 +349,24 @@ class Console:
         sys.stdout.write("\r\033[K")
         sys.stdout.flush()
 
+    @classmethod
+    @contextmanager
+    def buffered(cls):
+        """
+        Collect all console output in the block and write it out in one go.
+
+        Use for static listings only: prompts or spinners inside the block
+        would be held back until it exits.
+        """
+        out = sys.stdout
+        buffer = io.StringIO()
+        try:
+            with redirect_stdout(buffer):
+                yield
+        finally:
+            out.write(buffer.getvalue())
+            out.flush()
+
     # ─────────────────────────────────────────────────────────────────────────
     # Status Messages
     # ─────────────────────────────────────────────────────────────────────────
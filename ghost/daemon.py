@@ -132,14 +132,9 @@ def check_pid(pid_file: Path) -> Optional[int]:
 
 def _load_env(project_root: Path) -> None:
     """Load .env from the project root if it exists."""
-    env_file = project_root / ".env"
-    if env_file.exists():
-        try:
-            from dotenv import load_dotenv
+    from ghost.config import load_project_env
 
-            load_dotenv(env_file, override=True)
-        except ImportError:
-            pass  # dotenv is optional for daemon
+    load_project_env(project_root / ".env")
 
 
 def _build_watcher(project_root: Path, logger: logging.Logger):
@@ -158,19 +153,41 @@ def _build_watcher(project_root: Path, logger: logging.Logger):
     from watchdog.events import FileSystemEvent, FileSystemEventHandler
     from watchdog.observers import Observer
 
+    from ghost import init as ghost_init_module
     from ghost.config import get_config
     from ghost.job_queue import JobQueue
+    from ghost.main import (
+        CheckPath,
+        ReadSource,
+        getFileNameFromPath,
+        schedule_project_watches,
+        unwatch_top_level_dir,
+        watch_new_top_level_dir,
+    )
+    from ghost.runner import DEFAULT_TREE_IGNORE_DIRS
 
     config = get_config(project_root)
+    ghost_init_module.preload_context(str(project_root))
     queue = JobQueue(
         debounce_seconds=config.watcher.debounce_seconds,
-        max_workers=1,
+        max_wait_seconds=config.watcher.max_wait_seconds,
+        max_workers=max(1, config.watcher.max_workers),
     )
     queue.start()
 
     class DaemonEventHandler(FileSystemEventHandler):
         """Watchdog event handler that logs all activity and triggers test gen."""
 
+        _generator = None
+
+        def _get_generator(self):
+            """One TestGenerator for the daemon's lifetime; the config is fixed at startup."""
+            if self._generator is None:
+                from ghost.chat import TestGenerator
+
+                self._generator = TestGenerator(config=config)
+            return self._generator
+
         def _get_file(self, event: FileSystemEvent) -> Optional[str]:
             path = str(event.src_path)
             if path.endswith("~"):
@@ -178,49 +195,38 @@ def _build_watcher(project_root: Path, logger: logging.Logger):
             return path
 
         def _check_path(self, file_path: str) -> bool:
-            normalized = file_path.replace("\\", "/")
-            if "/tests/" in normalized or normalized.endswith("/tests"):
-                return False
-            if "/__pycache__/" in normalized or normalized.endswith(".pyc"):
-                return False
-            file = normalized.split("/")[-1] if "/" in normalized else file_path
-            if "test" in file.lower() or "tmp" in file.lower():
-                return False
-            if file.startswith(".git") or file.endswith(".log"):
-                return False
-            if not file.endswith(".py"):
-                return False
-            return True
+            # Same rules as the foreground watcher
+            return CheckPath(getFileNameFromPath(file_path), file_path)
 
         def _process_file(self, file_path: str) -> None:
-            file_name = file_path.split("/")[-1]
+            file_name = getFileNameFromPath(file_path)
             logger.info(f"File modified: {file_name}")
 
             try:
-                with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                    content = f.read()
-            except (FileNotFoundError, PermissionError, OSError) as e:
+                source = ReadSource(file_path)
+            except OSError as e:
                 logger.warning(f"Cannot read file {file_path}: {e}")
                 return
+            except ValueError as e:
+                logger.warning(f"Skipping {file_name}: {e}")
+                return
+            content = source.decode("utf-8", errors="ignore")
 
             try:
-                from ghost import init as ghost_init_module
-
                 result = ghost_init_module.walk_and_modify_json(
-                    str(project_root), file_path, file_name
+                    str(project_root), file_path, file_name, source=source
                 )
                 if result is None:
-                    logger.warning(f"Skipping {file_name}: syntax errors")
+                    logger.info(f"Skipping {file_name}: ignored, unparsable or no definitions")
                     return
             except Exception as e:
                 logger.error(f"Failed to update context for {file_name}: {e}")
                 return
 
             try:
-                from ghost.chat import TestGenerator
-                from ghost.runner import classify_error, run_test
+                from ghost.runner import classify_error, run_test_cached
 
-                generator = TestGenerator(config=config)
+                generator = self._get_generator()
                 code = generator.get_test_code(content, str(project_root), file_name)
 
                 test_path = project_root / config.tests.output_dir / f"test_{file_name}"
@@ -230,22 +236,26 @@ def _build_watcher(project_root: Path, logger: logging.Logger):
 
                 max_attempts = config.tests.max_heal_attempts if config.tests.auto_heal else 0
                 for attempt in range(max_attempts):
-                    return_code, stdout, stderr = run_test(str(test_path), str(project_root))
+                    return_code, stdout, stderr = run_test_cached(
+                        str(test_path), str(project_root), file_path
+                    )
                     error_type = classify_error(stderr, stdout)
 
                     if return_code == 0:
                         logger.info(f"Tests passed: test_{file_name}")
                         break
 
+                    errors = {"return_code": return_code, "stderr": stderr, "stdout": stdout}
+                    fix = None
                     if error_type == "LOGIC":
                         if config.tests.use_judge:
-                            judge = TestGenerator(config=config)
-                            result = judge.consult_the_judge(
+                            result, fix = generator.consult_the_judge_with_fix(
                                 content,
                                 str(project_root),
                                 file_name,
                                 str(test_path),
-                                {"return_code": return_code, "stderr": stderr, "stdout": stdout},
+                                errors,
+                                test_code=code,
                             )
                             if result == "BUG_IN_CODE":
                                 logger.warning(
@@ -259,14 +269,18 @@ def _build_watcher(project_root: Path, logger: logging.Logger):
                     logger.info(
                         f"Healing attempt {attempt + 1}/{max_attempts} for test_{file_name}"
                     )
-                    code = generator.get_test_code(
-                        content,
-                        str(project_root),
-                        file_name,
-                        testing=True,
-                        test_file_path=str(test_path),
-                        errors={"return_code": return_code, "stderr": stderr, "stdout": stdout},
-                    )
+                    if fix is not None:
+                        code = fix.result()
+                    else:
+                        code = generator.get_test_code(
+                            content,
+                            str(project_root),
+                            file_name,
+                            testing=True,
+                            test_file_path=str(test_path),
+                            errors=errors,
+                            existing_code=code,
+                        )
                     test_path.write_text(code)
                 else:
                     logger.warning(f"Max healing attempts reached for test_{file_name}")
@@ -281,25 +295,40 @@ def _build_watcher(project_root: Path, logger: logging.Logger):
             queue.submit(file_path, self._process_file)
 
         def on_created(self, event: FileSystemEvent) -> None:
+            if event.is_directory:
+                watch_new_top_level_dir(
+                    observer, self, str(event.src_path), watch_root, ignore_dirs, watches
+                )
+                return
             file_path = self._get_file(event)
             if file_path and self._check_path(file_path):
-                logger.info(f"File created: {file_path.split('/')[-1]}")
+                logger.info(f"File created: {getFileNameFromPath(file_path)}")
+
+        def on_moved(self, event: FileSystemEvent) -> None:
+            if event.is_directory:
+                unwatch_top_level_dir(observer, str(event.src_path), watches)
+                watch_new_top_level_dir(
+                    observer, self, str(event.dest_path), watch_root, ignore_dirs, watches
+                )
 
         def on_deleted(self, event: FileSystemEvent) -> None:
+            if event.is_directory:
+                unwatch_top_level_dir(observer, str(event.src_path), watches)
+                return
             file_path = self._get_file(event)
             if file_path and self._check_path(file_path):
-                file_name = file_path.split("/")[-1]
+                file_name = getFileNameFromPath(file_path)
                 logger.info(f"File deleted: {file_name}")
                 try:
-                    from ghost import init as ghost_init_module
-
                     ghost_init_module.walk_and_delete_json(str(project_root), file_name)
                 except Exception as e:
                     logger.error(f"Failed to remove {file_name} from context: {e}")
 
     event_handler = DaemonEventHandler()
     observer = Observer()
-    observer.schedule(event_handler, path=str(project_root), recursive=True)
+    watch_root = os.path.abspath(project_root)
+    ignore_dirs = DEFAULT_TREE_IGNORE_DIRS.union(config.scanner.ignore_dirs)
+    watches = schedule_project_watches(observer, event_handler, watch_root, ignore_dirs)
     observer.start()
     return observer
 
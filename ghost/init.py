@@ -1,102 +1,236 @@
 import ast
+import functools
 import json
 import logging
 import os
-import tomllib
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
 
+from ghost import jsonio, tomlio
 from ghost.console import Colors, Console, GhostSpinner, SpinnerStyle
 
+# Scanner defaults written to new ghost.toml files by `ghost init`
+DEFAULT_IGNORE_DIRS = (
+    ".venv",
+    "venv",
+    "node_modules",
+    ".git",
+    "__pycache__",
+    "dist",
+    "build",
+    ".ghost",
+    "tests",
+    ".tox",
+    ".pytest_cache",
+    ".mypy_cache",
+)
+DEFAULT_IGNORE_FILES = ("setup.py", "conftest.py", "__init__.py")
+
+# Below this many files a worker pool costs more to start than it saves
+PARALLEL_MIN_FILES = 64
+
 
 class CodeAnalyzer(ast.NodeVisitor):
+    """Collect top-level function signatures and the method names of top-level classes."""
+
     def __init__(self):
         self.functions = []
         self.classes = {}
 
-    def visit_FunctionDef(self, node):
-        # Only collect top-level functions (not inside classes)
-        if isinstance(node.parent, ast.Module):
-            args = [arg.arg for arg in node.args.args]
-            signature = f"{node.name}({', '.join(args)})"
-            self.functions.append(signature)
-        self.generic_visit(node)
-
-    def visit_ClassDef(self, node):
-        methods = []
+    def visit_Module(self, node):
+        # Only the module body matters, so scan it directly instead of
+        # visiting (and parent-linking) every node in the tree
         for item in node.body:
             if isinstance(item, ast.FunctionDef):
-                methods.append(item.name)
-        self.classes[node.name] = methods
-        self.generic_visit(node)
+                args = [arg.arg for arg in item.args.args]
+                self.functions.append(f"{item.name}({', '.join(args)})")
+            elif isinstance(item, ast.ClassDef):
+                self.classes[item.name] = [
+                    member.name for member in item.body if isinstance(member, ast.FunctionDef)
+                ]
 
 
-def get_toml(path):
-    path = f"{path}/ghost.toml"
+@functools.lru_cache(maxsize=8)
+def _parse_toml(path, mtime_ns, size):
     with open(path, "rb") as f:
-        config = tomllib.load(f)
-    return config
+        return tomlio.load(f)
 
 
-# ANALYSIS
-def add_parent_links(tree):
-    """Attach parent references to AST nodes for top-level function detection."""
-    for node in ast.walk(tree):
-        for child in ast.iter_child_nodes(node):
-            child.parent = node
+def get_toml(path):
+    """Parse <path>/ghost.toml, reusing the result until the file changes on disk."""
+    path = Path(path, "ghost.toml")
+    st = path.stat()
+    return _parse_toml(path, st.st_mtime_ns, st.st_size)
 
 
 # ANALYSIS
-def analyze_file(path):
-    with open(path, "r", encoding="utf-8") as f:
-        source = f.read()
+def _analyze_bytes(source):
     try:
+        # ast.parse decodes bytes itself, honouring PEP 263 coding cookies
         tree = ast.parse(source)
-    except SyntaxError:
+    except (SyntaxError, ValueError):
         return None  # skip invalid files
 
-    add_parent_links(tree)
-
     analyzer = CodeAnalyzer()
     analyzer.visit(tree)
 
     return analyzer.functions, analyzer.classes
 
 
-# GENERATION
-def walk_and_generate_json(base_dir):
-    result = {}
-    conf = get_toml(base_dir)
-    ignore_dirs = conf.get("scanner", {}).get("ignore_dirs", [])
-    ignore_files = conf.get("scanner", {}).get("ignore_files", [])
-    for root, dirs, files in os.walk(base_dir):
-        dirs[:] = [d for d in dirs if d not in ignore_dirs]
-        for file in files:
-            if file in ignore_files:
-                continue
-            if file.endswith(".py"):
-                file_path = os.path.join(root, file)
-                functions, classes = analyze_file(file_path)
+@functools.lru_cache(maxsize=1024)
+def _analyze_source(path, mtime_ns, size):
+    with open(path, "rb") as f:
+        return _analyze_bytes(f.read())
+
+
+def analyze_file(path, source=None):
+    """
+    Summarize path, reusing the previous result until the file changes on disk.
+
+    Callers that already hold the file's bytes pass them as source to skip
+    the read.
+    """
+    if source is not None:
+        return _analyze_bytes(source)
+    st = os.stat(path)
+    return _analyze_source(os.fspath(path), st.st_mtime_ns, st.st_size)
+
+
+# SCANNING
+def iter_python_files(base_dir, ignore_dirs=(), ignore_files=()):
+    """
+    Yield (file_name, file_path) for every .py file under base_dir.
+
+    Uses os.scandir directly so directory entries are classified from the
+    readdir data (no extra stat per entry), pruning ignored directories
+    before descending into them. Order matches a top-down os.walk.
+    """
+    ignore_dirs = frozenset(ignore_dirs)
+    ignore_files = frozenset(ignore_files)
+    pending = [base_dir]
+    while pending:
+        current = pending.pop()
+        subdirs = []
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in ignore_dirs:
+                            subdirs.append(entry.path)
+                    elif entry.name.endswith(".py") and entry.name not in ignore_files:
+                        yield entry.name, entry.path
+        except OSError:
+            continue
+        pending.extend(reversed(subdirs))
+
+
+def analyze_files(paths):
+    """
+    Run analyze_file over paths, in order.
+
+    Large trees are spread over a process pool, since ast.parse holds the GIL
+    and threads wouldn't overlap it. Small trees, single-core machines and
+    platforms where the pool can't start fall back to a plain loop.
+    """
+    paths = list(paths)
+    if len(paths) >= PARALLEL_MIN_FILES and (os.cpu_count() or 1) > 1:
+        try:
+            with ProcessPoolExecutor() as pool:
+                return list(pool.map(analyze_file, paths, chunksize=16))
+        except (OSError, BrokenProcessPool):
+            pass
+    return [analyze_file(path) for path in paths]
+
+
+# CONTEXT STORE
+# Last context.json contents per path, tagged with the (mtime_ns, size) of our
+# own last write so that edits made by anything else force a re-read
+_context_cache = {}
+# Serializes read-modify-write of context.json across watcher workers
+_context_lock = threading.Lock()
+
+
+def _context_path(base_dir):
+    return Path(base_dir, ".ghost", "context.json")
+
+
+def _context_stamp(output_json):
+    st = os.stat(output_json)
+    return st.st_mtime_ns, st.st_size
+
+
+def _load_context(output_json):
+    """Return the parsed context.json, re-reading it only if it changed on disk."""
+    stamp = _context_stamp(output_json)
+    cached = _context_cache.get(output_json)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    data = jsonio.loads(output_json.read_bytes())
+    _context_cache[output_json] = (stamp, data)
+    return data
+
+
+def _store_context(output_json, data):
+    """Write data to context.json (atomic replace) and remember it as the current contents."""
+    fd, tmp_path = tempfile.mkstemp(dir=output_json.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(jsonio.dump_bytes(data))
+        os.replace(tmp_path, output_json)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    _context_cache[output_json] = (_context_stamp(output_json), data)
 
-                if functions is None:
-                    continue
 
-                # Build readable summary string
-                func_part = "Functions: " + ", ".join(functions) if functions else "Functions: None"
+def preload_context(base_dir):
+    """Load <base_dir>/.ghost/context.json into the cache ahead of the first file event."""
+    try:
+        _load_context(_context_path(base_dir))
+    except (OSError, ValueError):
+        # Missing or corrupt; the first event will surface it as before
+        pass
 
-                class_parts = []
-                for cls, methods in classes.items():
-                    method_list = ", ".join(methods) if methods else "None"
-                    class_parts.append(f"{cls} [Methods: {method_list}]")
 
-                class_part = (
-                    "Classes: " + "; ".join(class_parts) if class_parts else "Classes: None"
-                )
+def _summarize(functions, classes):
+    """Build the readable context.json entry for one file."""
+    func_part = "Functions: " + ", ".join(functions) if functions else "Functions: None"
 
-                result[file] = f"{func_part}; {class_part}"
+    class_parts = []
+    for cls, methods in classes.items():
+        method_list = ", ".join(methods) if methods else "None"
+        class_parts.append(f"{cls} [Methods: {method_list}]")
+
+    class_part = "Classes: " + "; ".join(class_parts) if class_parts else "Classes: None"
+
+    return f"{func_part}; {class_part}"
+
+
+# GENERATION
+def walk_and_generate_json(base_dir, ignore_dirs=None, ignore_files=None):
+    result = {}
+    # Only read ghost.toml when the caller didn't pass the scanner settings
+    if ignore_dirs is None or ignore_files is None:
+        scanner = get_toml(base_dir).get("scanner", {})
+        if ignore_dirs is None:
+            ignore_dirs = scanner.get("ignore_dirs", [])
+        if ignore_files is None:
+            ignore_files = scanner.get("ignore_files", [])
+    files = list(iter_python_files(base_dir, ignore_dirs, ignore_files))
+    analyses = analyze_files(file_path for _, file_path in files)
+    for (file, _), analysis_result in zip(files, analyses):
+
+        # Skip files with syntax errors
+        if analysis_result is None:
+            continue
+        result[file] = _summarize(*analysis_result)
 
     # Save JSON
-    output_json = f"{base_dir}/.ghost/context.json"
-    with open(output_json, "w", encoding="utf-8") as f:
-        json.dump(result, f, indent=4)
+    with _context_lock:
+        _store_context(_context_path(base_dir), dict(result))
 
     return result
 
@@ -105,42 +239,45 @@ def walk_and_generate_json(base_dir):
 
 
 def walk_and_delete_json(base_dir, filename):
-    output_json = os.path.join(base_dir, ".ghost", "context.json")
+    output_json = _context_path(base_dir)
 
     # If JSON doesn't exist, nothing to delete
-    if not os.path.exists(output_json):
+    if not output_json.exists():
         return False
 
-    try:
-        with open(output_json, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except (json.JSONDecodeError, IOError):
-        # JSON invalid or unreadable
-        return False
+    with _context_lock:
+        try:
+            data = _load_context(output_json)
+        except (json.JSONDecodeError, IOError):
+            # JSON invalid or unreadable
+            return False
 
-    # If file not in JSON, nothing to delete
-    if filename not in data:
-        return False
+        # If file not in JSON, nothing to delete
+        if filename not in data:
+            return False
 
-    # Delete the key
-    del data[filename]
-
-    # Write updated JSON
-    with open(output_json, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4)
+        # Delete the key and write the updated JSON
+        del data[filename]
+        _store_context(output_json, data)
 
     return True
 
 
 # MODIFICATION
-def walk_and_modify_json(base_dir, file_path, file):
+def walk_and_modify_json(base_dir, file_path, file, source=None):
+    """
+    Refresh file's entry in context.json.
+
+    Returns ``{file: summary}``, or None when there is nothing to generate
+    tests for: the file is ignored, has syntax errors, or defines no
+    functions or classes.
+    """
     conf = get_toml(base_dir)
     result = {}
     ignore_files = conf.get("scanner", {}).get("ignore_files", [])
     if file not in ignore_files:
         if file.endswith(".py"):
-            # file_path = os.path.join(root, file)
-            analysis_result = analyze_file(file_path)
+            analysis_result = analyze_file(file_path, source)
 
             # Skip if file has syntax errors
             if analysis_result is None:
@@ -150,38 +287,24 @@ def walk_and_modify_json(base_dir, file_path, file):
             functions, classes = analysis_result
 
             if functions or classes:
+                result[file] = _summarize(functions, classes)
 
-                # Build readable summary string
-                func_part = "Functions: " + ", ".join(functions) if functions else "Functions: None"
-
-                class_parts = []
-                for cls, methods in classes.items():
-                    method_list = ", ".join(methods) if methods else "None"
-                    class_parts.append(f"{cls} [Methods: {method_list}]")
-
-                class_part = (
-                    "Classes: " + "; ".join(class_parts) if class_parts else "Classes: None"
-                )
-
-                result[file] = f"{func_part}; {class_part}"
-    output_json = f"{base_dir}/.ghost/context.json"
-    with open(output_json, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    data[file] = result[file]
-    walk_and_delete_json(base_dir, file)
-    with open(output_json, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4)
+    # Update this file's entry in place; the rest of the context is kept
+    output_json = _context_path(base_dir)
+    with _context_lock:
+        data = _load_context(output_json)
+        if file in result:
+            data[file] = result[file]
+        elif data.pop(file, None) is None:
+            return None
+        _store_context(output_json, data)
 
-    return result
+    return result or None
 
 
 # INITIALIZATION
-def ghost_init(path=os.getcwd()):
-    spinner = GhostSpinner("Initializing Ghost", style=SpinnerStyle.DOTS, color=Colors.MAGENTA)
-    spinner.start()
-    try:
-        pathh = f"{path}/ghost.toml"
-        text = """[project]
+# ghost.toml written by `python -m ghost.init`
+_DEFAULT_GHOST_TOML = b"""[project]
 name = "my-app"
 language = "python"
 
@@ -205,14 +328,32 @@ max_heal_attempts = 3
 [watcher]
 debounce_seconds = 15
 """
-        with open(pathh, "w") as f:
-            f.write(text)
-        Console.success("Created ghost.toml")
 
-        ghost_dir = f"{path}/.ghost"
-        if not os.path.exists(ghost_dir):
-            os.mkdir(ghost_dir)
+
+def ghost_init(path=None):
+    if path is None:
+        path = os.getcwd()
+    spinner = GhostSpinner("Initializing Ghost", style=SpinnerStyle.DOTS, color=Colors.MAGENTA)
+    spinner.start()
+    try:
+        root = Path(path)
+        config_file = root / "ghost.toml"
+        try:
+            unchanged = config_file.read_bytes() == _DEFAULT_GHOST_TOML
+        except OSError:
+            unchanged = False
+        if unchanged:
+            Console.info("ghost.toml is up to date")
+        else:
+            config_file.write_bytes(_DEFAULT_GHOST_TOML)
+            Console.success("Created ghost.toml")
+
+        ghost_dir = root / ".ghost"
+        try:
+            ghost_dir.mkdir()
             Console.success("Created .ghost/ directory")
+        except FileExistsError:
+            pass
 
         walk_and_generate_json(path)
         Console.success("Generated context.json")
@@ -225,36 +366,10 @@ debounce_seconds = 15
 
 
 def main():
-    class CustomFormatter(logging.Formatter):
-        grey = "\x1b[38;20m"
-        yellow = "\x1b[33;20m"
-        red = "\x1b[31;20m"
-        bold_red = "\x1b[31;1m"
-        reset = "\x1b[0m"
-        format_str = "%(asctime)s - %(levelname)s - %(message)s"
-
-        FORMATS = {
-            logging.DEBUG: grey + format_str + reset,
-            logging.INFO: grey + format_str + reset,
-            logging.WARNING: yellow + format_str + reset,
-            logging.ERROR: red + format_str + reset,
-            logging.CRITICAL: bold_red + format_str + reset,
-        }
-
-        def format(self, record):
-            log_fmt = self.FORMATS.get(record.levelno)
-            formatter = logging.Formatter(log_fmt, datefmt="%Y-%m-%d %H:%M:%S")
-            return formatter.format(record)
-
-    # Set up logger
-    logger = logging.getLogger()
-    logger.setLevel(logging.INFO)  # Capture INFO and above
-
-    # Create console handler with a higher log level
-    ch = logging.StreamHandler()
-    ch.setLevel(logging.INFO)
-    ch.setFormatter(CustomFormatter())
-    logger.addHandler(ch)
+    # Imported here: ghost.main imports this module at load time
+    from ghost.main import logging_setup
+
+    logging_setup()
 
     # INITIALIZATION
     ghost_init()
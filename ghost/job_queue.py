@@ -29,7 +29,7 @@ class JobState(Enum):
 class Job:
     path: str
     callback: Callable[[str], Any]
-    created_at: float = field(default_factory=time.time)
+    created_at: float = field(default_factory=time.monotonic)
     state: JobState = JobState.PENDING
     error: Optional[str] = None
 
@@ -38,13 +38,22 @@ class TimerDebouncer:
     """Debounce layer: one timer per file path.
 
     Each new submit() for a path resets its timer. Only after *delay* seconds
-    with no new events does the job proceed to the queue.
+    with no new events does the job proceed to the queue. With *max_wait*
+    set, a path that keeps receiving events is still released once that many
+    seconds have passed since its first pending event.
     """
 
-    def __init__(self, on_ready: Callable[[str], None], delay: float = 2.0):
+    def __init__(
+        self,
+        on_ready: Callable[[str], None],
+        delay: float = 2.0,
+        max_wait: Optional[float] = None,
+    ):
         self._on_ready = on_ready
         self._delay = delay
+        self._max_wait = max_wait
         self._timers: dict[str, threading.Timer] = {}
+        self._first_seen: dict[str, float] = {}
         self._lock = threading.Lock()
 
     def submit(self, path: str) -> None:
@@ -52,7 +61,12 @@ class TimerDebouncer:
             existing = self._timers.get(path)
             if existing is not None:
                 existing.cancel()
-            timer = threading.Timer(self._delay, self._fire, args=[path])
+            delay = self._delay
+            if self._max_wait:
+                now = time.monotonic()
+                first = self._first_seen.setdefault(path, now)
+                delay = max(0.0, min(delay, first + self._max_wait - now))
+            timer = threading.Timer(delay, self._fire, args=[path])
             timer.daemon = True
             timer.start()
             self._timers[path] = timer
@@ -60,11 +74,13 @@ class TimerDebouncer:
     def _fire(self, path: str) -> None:
         with self._lock:
             self._timers.pop(path, None)
+            self._first_seen.pop(path, None)
         self._on_ready(path)
 
     def cancel(self, path: Optional[str] = None) -> None:
         with self._lock:
             if path:
+                self._first_seen.pop(path, None)
                 timer = self._timers.pop(path, None)
                 if timer:
                     timer.cancel()
@@ -72,6 +88,7 @@ class TimerDebouncer:
                 for timer in self._timers.values():
                     timer.cancel()
                 self._timers.clear()
+                self._first_seen.clear()
 
     @property
     def pending_paths(self) -> list[str]:
@@ -80,16 +97,19 @@ class TimerDebouncer:
 
 
 class JobQueue:
-    """Ordered, single-worker job queue with per-file dedup.
+    """Ordered job queue with per-file dedup.
 
     The watchdog handler should call ``queue.submit(path, callback)``.
-    The worker picks up jobs in FIFO order and runs them on a single thread.
+    Workers pick up jobs in FIFO order. Different files may run in parallel
+    when ``max_workers > 1``, but a given file is never processed by two
+    workers at once.
     """
 
     def __init__(
         self,
         debounce_seconds: float = 2.0,
         max_workers: int = 1,
+        max_wait_seconds: Optional[float] = None,
     ):
         self._debounce_seconds = debounce_seconds
         self._max_workers = max_workers
@@ -97,10 +117,16 @@ class JobQueue:
         self._workers: list[threading.Thread] = []
         self._running = False
         self._active: OrderedDict[str, Job] = OrderedDict()
+        # Jobs sitting in the worker queue, not yet picked up, by path
+        self._queued: dict[str, Job] = {}
+        # Paths a worker is processing, and the next job held back for each
+        self._in_progress: set[str] = set()
+        self._deferred: dict[str, Job] = {}
         self._lock = threading.Lock()
         self._debouncer = TimerDebouncer(
             on_ready=self._enqueue,
             delay=debounce_seconds,
+            max_wait=max_wait_seconds,
         )
 
     def submit(self, path: str, callback: Callable[[str], Any]) -> None:
@@ -145,8 +171,15 @@ class JobQueue:
     def _enqueue(self, path: str) -> None:
         with self._lock:
             job = self._active.pop(path, None)
-        if job is not None:
-            self._queue.put(job)
+            if job is None:
+                return
+            queued = self._queued.get(path)
+            if queued is not None:
+                # Still waiting behind another job: one run covers both events
+                queued.callback = job.callback
+                return
+            self._queued[path] = job
+        self._queue.put(job)
 
     def _worker_loop(self) -> None:
         while self._running:
@@ -155,6 +188,16 @@ class JobQueue:
             except Empty:
                 continue
 
+            with self._lock:
+                if self._queued.get(job.path) is job:
+                    del self._queued[job.path]
+                if job.path in self._in_progress:
+                    # Another worker has this file; run once it finishes
+                    self._deferred[job.path] = job
+                    self._queue.task_done()
+                    continue
+                self._in_progress.add(job.path)
+
             job.state = JobState.RUNNING
             try:
                 job.callback(job.path)
@@ -163,4 +206,9 @@ class JobQueue:
                 job.state = JobState.FAILED
                 job.error = f"{type(exc).__name__}: {exc}"
             finally:
+                with self._lock:
+                    self._in_progress.discard(job.path)
+                    deferred = self._deferred.pop(job.path, None)
+                if deferred is not None:
+                    self._queue.put(deferred)
                 self._queue.task_done()
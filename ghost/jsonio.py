@@ -0,0 +1,35 @@
+"""
+JSON helpers - Use orjson when it is installed, the standard library otherwise.
+
+orjson is an optional speedup (``pip install ghosttest[fast]``); the produced
+JSON is equivalent either way.
+"""
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # Optional dependency
+    orjson = None
+
+
+def dumps_indented(obj: Any) -> str:
+    """Serialize *obj* to 2-space indented JSON text."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode("utf-8")
+    return json.dumps(obj, indent=2, ensure_ascii=False)
+
+
+def dump_bytes(obj: Any) -> bytes:
+    """Serialize *obj* to 2-space indented UTF-8 JSON bytes, ready to write to disk."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Deserialize JSON from bytes or text."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,259 @@
+"""
+LLM response cache - Skip repeated round-trips for identical prompts.
+
+Responses are stored under ``.ghost/llm_cache/<sha256>.txt`` in the project,
+keyed by the provider, the model, the full message list and the sampling
+temperature.
+Only low-temperature calls are cached, since those are (near) deterministic.
+
+Test generation is additionally keyed by a structural fingerprint of the
+source file, so edits that can't change the tests (whitespace, comments,
+docstrings, renamed local variables) reuse the previously generated tests.
+
+Entries expire after ``DEFAULT_TTL_SECONDS`` (``ai.cache_ttl_seconds``); hit/miss counts are kept in
+``stats.json`` next to the entries.
+"""
+
+import ast
+import atexit
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from ghost import jsonio
+
+# Calls sampled above this temperature are not cached
+MAX_CACHEABLE_TEMPERATURE = 0.1
+
+# Entries older than this are treated as misses
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+
+STATS_FILE = "stats.json"
+
+# A write merges pending counts into stats.json at most this often (and at exit)
+STATS_FLUSH_INTERVAL = 30.0
+
+# Hit/miss counts not yet merged into each cache's stats.json
+_pending_stats: Dict[Path, Dict[str, int]] = {}
+_last_flush: Dict[Path, float] = {}
+_stats_lock = threading.Lock()
+
+
+def source_fingerprint(source_code: str) -> str:
+    """Hash the structure of *source_code*, ignoring edits that can't change its tests.
+
+    Formatting, comments, docstrings and the names of function-local variables
+    don't contribute. Falls back to whitespace-collapsed text when the source
+    doesn't parse.
+    """
+    try:
+        tree = ast.parse(source_code)
+    except (SyntaxError, ValueError):
+        normalized = " ".join(source_code.split())
+    else:
+        _strip_docstrings(tree)
+        _rename_locals(tree)
+        normalized = ast.dump(tree)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+_SCOPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)
+
+
+def _strip_docstrings(tree: ast.Module) -> None:
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Module, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            body = node.body
+            if (
+                body
+                and isinstance(body[0], ast.Expr)
+                and isinstance(body[0].value, ast.Constant)
+                and isinstance(body[0].value.value, str)
+            ):
+                node.body = body[1:] or [ast.Pass()]
+
+
+def _rename_locals(tree: ast.Module) -> None:
+    """Give every function's local variables positional names.
+
+    Parameters, globals and nonlocals keep their names: callers and tests can
+    see those. The placeholders aren't valid identifiers, so they can't clash
+    with real names.
+    """
+    functions = [
+        n for n in ast.walk(tree) if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))
+    ]
+    for index, func in enumerate(functions):
+        args = func.args
+        params = {a.arg for a in (*args.posonlyargs, *args.args, *args.kwonlyargs)}
+        params.update(a.arg for a in (args.vararg, args.kwarg) if a is not None)
+
+        declared = set()
+        stored = {}  # dict keeps first-seen order, which depends only on structure
+        stack = list(reversed(func.body))
+        while stack:
+            node = stack.pop()
+            if isinstance(node, (ast.Global, ast.Nonlocal)):
+                declared.update(node.names)
+            elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+                stored.setdefault(node.id)
+            if not isinstance(node, _SCOPES):
+                stack.extend(reversed(list(ast.iter_child_nodes(node))))
+
+        names = [name for name in stored if name not in params and name not in declared]
+        if not names:
+            continue
+        mapping = {name: f"<{index}.{i}>" for i, name in enumerate(names)}
+        for node in ast.walk(func):
+            if isinstance(node, ast.Name) and node.id in mapping:
+                node.id = mapping[node.id]
+
+
+class ResponseCache:
+    """On-disk cache of raw LLM responses for a single project."""
+
+    def __init__(self, cache_dir: Union[str, Path], ttl: Optional[float] = DEFAULT_TTL_SECONDS):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+
+    @classmethod
+    def for_project(
+        cls, source_path: Union[str, Path], ttl: Optional[float] = DEFAULT_TTL_SECONDS
+    ) -> "ResponseCache":
+        """Return the cache living in ``<source_path>/.ghost/llm_cache``."""
+        return cls(Path(source_path) / ".ghost" / "llm_cache", ttl=ttl)
+
+    @staticmethod
+    def make_key(
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        provider: str = "",
+        max_tokens: Optional[int] = None,
+    ) -> str:
+        """Build a stable cache key for a chat request."""
+        request = {"p": provider, "m": model, "msgs": messages, "t": temperature}
+        if max_tokens is not None:
+            # A capped reply may be cut short; never serve it for an uncapped request
+            request["n"] = max_tokens
+        payload = json.dumps(
+            request,
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def make_source_key(
+        model: str,
+        framework: str,
+        filename: str,
+        source_code: str,
+        prompt_version: str = "",
+        provider: str = "",
+    ) -> str:
+        """Build a cache key for generated tests that survives cosmetic source edits."""
+        payload = json.dumps(
+            {
+                "p": provider,
+                "m": model,
+                "fw": framework,
+                "file": filename,
+                "src": source_fingerprint(source_code),
+                "pv": prompt_version,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def is_cacheable(temperature: float) -> bool:
+        """Whether a call at *temperature* is deterministic enough to cache."""
+        return temperature <= MAX_CACHEABLE_TEMPERATURE
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.txt"
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for *key*, or None on a miss or expired entry."""
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                if self.ttl and time.time() - os.fstat(f.fileno()).st_mtime > self.ttl:
+                    response = None
+                else:
+                    response = f.read()
+        except (FileNotFoundError, OSError):
+            response = None
+        self._count("hits" if response is not None else "misses")
+        return response
+
+    def set(self, key: str, response: str) -> None:
+        """Store *response* under *key* (atomic replace, errors ignored)."""
+        self._write(self._path(key), response)
+        # Merging stats costs a read and a write of stats.json, so don't do it per entry
+        if (
+            time.monotonic() - _last_flush.get(self.cache_dir, float("-inf"))
+            >= STATS_FLUSH_INTERVAL
+        ):
+            self.flush_stats()
+
+    def _write(self, path: Path, text: str) -> None:
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(text)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError:
+            # A cache write failure must never break test generation
+            pass
+
+    # ── Statistics ───────────────────────────────────────────────────────
+
+    def _count(self, outcome: str) -> None:
+        with _stats_lock:
+            counts = _pending_stats.setdefault(self.cache_dir, {"hits": 0, "misses": 0})
+            counts[outcome] += 1
+
+    def _read_stats(self) -> Dict[str, int]:
+        try:
+            stored = jsonio.loads((self.cache_dir / STATS_FILE).read_bytes())
+        except (OSError, ValueError):
+            stored = {}
+        return {"hits": int(stored.get("hits", 0)), "misses": int(stored.get("misses", 0))}
+
+    def stats(self) -> Dict[str, int]:
+        """Cumulative hit/miss counts for this cache, including unflushed ones."""
+        totals = self._read_stats()
+        with _stats_lock:
+            pending = dict(_pending_stats.get(self.cache_dir, {}))
+        for outcome, count in pending.items():
+            totals[outcome] += count
+        return totals
+
+    def flush_stats(self) -> None:
+        """Merge this process's hit/miss counts into ``stats.json``."""
+        with _stats_lock:
+            _last_flush[self.cache_dir] = time.monotonic()
+            pending = _pending_stats.pop(self.cache_dir, None)
+            if not pending:
+                return
+            totals = self._read_stats()
+            for outcome, count in pending.items():
+                totals[outcome] += count
+            self._write(self.cache_dir / STATS_FILE, json.dumps(totals))
+
+
+@atexit.register
+def _flush_all_stats() -> None:
+    for cache_dir in list(_pending_stats):
+        ResponseCache(cache_dir).flush_stats()
@@ -1,27 +1,44 @@
 import logging
 import os
-import time
+import re
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
 from watchdog.events import FileSystemEvent, FileSystemEventHandler
 from watchdog.observers import Observer
 
 from ghost import init as ghost_init_module
-from ghost.chat import TestGenerator
 from ghost.config import get_config
-from ghost.console import Colors, Console, GhostSpinner, SpinnerStyle, countdown
-from ghost.runner import classify_error, run_test
+from ghost.console import Colors, Console, GhostSpinner, SpinnerStyle
+from ghost.runner import DEFAULT_TREE_IGNORE_DIRS, classify_error, run_test_cached
+
+if TYPE_CHECKING:
+    from ghost.chat import TestGenerator
 
 
 # Utility function to extract file name from path
 def getFileNameFromPath(path: str) -> str:
-    # Extracts the file name from a given path
-    parts = path.replace("\\", "/").split("/")
-    return parts[-1]
+    # Extracts the file name from a given path (either separator style) without
+    # copying the whole path first
+    return path.rpartition("/")[2].rpartition("\\")[2]
+
+
+def _test_file_path(file_path: str, source_path: str) -> Path:
+    """Where the generated tests for file_path live: <source_path>/tests/test_<name>."""
+    return Path(source_path) / "tests" / f"test_{getFileNameFromPath(file_path)}"
 
 
 def logging_setup():
+    class LevelFormatter(logging.Formatter):
+        # The timestamp only has one-second resolution, so render it once per second
+        _last_time = (None, "")
+
+        def formatTime(self, record, datefmt=None):
+            second = int(record.created)
+            if self._last_time[0] != second:
+                self._last_time = (second, super().formatTime(record, datefmt))
+            return self._last_time[1]
+
     class CustomFormatter(logging.Formatter):
         grey = "\x1b[38;20m"
         yellow = "\x1b[33;20m"
@@ -38,10 +55,17 @@ def logging_setup():
             logging.CRITICAL: bold_red + format_str + reset,
         }
 
+        def __init__(self):
+            super().__init__()
+            # Build the per-level formatters once, not per record
+            self._formatters = {
+                level: LevelFormatter(log_fmt, datefmt="%Y-%m-%d %H:%M:%S")
+                for level, log_fmt in self.FORMATS.items()
+            }
+            self._fallback = LevelFormatter(datefmt="%Y-%m-%d %H:%M:%S")
+
         def format(self, record):
-            log_fmt = self.FORMATS.get(record.levelno)
-            formatter = logging.Formatter(log_fmt, datefmt="%Y-%m-%d %H:%M:%S")
-            return formatter.format(record)
+            return self._formatters.get(record.levelno, self._fallback).format(record)
 
     # Set up logger
     logger = logging.getLogger()
@@ -54,45 +78,49 @@ def logging_setup():
     logger.addHandler(ch)
 
 
+# Paths and file names the watcher never generates tests for
+_IGNORED_PATH_RE = re.compile(r"[\\/]tests(?:[\\/]|$)|\.py~$")
+_IGNORED_NAME_RE = re.compile(r"^\.git|test|tmp", re.IGNORECASE)
+
+# Larger sources are almost always generated or vendored; don't send them to the LLM
+MAX_SOURCE_BYTES = 256 * 1024
+
+
 # Function to check if the path should be logged
 def CheckPath(file: str, full_path: str = "") -> bool:
-    # Placeholder for path validation logic
-
-    # Check if path is in tests directory (check full path, not just filename)
-    if full_path:
-        normalized_path = full_path.replace("\\", "/")
-        if "/tests/" in normalized_path or normalized_path.endswith("/tests"):
-            logging.debug("Ignoring file in tests directory: %s", file)
-            return False
-    if full_path.endswith(".py~"):
-        logging.debug("Ignoring temporary file: %s", file)
-        return False
-    if "/tests/" in full_path:
-        logging.debug("Ignoring file in tests directory: %s", file)
-        return False
-    if "test" in file.lower() or "tmp" in file.lower():
-        logging.debug("Ignoring test or tmp file: %s", file)
+    if not file.endswith(".py"):
+        logging.debug("Ignoring non-Python file: %s", file)
         return False
-    if file.startswith(".git") or file.endswith(".log"):
-        logging.debug("Ignoring file: %s", file)
+    # The short file name is the cheaper scan, so it goes first
+    if _IGNORED_NAME_RE.search(file):
+        logging.debug("Ignoring test, tmp or git file: %s", file)
         return False
-    if ".py" not in file:
-        logging.debug("Ignoring non-Python file: %s", file)
+    # Files under a tests directory and editor backups (check full path, not just filename)
+    if full_path and _IGNORED_PATH_RE.search(full_path):
+        logging.debug("Ignoring test-directory or temporary file: %s", file)
         return False
     return True
 
 
+def _generator(source_path) -> "TestGenerator":
+    """TestGenerator for the project at source_path (providers are shared across instances)."""
+    # Imported here so `ghost init` (which only needs logging_setup) skips the LLM stack
+    from ghost.chat import TestGenerator
+
+    # Loading the project config also loads its .env
+    return TestGenerator(config=get_config(Path(source_path) if source_path else None))
+
+
 def check_test(file_path: str, source_path: str, file: str) -> bool:
     attempt_count = 0
+    generator = None
     spinner1 = GhostSpinner("Running tests", style=SpinnerStyle.DOTS, color=Colors.CYAN)
     while attempt_count < 3:
         attempt_count += 1
         spinner1.start()
-        folder_path = "/".join(str(source_path).replace("\\", "/").split("/")[:])
-        folder_path = f"{folder_path}/tests"
-        test_file_path = f"{folder_path}/test_{getFileNameFromPath(file_path)}"
+        test_file_path = str(_test_file_path(file_path, source_path))
         cont = ReadFile(test_file_path)
-        return_code, stdout, stderr = run_test(test_file_path, source_path)
+        return_code, stdout, stderr = run_test_cached(test_file_path, source_path, file_path)
         errors = {"return_code": return_code, "stderr": stderr, "stdout": stdout}
         error_type = classify_error(stderr, stdout)
         curr_path = str(source_path)
@@ -101,15 +129,15 @@ def check_test(file_path: str, source_path: str, file: str) -> bool:
 
             if error_type in ("SYNTAX", "RUNTIME", "UNKNOWN"):
                 Console.warning(f"Errors detected in {test_file_path}")
-                countdown(5, "Preparing to heal")
 
                 spinner2 = GhostSpinner(
                     "Healing test file", style=SpinnerStyle.DOTS2, color=Colors.MAGENTA
                 )
                 spinner2.start()
-                config = get_config(Path(source_path) if source_path else None)
-                generator = TestGenerator(config=config)
-                code = generator.get_test_code(cont, curr_path, file, True, test_file_path, errors)
+                generator = generator or _generator(source_path)
+                code = generator.get_test_code(
+                    cont, curr_path, file, True, test_file_path, errors, existing_code=cont
+                )
                 WriteTest(file_path, code, source_path)
                 spinner2.stop(message="Test healed successfully")
             elif error_type == "LOGIC":
@@ -118,11 +146,11 @@ def check_test(file_path: str, source_path: str, file: str) -> bool:
                     "Consulting the judge", style=SpinnerStyle.DOTS, color=Colors.YELLOW
                 )
                 spinner3.start()
-                countdown(5, "Analyzing code")
 
-                config = get_config(Path(source_path) if source_path else None)
-                judge = TestGenerator(config=config)
-                result = judge.consult_the_judge(cont, curr_path, file, test_file_path, errors)
+                generator = generator or _generator(source_path)
+                result, fix = generator.consult_the_judge_with_fix(
+                    cont, curr_path, file, test_file_path, errors, test_code=cont
+                )
                 spinner3.stop(message="Judge verdict received")
 
                 Console.verdict(result == "BUG_IN_CODE")
@@ -135,15 +163,11 @@ def check_test(file_path: str, source_path: str, file: str) -> bool:
                     Console.newline()
                     break
                 elif result == "FIX_TEST":
-                    countdown(5, "Preparing fix")
                     spinner4 = GhostSpinner(
                         "Fixing tests", style=SpinnerStyle.DOTS2, color=Colors.MAGENTA
                     )
                     spinner4.start()
-                    generator = TestGenerator(config=config)
-                    code = generator.get_test_code(
-                        cont, curr_path, file, True, test_file_path, errors
-                    )
+                    code = fix.result()
                     WriteTest(file_path, code, source_path)
                     spinner4.stop(message="Tests fixed successfully")
 
@@ -166,17 +190,12 @@ def make_tests(file_path, content, source_path="", file="") -> None:
     curr_path = str(source_path)
     flag = False
     try:
-        # Load config from the source path to ensure .env is loaded
-        config = get_config(Path(source_path) if source_path else None)
-        generator = TestGenerator(config=config)
-        code = generator.get_test_code(content, curr_path, file)
+        code = _generator(source_path).get_test_code(content, curr_path, file)
         WriteTest(file_path, code, source_path)
         flag = True
         spinner.stop(message=f"Tests generated for {file}")
     except Exception as e:
         spinner.fail(message=f"Failed to generate tests: {e}")
-    finally:
-        countdown(2, "Cooldown")
     if not flag:
         return
     check_test(file_path, source_path, file)
@@ -193,37 +212,82 @@ def ReadFile(file_path: str) -> Optional[str]:
         return None
 
 
+def ReadSource(file_path: str) -> bytes:
+    """Read a watched source file in one call, refusing files over MAX_SOURCE_BYTES.
+
+    Raises OSError if the file can't be read and ValueError if it is too large.
+    """
+    fd = os.open(file_path, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        if size > MAX_SOURCE_BYTES:
+            raise ValueError(f"file too large ({size // 1024} KB > {MAX_SOURCE_BYTES // 1024} KB)")
+        return os.read(fd, size)
+    finally:
+        os.close(fd)
+
+
+def schedule_project_watches(observer, handler, root: str, ignore_dirs) -> dict:
+    """Watch root's own files plus each top-level directory not in ignore_dirs.
+
+    A single recursive watch on root would also cover .git, .venv, node_modules and
+    the like, flooding the handler with events and using up inotify watches.
+    Returns the top-level directory watches, keyed by path.
+    """
+    observer.schedule(handler, path=root, recursive=False)
+    watches = {}
+    with os.scandir(root) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False) and entry.name not in ignore_dirs:
+                watches[entry.path] = observer.schedule(handler, path=entry.path, recursive=True)
+    return watches
+
+
+def watch_new_top_level_dir(
+    observer, handler, path: str, root: str, ignore_dirs, watches: dict
+) -> None:
+    """Start watching a directory created (or moved) directly under root after startup."""
+    if (
+        os.path.dirname(path) == root
+        and os.path.basename(path) not in ignore_dirs
+        and path not in watches
+        and os.path.isdir(path)
+        and not os.path.islink(path)
+    ):
+        watches[path] = observer.schedule(handler, path=path, recursive=True)
+
+
+def unwatch_top_level_dir(observer, path: str, watches: dict) -> None:
+    """Stop watching a top-level directory that was deleted or moved away."""
+    watch = watches.pop(path, None)
+    if watch is None:
+        return
+    try:
+        observer.unschedule(watch)
+    except KeyError:
+        # The observer already dropped the watch along with its directory
+        pass
+
+
 # Write Test File
 def WriteTest(file_path: str, test_code: str, source_path: str) -> None:
-    folder_path = "/".join(str(source_path).replace("\\", "/").split("/")[:])
-    folder_path = f"{folder_path}/tests"
-    if not os.path.exists(folder_path):
-        os.makedirs(folder_path)
-
-    test_file_path = f"{folder_path}/test_{getFileNameFromPath(file_path)}"
-    with open(test_file_path, "w") as test_file:
-        test_file.write(test_code)
+    test_file_path = _test_file_path(file_path, source_path)
+    test_file_path.parent.mkdir(parents=True, exist_ok=True)
+    test_file_path.write_text(test_code)
     Console.success(f"Test file written: {test_file_path}")
 
 
 # Watchdog Event Handler
 def start_watching(path_to_watch):
-    from pathlib import Path
-
-    from dotenv import load_dotenv
-
-    from ghost.config import get_config
     from ghost.job_queue import JobQueue
 
-    project_path = Path(path_to_watch).resolve()
-    env_file = project_path / ".env"
-    if env_file.exists():
-        load_dotenv(env_file, override=True)
-
-    config = get_config(project_path)
+    # get_config() also loads the project's .env
+    config = get_config(Path(path_to_watch).resolve())
+    ghost_init_module.preload_context(path_to_watch)
     queue = JobQueue(
         debounce_seconds=config.watcher.debounce_seconds,
-        max_workers=1,
+        max_wait_seconds=config.watcher.max_wait_seconds,
+        max_workers=max(1, config.watcher.max_workers),
     )
     queue.start()
 
@@ -231,12 +295,27 @@ def start_watching(path_to_watch):
         def _process_file(self, file_path: str) -> None:
             file = getFileNameFromPath(file_path)
             Console.file_changed(file, "modified")
-            content = ReadFile(file_path)
-            result = ghost_init_module.walk_and_modify_json(path_to_watch, file_path, file)
+            # Read once; the same bytes feed the context update and generation
+            try:
+                source = ReadSource(file_path)
+            except OSError:
+                return
+            except ValueError as e:
+                Console.warning(f"Skipping {file}: {e}")
+                return
+            result = ghost_init_module.walk_and_modify_json(
+                path_to_watch, file_path, file, source=source
+            )
             if result is not None:
+                content = source.decode("utf-8", errors="ignore")
                 make_tests(file_path, content, str(path_to_watch), file)
 
         def on_created(self, event: FileSystemEvent) -> None:
+            if event.is_directory:
+                watch_new_top_level_dir(
+                    observer, self, str(event.src_path), watch_root, ignore_dirs, watches
+                )
+                return
             pathhh = str(event.src_path)
             if pathhh.endswith("~"):
                 event.src_path = pathhh[:-1]
@@ -247,6 +326,9 @@ def start_watching(path_to_watch):
                 Console.file_changed(file, "created")
 
         def on_deleted(self, event: FileSystemEvent) -> None:
+            if event.is_directory:
+                unwatch_top_level_dir(observer, str(event.src_path), watches)
+                return
             pathhh = str(event.src_path)
             if pathhh.endswith("~"):
                 event.src_path = pathhh[:-1]
@@ -266,16 +348,28 @@ def start_watching(path_to_watch):
                 if CheckPath(file, str(event.src_path)):
                     queue.submit(str(event.src_path), self._process_file)
 
+        def on_moved(self, event: FileSystemEvent) -> None:
+            # The recursive watch follows the directory, but reports its old path
+            if event.is_directory:
+                unwatch_top_level_dir(observer, str(event.src_path), watches)
+                watch_new_top_level_dir(
+                    observer, self, str(event.dest_path), watch_root, ignore_dirs, watches
+                )
+
     event_handler = MyEventHandler()
     observer = Observer()
-    observer.schedule(event_handler, path=path_to_watch, recursive=True)
+    watch_root = os.path.abspath(path_to_watch)
+    ignore_dirs = DEFAULT_TREE_IGNORE_DIRS.union(config.scanner.ignore_dirs)
+    watches = schedule_project_watches(observer, event_handler, watch_root, ignore_dirs)
     observer.start()
     Console.success(f"Monitoring started: {path_to_watch}")
     Console.info("Press Ctrl+C to stop monitoring")
     Console.newline()
     try:
-        while True:
-            time.sleep(1)
+        # Join in short slices: an unbounded join can't be interrupted by
+        # Ctrl+C on Windows, a timed one lets KeyboardInterrupt through
+        while observer.is_alive():
+            observer.join(1)
     finally:
         queue.stop()
         observer.stop()
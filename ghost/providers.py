@@ -11,14 +11,20 @@ Supports:
 - Any OpenAI-compatible API
 """
 
+import functools
+import logging
 import os
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
 from dataclasses import dataclass
 from enum import Enum
-from typing import Dict, List, Optional
+from threading import Event
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
 
 from ghost.console import Console
-from ghost.rate_limiter import RateLimiter, call_with_retry
+from ghost.rate_limiter import RateLimiter, call_with_retry, estimate_tokens
 
 
 class ProviderType(Enum):
@@ -162,9 +168,183 @@ PROVIDER_MODELS: Dict[str, List[str]] = {
 # ═══════════════════════════════════════════════════════════════════════════════
 
 
+@functools.lru_cache(maxsize=None)
+def _http_client():
+    """
+    Return the httpx client every SDK client sends its requests through.
+
+    One connection pool serves all providers, so a process pays for each TCP
+    and TLS handshake once. HTTP/2 multiplexing is used when ``h2`` is
+    installed (``pip install ghosttest[fast]``).
+    """
+    import importlib.util
+
+    import httpx
+
+    return httpx.Client(
+        http2=importlib.util.find_spec("h2") is not None,
+        limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+        follow_redirects=True,  # Same as the SDKs' default client
+    )
+
+
+@functools.lru_cache(maxsize=8)
+def _probe_local_server(url: str) -> bool:
+    """
+    Return True if a local model server answers *url* with HTTP 200.
+
+    Results (including failures) are memoized for the life of the process,
+    so auto-detection and status listings probe each server at most once.
+    """
+    try:
+        import requests
+
+        response = requests.get(url, timeout=2)
+        return response.status_code == 200
+    except Exception:
+        return False
+
+
+def _log_prompt_cache_usage(usage) -> None:
+    """Log how many prompt tokens the provider served from its prefix cache."""
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", 0) or 0
+    if prompt_tokens:
+        logging.debug(
+            "Prompt cache: %d/%d prompt tokens cached (%.0f%%)",
+            cached_tokens,
+            prompt_tokens,
+            100.0 * cached_tokens / prompt_tokens,
+        )
+
+
+def _logging_usage() -> bool:
+    """Whether prompt-cache usage would be logged, which needs the end of a stream."""
+    return logging.getLogger().isEnabledFor(logging.DEBUG)
+
+
+class GenerationCancelled(Exception):
+    """A streamed response was abandoned because its caller no longer needs it."""
+
+
+# Set while running speculative work; streamed responses stop once the event is set
+_cancel_event: ContextVar[Optional[Event]] = ContextVar("ghost_cancel_event", default=None)
+
+
+def run_cancellable(cancel: Event, func, *args, **kwargs):
+    """
+    Call *func*, aborting any response it streams once *cancel* is set.
+
+    The abort raises GenerationCancelled out of *func* and closes the
+    connection, so no more output tokens are read or cached.
+    """
+    token = _cancel_event.set(cancel)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _cancel_event.reset(token)
+
+
+def _collect_stream(chunks, stop_at_fence: bool = True) -> str:
+    """
+    Join the text deltas of a streamed chat completion.
+
+    With *stop_at_fence*, stops reading once a complete fenced code block
+    has arrived, since anything after it is discarded by the response
+    cleaner anyway.
+    """
+
+    def deltas():
+        for chunk in chunks:
+            # OpenAI reports usage on a final chunk, Groq under x_groq
+            usage = getattr(chunk, "usage", None)
+            if usage is None:
+                usage = getattr(getattr(chunk, "x_groq", None), "usage", None)
+            _log_prompt_cache_usage(usage)
+            if chunk.choices:
+                yield chunk.choices[0].delta.content or ""
+
+    stopped_early = True  # Also close when cancelled mid-stream
+    try:
+        text, stopped_early = _join_until_code_block(deltas(), stop_at_fence)
+    finally:
+        if stopped_early:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+    return text
+
+
+def _join_until_code_block(deltas, stop_at_fence: bool = True) -> Tuple[str, bool]:
+    """
+    Join text deltas until a complete fenced code block has arrived.
+
+    Without *stop_at_fence* every delta is read.
+
+    Only a response that opens with a fence can stop early, and only fences
+    at the start of a line count, so backticks inside unfenced code (string
+    literals, comments) never cut it short.
+
+    Returns the text and whether reading stopped before the stream ended.
+    Raises GenerationCancelled if the surrounding run_cancellable() is cancelled.
+    """
+    cancel = _cancel_event.get()
+    parts: List[str] = []
+    fenced = None  # Unknown until the first non-blank text arrives
+    fences = 0
+    run = 0  # Backticks opening the current line so far; -1 once it has other text
+    for delta in deltas:
+        if cancel is not None and cancel.is_set():
+            raise GenerationCancelled()
+        if not delta:
+            continue
+        parts.append(delta)
+        if fenced is False or not stop_at_fence:
+            continue
+        if "`" not in delta and "\n" not in delta:
+            if delta.strip(" \t") or run > 0:
+                run = -1
+                if fenced is None:
+                    fenced = False
+            continue
+
+        # Count fences incrementally; only this delta is scanned, never the buffer
+        for ch in delta:
+            if ch == "\n":
+                run = 0
+            elif run < 0 or (ch in " \t" and run == 0):
+                continue
+            elif ch == "`":
+                run += 1
+                if run == 3:
+                    run = -1
+                    fenced = True
+                    fences += 1
+                    if fences == 2:
+                        return "".join(parts), True
+            else:
+                run = -1
+                if fenced is None:
+                    fenced = False
+                    break
+    return "".join(parts), False
+
+
 class BaseProvider(ABC):
     """Abstract base class for AI providers."""
 
+    # Stream completions so long responses can be cut short once complete
+    stream: bool = True
+
+    # Request field for an output-token cap; OpenAI's current models want the newer name
+    MAX_TOKENS_PARAM = "max_tokens"
+
+    # Extra request fields that make a stream end with a usage chunk
+    STREAM_USAGE_OPTIONS: Dict[str, Any] = {}
+
     def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
         self.api_key = api_key
         self.base_url = base_url
@@ -177,14 +357,21 @@ class BaseProvider(ABC):
 
     @property
     def client(self):
-        """Lazy-load the client."""
+        """Lazy-load the client (every client sends through _http_client()'s pool)."""
         if self._client is None:
             self._client = self._create_client()
         return self._client
 
     @abstractmethod
     @call_with_retry(max_retries=5, base_delay=2.0)
-    def chat(self, messages: List[Dict[str, str]], model: str, temperature: float = 0.1) -> str:
+    def chat(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float = 0.1,
+        max_tokens: Optional[int] = None,
+        stop_at_fence: bool = True,
+    ) -> str:
         """Send a chat completion request."""
         pass
 
@@ -193,6 +380,39 @@ class BaseProvider(ABC):
         """List available models."""
         pass
 
+    def _chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: Optional[int] = None,
+        stop_at_fence: bool = True,
+    ) -> str:
+        """Run an OpenAI-compatible chat completion, streaming when enabled."""
+        extra = {} if max_tokens is None else {self.MAX_TOKENS_PARAM: max_tokens}
+        if not self.stream:
+            response = self.client.chat.completions.create(
+                messages=messages,
+                model=model,
+                temperature=temperature,
+                **extra,
+            )
+            _log_prompt_cache_usage(getattr(response, "usage", None))
+            return response.choices[0].message.content
+
+        # Usage only arrives at the end of the stream, so read it all when it's logged
+        log_usage = _logging_usage()
+        if log_usage:
+            extra.update(self.STREAM_USAGE_OPTIONS)
+        chunks = self.client.chat.completions.create(
+            messages=messages,
+            model=model,
+            temperature=temperature,
+            stream=True,
+            **extra,
+        )
+        return _collect_stream(chunks, stop_at_fence=stop_at_fence and not log_usage)
+
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # GROQ PROVIDER
@@ -212,7 +432,7 @@ class GroqProvider(BaseProvider):
     def _create_client(self):
         from groq import Groq
 
-        return Groq(api_key=self.api_key)
+        return Groq(api_key=self.api_key, http_client=_http_client())
 
     @call_with_retry(max_retries=5, base_delay=2.0)
     def chat(
@@ -220,14 +440,11 @@ class GroqProvider(BaseProvider):
         messages: List[Dict[str, str]],
         model: str = "llama-3.3-70b-versatile",
         temperature: float = 0.1,
+        max_tokens: Optional[int] = None,
+        stop_at_fence: bool = True,
     ) -> str:
-        RateLimiter.wait()
-        response = self.client.chat.completions.create(
-            messages=messages,
-            model=model,
-            temperature=temperature,
-        )
-        return response.choices[0].message.content
+        RateLimiter.wait(estimate_tokens(messages))
+        return self._chat_completion(messages, model, temperature, max_tokens, stop_at_fence)
 
     def list_models(self) -> List[str]:
         return [
@@ -247,6 +464,8 @@ class OpenAIProvider(BaseProvider):
     """OpenAI API provider."""
 
     ENV_KEY = "OPENAI_API_KEY"
+    MAX_TOKENS_PARAM = "max_completion_tokens"
+    STREAM_USAGE_OPTIONS = {"stream_options": {"include_usage": True}}
 
     def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
         super().__init__(api_key or os.environ.get(self.ENV_KEY), base_url)
@@ -256,19 +475,19 @@ class OpenAIProvider(BaseProvider):
     def _create_client(self):
         from openai import OpenAI
 
-        return OpenAI(api_key=self.api_key, base_url=self.base_url)
+        return OpenAI(api_key=self.api_key, base_url=self.base_url, http_client=_http_client())
 
     @call_with_retry(max_retries=5, base_delay=2.0)
     def chat(
-        self, messages: List[Dict[str, str]], model: str = "gpt-4o-mini", temperature: float = 0.1
+        self,
+        messages: List[Dict[str, str]],
+        model: str = "gpt-4o-mini",
+        temperature: float = 0.1,
+        max_tokens: Optional[int] = None,
+        stop_at_fence: bool = True,
     ) -> str:
-        RateLimiter.wait()
-        response = self.client.chat.completions.create(
-            messages=messages,
-            model=model,
-            temperature=temperature,
-        )
-        return response.choices[0].message.content
+        RateLimiter.wait(estimate_tokens(messages))
+        return self._chat_completion(messages, model, temperature, max_tokens, stop_at_fence)
 
     def list_models(self) -> List[str]:
         return ["gpt-4o", "gpt-4o-mini", "gpt-4-turbo", "gpt-3.5-turbo"]
@@ -279,6 +498,73 @@ class OpenAIProvider(BaseProvider):
 # ═══════════════════════════════════════════════════════════════════════════════
 
 
+# Start of the per-request part of Ghost's generation prompts (single and batched)
+_TARGET_MARKER = "\nTARGET"
+
+
+def _text_blocks(text: str) -> List[Dict[str, Any]]:
+    """
+    Split a generation prompt into text blocks just before its TARGET section.
+
+    Everything ahead of TARGET is shared by every request in the project, so it
+    gets a block (and cache breakpoint) of its own.
+    """
+    split = text.find(_TARGET_MARKER)
+    if split <= 0:
+        return [{"type": "text", "text": text}]
+    return [
+        {"type": "text", "text": text[:split]},
+        {"type": "text", "text": text[split + 1 :]},
+    ]
+
+
+def _to_anthropic_messages(messages: List[Dict[str, str]]):
+    """
+    Convert chat messages to Anthropic's (system blocks, messages) format.
+
+    Consecutive messages with the same role become one turn of text blocks, and
+    a user prompt is split ahead of its TARGET section. Every block except the
+    final one gets a prompt-cache breakpoint, so the shared prefix (system
+    prompt, project context) is cached; Anthropic allows four.
+    """
+    system_blocks: List[Dict[str, Any]] = []
+    chat_messages: List[Dict[str, Any]] = []
+    for msg in messages:
+        if msg["role"] == "system":
+            system_blocks.append({"type": "text", "text": msg["content"]})
+            continue
+        content = (
+            _text_blocks(msg["content"])
+            if msg["role"] == "user"
+            else [{"type": "text", "text": msg["content"]}]
+        )
+        if chat_messages and chat_messages[-1]["role"] == msg["role"]:
+            chat_messages[-1]["content"].extend(content)
+        else:
+            chat_messages.append({"role": msg["role"], "content": content})
+
+    blocks = system_blocks + [b for m in chat_messages for b in m["content"]]
+    for block in blocks[:-1][-4:]:
+        block["cache_control"] = {"type": "ephemeral"}
+    return system_blocks, chat_messages
+
+
+def _anthropic_usage(usage):
+    """Map Anthropic's usage fields onto the prompt/cached token names logged above."""
+    if usage is None:
+        return None
+    cached = getattr(usage, "cache_read_input_tokens", 0) or 0
+    prompt_tokens = (
+        (getattr(usage, "input_tokens", 0) or 0)
+        + cached
+        + (getattr(usage, "cache_creation_input_tokens", 0) or 0)
+    )
+    return SimpleNamespace(
+        prompt_tokens=prompt_tokens,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=cached),
+    )
+
+
 class AnthropicProvider(BaseProvider):
     """Anthropic/Claude API provider."""
 
@@ -293,7 +579,7 @@ class AnthropicProvider(BaseProvider):
         try:
             import anthropic
 
-            return anthropic.Anthropic(api_key=self.api_key)
+            return anthropic.Anthropic(api_key=self.api_key, http_client=_http_client())
         except ImportError:
             raise ImportError("Please install anthropic: pip install anthropic")
 
@@ -303,25 +589,33 @@ class AnthropicProvider(BaseProvider):
         messages: List[Dict[str, str]],
         model: str = "claude-3-5-sonnet-20241022",
         temperature: float = 0.1,
+        max_tokens: Optional[int] = None,
+        stop_at_fence: bool = True,
     ) -> str:
-        RateLimiter.wait()
-        # Convert messages to Anthropic format
-        system_msg = ""
-        chat_messages = []
-        for msg in messages:
-            if msg["role"] == "system":
-                system_msg = msg["content"]
-            else:
-                chat_messages.append(msg)
+        RateLimiter.wait(estimate_tokens(messages))
+        system_blocks, chat_messages = _to_anthropic_messages(messages)
 
-        response = self.client.messages.create(
+        request = dict(
             model=model,
-            max_tokens=4096,
-            system=system_msg,
+            max_tokens=max_tokens or 4096,
+            system=system_blocks,
             messages=chat_messages,
             temperature=temperature,
         )
-        return response.content[0].text
+        if not self.stream:
+            response = self.client.messages.create(**request)
+            _log_prompt_cache_usage(_anthropic_usage(getattr(response, "usage", None)))
+            return response.content[0].text
+
+        # Leaving the block closes the connection, even when the code block ends early
+        log_usage = _logging_usage()
+        with self.client.messages.stream(**request) as stream:
+            text, _ = _join_until_code_block(
+                stream.text_stream, stop_at_fence=stop_at_fence and not log_usage
+            )
+            if log_usage:
+                _log_prompt_cache_usage(_anthropic_usage(stream.get_final_message().usage))
+        return text
 
     def list_models(self) -> List[str]:
         return ["claude-3-5-sonnet-20241022", "claude-3-haiku-20240307", "claude-3-opus-20240229"]
@@ -344,20 +638,22 @@ class OllamaProvider(BaseProvider):
         from openai import OpenAI
 
         return OpenAI(
-            api_key="ollama", base_url=f"{self.base_url}/v1"  # Ollama doesn't need a real key
+            api_key="ollama",  # Ollama doesn't need a real key
+            base_url=f"{self.base_url}/v1",
+            http_client=_http_client(),
         )
 
     @call_with_retry(max_retries=3, base_delay=1.0)
     def chat(
-        self, messages: List[Dict[str, str]], model: str = "llama3.2", temperature: float = 0.1
+        self,
+        messages: List[Dict[str, str]],
+        model: str = "llama3.2",
+        temperature: float = 0.1,
+        max_tokens: Optional[int] = None,
+        stop_at_fence: bool = True,
     ) -> str:
         # No rate limiting needed for local models
-        response = self.client.chat.completions.create(
-            messages=messages,
-            model=model,
-            temperature=temperature,
-        )
-        return response.choices[0].message.content
+        return self._chat_completion(messages, model, temperature, max_tokens, stop_at_fence)
 
     def list_models(self) -> List[str]:
         """List locally available Ollama models."""
@@ -374,13 +670,7 @@ class OllamaProvider(BaseProvider):
 
     def is_available(self) -> bool:
         """Check if Ollama is running."""
-        try:
-            import requests
-
-            response = requests.get(f"{self.base_url}/api/tags", timeout=2)
-            return response.status_code == 200
-        except Exception:
-            return False
+        return _probe_local_server(f"{self.base_url}/api/tags")
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -399,31 +689,25 @@ class LMStudioProvider(BaseProvider):
     def _create_client(self):
         from openai import OpenAI
 
-        return OpenAI(api_key="lm-studio", base_url=self.base_url)
+        return OpenAI(api_key="lm-studio", base_url=self.base_url, http_client=_http_client())
 
     @call_with_retry(max_retries=3, base_delay=1.0)
     def chat(
-        self, messages: List[Dict[str, str]], model: str = "local-model", temperature: float = 0.1
+        self,
+        messages: List[Dict[str, str]],
+        model: str = "local-model",
+        temperature: float = 0.1,
+        max_tokens: Optional[int] = None,
+        stop_at_fence: bool = True,
     ) -> str:
-        response = self.client.chat.completions.create(
-            messages=messages,
-            model=model,
-            temperature=temperature,
-        )
-        return response.choices[0].message.content
+        return self._chat_completion(messages, model, temperature, max_tokens, stop_at_fence)
 
     def list_models(self) -> List[str]:
         return ["local-model"]  # LM Studio serves whatever is loaded
 
     def is_available(self) -> bool:
         """Check if LM Studio is running."""
-        try:
-            import requests
-
-            response = requests.get(f"{self.base_url}/models", timeout=2)
-            return response.status_code == 200
-        except Exception:
-            return False
+        return _probe_local_server(f"{self.base_url}/models")
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -452,6 +736,7 @@ class OpenRouterProvider(BaseProvider):
                 "HTTP-Referer": "https://github.com/ghost-test",
                 "X-Title": "Ghost Test Generator",
             },
+            http_client=_http_client(),
         )
 
     @call_with_retry(max_retries=5, base_delay=2.0)
@@ -460,14 +745,11 @@ class OpenRouterProvider(BaseProvider):
         messages: List[Dict[str, str]],
         model: str = "openrouter/auto",
         temperature: float = 0.1,
+        max_tokens: Optional[int] = None,
+        stop_at_fence: bool = True,
     ) -> str:
-        RateLimiter.wait()
-        response = self.client.chat.completions.create(
-            messages=messages,
-            model=model,
-            temperature=temperature,
-        )
-        return response.choices[0].message.content
+        RateLimiter.wait(estimate_tokens(messages))
+        return self._chat_completion(messages, model, temperature, max_tokens, stop_at_fence)
 
     def list_models(self) -> List[str]:
         return [
@@ -495,17 +777,21 @@ class CustomProvider(BaseProvider):
     def _create_client(self):
         from openai import OpenAI
 
-        return OpenAI(api_key=self.api_key or "none", base_url=self.base_url)
+        return OpenAI(
+            api_key=self.api_key or "none", base_url=self.base_url, http_client=_http_client()
+        )
 
     @call_with_retry(max_retries=5, base_delay=2.0)
-    def chat(self, messages: List[Dict[str, str]], model: str, temperature: float = 0.1) -> str:
-        RateLimiter.wait()
-        response = self.client.chat.completions.create(
-            messages=messages,
-            model=model,
-            temperature=temperature,
-        )
-        return response.choices[0].message.content
+    def chat(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float = 0.1,
+        max_tokens: Optional[int] = None,
+        stop_at_fence: bool = True,
+    ) -> str:
+        RateLimiter.wait(estimate_tokens(messages))
+        return self._chat_completion(messages, model, temperature, max_tokens, stop_at_fence)
 
     def list_models(self) -> List[str]:
         return []  # Unknown for custom providers
@@ -596,22 +882,24 @@ def auto_detect_provider() -> Optional[BaseProvider]:
     return None
 
 
+def _local_provider_available(provider_class) -> bool:
+    """Whether a local provider's server is reachable (never raises)."""
+    try:
+        return provider_class().is_available()
+    except Exception:
+        return False
+
+
 def list_available_providers() -> Dict[str, bool]:
     """List all providers and their availability status."""
     status = {}
 
-    # Local providers
-    try:
-        ollama = OllamaProvider()
-        status["ollama"] = ollama.is_available()
-    except Exception:
-        status["ollama"] = False
-
-    try:
-        lmstudio = LMStudioProvider()
-        status["lmstudio"] = lmstudio.is_available()
-    except Exception:
-        status["lmstudio"] = False
+    # Local providers - probe both servers at once so timeouts don't add up
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        ollama = pool.submit(_local_provider_available, OllamaProvider)
+        lmstudio = pool.submit(_local_provider_available, LMStudioProvider)
+        status["ollama"] = ollama.result()
+        status["lmstudio"] = lmstudio.result()
 
     # Cloud providers (check env vars)
     status["groq"] = bool(os.environ.get("GROQ_API_KEY"))
@@ -3,13 +3,18 @@ Rate limiting utilities for API calls.
 
 Provides:
 1. RateLimiter - Global traffic cop to prevent exceeding API rate limits
-2. call_with_retry - Decorator for exponential backoff on rate limit errors
+2. call_with_retry - Decorator for backoff on rate limit errors, honouring Retry-After hints
+3. estimate_tokens - Cheap prompt token estimate for token-per-minute budgets
 """
 
 import random
+import re
 import time
+from collections import deque
+from email.utils import parsedate_to_datetime
 from functools import wraps
 from threading import Lock
+from typing import Deque, Dict, List, Optional, Tuple
 
 from ghost.console import Console, countdown
 
@@ -25,37 +30,157 @@ class RateLimiter:
     _last_call = 0
     _lock = Lock()
 
+    # No call may start before this time; set when a provider says to back off
+    _resume_at = 0.0
+
     # Minimum seconds between API calls
     # Groq Free Tier is VERY strict - use 10 seconds to be safe
     MIN_INTERVAL = 10.0
 
+    # Optional prompt-token budget per rolling minute (0 = unlimited)
+    TOKENS_PER_MINUTE = 0
+    _token_log: Deque[Tuple[float, int]] = deque()
+
     @classmethod
-    def wait(cls):
+    def wait(cls, tokens: int = 0):
         """
-        Blocks if called too soon after the last API call.
+        Blocks if called too soon after the last API call, or if sending
+        *tokens* more prompt tokens would exceed the per-minute token budget.
         Call this before every API request.
         """
         with cls._lock:
             current_time = time.time()
+            if cls._resume_at > current_time:
+                countdown(cls._resume_at - current_time, "Rate limit cooldown")
+                current_time = time.time()
             elapsed = current_time - cls._last_call
 
             if elapsed < cls.MIN_INTERVAL:
                 sleep_duration = cls.MIN_INTERVAL - elapsed
                 countdown(sleep_duration, "API cooldown")
 
+            if cls.TOKENS_PER_MINUTE > 0 and tokens > 0:
+                cls._wait_for_tokens(tokens)
+
             cls._last_call = time.time()
 
+    @classmethod
+    def _wait_for_tokens(cls, tokens: int):
+        """Sleep until *tokens* fit in the rolling 60s window, then record them."""
+        now = time.time()
+        cls._expire_tokens(now)
+
+        used = sum(t for _, t in cls._token_log)
+        overflow = used + tokens - cls.TOKENS_PER_MINUTE
+        if overflow > 0 and cls._token_log:
+            # Wait for just enough of the oldest requests to leave the window
+            freed = 0
+            resume_at = now
+            for sent_at, sent_tokens in cls._token_log:
+                freed += sent_tokens
+                resume_at = sent_at + 60.0
+                if freed >= overflow:
+                    break
+            countdown(resume_at - now, "Token budget cooldown")
+            cls._expire_tokens(time.time())
+
+        cls._token_log.append((time.time(), tokens))
+
+    @classmethod
+    def _expire_tokens(cls, now: float):
+        while cls._token_log and now - cls._token_log[0][0] >= 60.0:
+            cls._token_log.popleft()
+
+    @classmethod
+    def set_token_budget(cls, tokens_per_minute: int):
+        """Set the prompt-token budget per minute (0 disables it)."""
+        cls.TOKENS_PER_MINUTE = max(tokens_per_minute, 0)
+
+    @classmethod
+    def pause(cls, seconds: float):
+        """Hold back every caller's next request for *seconds* (e.g. after a 429)."""
+        cls._resume_at = max(cls._resume_at, time.time() + seconds)
+
     @classmethod
     def set_interval(cls, seconds: float):
-        """Adjust the minimum interval between API calls."""
+        """Adjust the minimum interval between API calls (a no-op if it's unchanged)."""
+        if seconds == cls.MIN_INTERVAL:
+            return
         cls.MIN_INTERVAL = seconds
         Console.info(f"Rate limiter interval set to {seconds}s")
 
 
+def estimate_tokens(messages: List[Dict[str, str]]) -> int:
+    """Roughly estimate prompt tokens (~4 characters per token)."""
+    return sum(len(m.get("content") or "") for m in messages) // 4
+
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    """Parse a rate-limit reset like ``"1m30.5s"``, ``"250ms"`` or ``"6"`` into seconds."""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """
+    Seconds the provider asked us to wait before retrying, if it said.
+
+    Reads ``retry-after-ms``/``retry-after`` from the error's HTTP response,
+    falling back to the ``x-ratelimit-reset-*`` header (sent by Groq and
+    OpenAI) of whichever budget has ``x-ratelimit-remaining-*`` at 0.
+    Returns None when the error carries no such hint.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        value = headers.get("retry-after-ms")
+        if value:
+            return float(value) / 1000.0
+        value = headers.get("retry-after")
+        if value:
+            seconds = _parse_duration(value)
+            if seconds is None:
+                seconds = parsedate_to_datetime(value).timestamp() - time.time()
+            return max(seconds, 0.0)
+    except (TypeError, ValueError):
+        pass
+    # Only an exhausted budget blocks us; the other one's reset is irrelevant
+    resets = []
+    for budget in ("requests", "tokens"):
+        remaining = headers.get(f"x-ratelimit-remaining-{budget}")
+        reset = headers.get(f"x-ratelimit-reset-{budget}")
+        if remaining is None or not reset:
+            continue
+        try:
+            exhausted = float(remaining) <= 0
+        except (TypeError, ValueError):
+            continue
+        seconds = _parse_duration(reset) if exhausted else None
+        if seconds is not None:
+            resets.append(seconds)
+    return max(resets) if resets else None
+
+
 def call_with_retry(max_retries: int = 5, base_delay: float = 2.0):
     """
     Decorator that retries the function on rate limit errors with exponential backoff.
 
+    When the provider says how long to wait (Retry-After or rate-limit reset
+    headers) the wait is at least that long, and all other callers going
+    through RateLimiter.wait() hold off for the same period.
+
     Args:
         max_retries: Maximum number of retry attempts (default: 5)
         base_delay: Initial delay in seconds, doubles each retry (default: 2.0)
@@ -96,6 +221,10 @@ def call_with_retry(max_retries: int = 5, base_delay: float = 2.0):
 
                         # Exponential backoff + jitter (prevents thundering herd)
                         sleep_time = (base_delay * (2**attempt)) + random.uniform(0.1, 1.0)
+                        hint = retry_after(e)
+                        if hint is not None:
+                            sleep_time = max(sleep_time, hint)
+                            RateLimiter.pause(hint)
                         Console.rate_limited(sleep_time, attempt + 1, max_retries)
                         countdown(sleep_time, "Retry cooldown")
                     else:
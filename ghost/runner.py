@@ -1,50 +1,220 @@
+import hashlib
+import json
 import os
 import subprocess
 import sys
-from typing import Optional, Set
+import sysconfig
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+# Cached pytest results older than this are re-run
+TEST_RESULT_TTL_SECONDS = 24 * 60 * 60
+
+# Only the tail of each pytest stream is kept; failures and the summary are at the end
+MAX_TEST_OUTPUT_BYTES = 128 * 1024
 
 
 def run_test(test_file_path: str, source_path: str) -> tuple[int, str, str]:
     python_exe = sys.executable
     my_env = os.environ.copy()
     my_env["PYTHONPATH"] = source_path
-    result = subprocess.run(
-        [python_exe, "-m", "pytest", test_file_path],
-        capture_output=True,
-        text=True,
-        env=my_env,
-    )
-    return result.returncode, result.stdout, result.stderr
+    # A fresh interpreter per run, so the test sees the current source rather than
+    # modules imported by an earlier attempt; skip the .pytest_cache round-trip
+    # Spool output to disk rather than pipes so a chatty suite never sits in memory
+    with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        result = subprocess.run(
+            [python_exe, "-m", "pytest", "-p", "no:cacheprovider", test_file_path],
+            stdout=out,
+            stderr=err,
+            env=my_env,
+        )
+        return result.returncode, _read_tail(out), _read_tail(err)
+
+
+def _read_tail(f) -> str:
+    """Decode the last MAX_TEST_OUTPUT_BYTES of a spooled output stream."""
+    size = f.seek(0, os.SEEK_END)
+    f.seek(max(0, size - MAX_TEST_OUTPUT_BYTES))
+    text = f.read().decode("utf-8", errors="replace")
+    if size > MAX_TEST_OUTPUT_BYTES:
+        # Drop the partial first line and say that output was cut
+        text = "[... earlier output truncated ...]\n" + text.partition("\n")[2]
+    return text
+
+
+def run_test_cached(
+    test_file_path: str, source_path: str, source_file: str
+) -> tuple[int, str, str]:
+    """run_test, reusing the previous result while nothing the run depends on has changed.
+
+    Results are keyed on the bytes of source_file and the test, the size and
+    mtime of every other Python and pytest config file in the project, the
+    interpreter and its site-packages, and kept under
+    ``<source_path>/.ghost/test_results``.
+    """
+    try:
+        key = hashlib.sha256(
+            hashlib.sha256(Path(source_file).read_bytes()).digest()
+            + hashlib.sha256(Path(test_file_path).read_bytes()).digest()
+            + _project_stamp(source_path)
+            + _environment_stamp()
+        ).hexdigest()
+    except OSError:
+        return run_test(test_file_path, source_path)
+
+    path = Path(source_path) / ".ghost" / "test_results" / f"{key}.json"
+    cached = _load_result(path)
+    if cached is not None:
+        return cached
+
+    result = run_test(test_file_path, source_path)
+    _store_result(path, result)
+    return result
+
+
+# Non-Python files that change how pytest collects and runs tests
+_TEST_CONFIG_FILES = frozenset({"pyproject.toml", "pytest.ini", "setup.cfg", "tox.ini"})
+
+
+def _project_stamp(source_path: str) -> bytes:
+    """Digest of the (path, mtime_ns, size) of the project's Python and pytest config files."""
+    digest = hashlib.sha256()
+    for dirpath, dirnames, filenames in os.walk(source_path):
+        dirnames[:] = sorted(d for d in dirnames if d not in DEFAULT_TREE_IGNORE_DIRS)
+        for name in sorted(filenames):
+            if name.endswith(".py") or name in _TEST_CONFIG_FILES:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                digest.update(f"{path}\0{st.st_mtime_ns}\0{st.st_size}\n".encode())
+    return digest.digest()
+
+
+def _environment_stamp() -> bytes:
+    """Digest of the interpreter and the mtimes of its site-packages (bumped by installs)."""
+    parts = [sys.executable, sys.version]
+    for name in ("purelib", "platlib"):
+        directory = sysconfig.get_paths()[name]
+        try:
+            parts.append(f"{directory}:{os.stat(directory).st_mtime_ns}")
+        except OSError:
+            parts.append(directory)
+    return hashlib.sha256("\n".join(parts).encode()).digest()
+
+
+def _load_result(path: Path) -> Optional[tuple[int, str, str]]:
+    """The stored result at path, or None if it's missing, unreadable or expired."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            if time.time() - os.fstat(f.fileno()).st_mtime > TEST_RESULT_TTL_SECONDS:
+                return None
+            return_code, stdout, stderr = json.load(f)
+    except (OSError, ValueError, TypeError):
+        return None
+    return return_code, stdout, stderr
+
+
+def _store_result(path: Path, result: tuple[int, str, str]) -> None:
+    """Write result to path (atomic replace); a failed write only costs a re-run."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(result, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError:
+        pass
+
+
+# Directories never worth showing the LLM or watching for changes
+DEFAULT_TREE_IGNORE_DIRS = frozenset(
+    {
+        ".git",
+        "__pycache__",
+        "venv",
+        "node_modules",
+        ".ghost",
+        ".pytest_cache",
+        ".idea",
+        ".venv",
+    }
+)
+
+
+# (root_path, ignore_dirs) -> ((dir, mtime_ns) for every listed dir, rendered tree)
+_tree_cache: Dict[Tuple[str, frozenset], Tuple[Tuple[Tuple[str, int], ...], str]] = {}
 
 
 def get_project_tree(root_path: str, ignore_dirs: Optional[Set[str]] = None) -> str:
     if ignore_dirs is None:
-        ignore_dirs = {
-            ".git",
-            "__pycache__",
-            "venv",
-            "node_modules",
-            ".ghost",
-            ".pytest_cache",
-            ".idea",
-            ".venv",
-        }
-
-    tree_str = "PROJECT STRUCTURE:\n"
-
-    for root, dirs, files in os.walk(root_path):
-        dirs[:] = [d for d in dirs if d not in ignore_dirs]
-        level = root.replace(root_path, "").count(os.sep)
-        indent = " " * 4 * level
-        folder_name = os.path.basename(root)
-        if folder_name:
-            tree_str += f"{indent}{folder_name}/\n"
-        subindent = " " * 4 * (level + 1)
-        for f in files:
-            if f.endswith(".py"):
-                tree_str += f"{subindent}{f}\n"
-
-    return tree_str
+        ignore_dirs = DEFAULT_TREE_IGNORE_DIRS
+
+    ignore = frozenset(ignore_dirs)
+    cache_key = (root_path, ignore)
+    cached = _tree_cache.get(cache_key)
+    if cached is not None and _dirs_unchanged(cached[0]):
+        return cached[1]
+
+    lines = ["PROJECT STRUCTURE:"]
+    dir_stamps: List[Tuple[str, int]] = []
+    _append_tree(lines, dir_stamps, root_path, os.path.basename(root_path), 0, ignore)
+    lines.append("")
+    tree = "\n".join(lines)
+    _tree_cache[cache_key] = (tuple(dir_stamps), tree)
+    return tree
+
+
+def _dirs_unchanged(dir_stamps) -> bool:
+    """Adding, removing or renaming an entry bumps its parent directory's mtime."""
+    try:
+        return all(os.stat(path).st_mtime_ns == mtime_ns for path, mtime_ns in dir_stamps)
+    except OSError:
+        return False
+
+
+def _append_tree(
+    lines: List[str],
+    dir_stamps: List[Tuple[str, int]],
+    path: str,
+    name: str,
+    level: int,
+    ignore_dirs,
+) -> None:
+    """Append path's folder line, its .py files, then its subfolders (os.walk order)."""
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+        with os.scandir(path) as it:
+            entries = list(it)
+    except OSError:
+        return
+    dir_stamps.append((path, mtime_ns))
+
+    if name:
+        lines.append(f"{' ' * 4 * level}{name}/")
+    subindent = " " * 4 * (level + 1)
+    subdirs = []
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        if is_dir:
+            # Like os.walk, symlinked directories are listed as dirs but not entered
+            if entry.name not in ignore_dirs and not entry.is_symlink():
+                subdirs.append(entry)
+        elif entry.name.endswith(".py"):
+            lines.append(f"{subindent}{entry.name}")
+
+    for entry in subdirs:
+        _append_tree(lines, dir_stamps, entry.path, entry.name, level + 1, ignore_dirs)
 
 
 def classify_error(stderr: str, stdout: str) -> str:
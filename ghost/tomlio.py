@@ -0,0 +1,33 @@
+"""
+TOML helpers - Use rtoml when it is installed, the standard library otherwise.
+
+rtoml is an optional speedup (``pip install ghosttest[fast]``); both parsers
+return plain dicts for ghost.toml.
+"""
+
+import tomllib
+from typing import Any, BinaryIO, Dict, Tuple, Type
+
+try:
+    import rtoml
+except ImportError:  # Optional dependency
+    rtoml = None
+
+# Catch this to handle a malformed file whichever parser is active
+DecodeError: Tuple[Type[Exception], ...] = (tomllib.TOMLDecodeError,)
+if rtoml is not None:
+    DecodeError += (rtoml.TomlParsingError,)
+
+
+def loads(text: str) -> Dict[str, Any]:
+    """Parse TOML text."""
+    if rtoml is not None:
+        return rtoml.loads(text)
+    return tomllib.loads(text)
+
+
+def load(fp: BinaryIO) -> Dict[str, Any]:
+    """Parse TOML from a file opened in binary mode."""
+    if rtoml is not None:
+        return rtoml.loads(fp.read().decode("utf-8"))
+    return tomllib.load(fp)
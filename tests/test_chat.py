@@ -1,4 +1,25 @@
-from ghost.chat import TestGenerator
+import asyncio
+import gc
+import json
+import os
+import threading
+import time
+import warnings
+from types import SimpleNamespace
+
+import pytest
+
+import ghost.runner
+from ghost.chat import (
+    TestGenerator,
+    _load_context,
+    _load_context_text,
+    _load_toml,
+    _parse_context,
+    _parse_toml,
+)
+from ghost.config import GhostConfig
+from ghost.providers import _collect_stream, _to_anthropic_messages
 
 
 class TestCleanLlmResponse:
@@ -31,6 +52,44 @@ class TestCleanLlmResponse:
         assert cleaned == "def foo():\n    pass"
         assert "Here is the code" not in cleaned
 
+    def test_removes_bare_fence(self):
+        raw = "Sure:\n```\nimport pytest\n```"
+        assert self.generator.clean_llm_response(raw) == "import pytest"
+
+    def test_removes_py_fence(self):
+        raw = "```py\nx = 1\n```"
+        assert self.generator.clean_llm_response(raw) == "x = 1"
+
+    def test_unterminated_fence_returns_stripped_text(self):
+        raw = "```python\nx = 1\n"
+        assert self.generator.clean_llm_response(raw) == raw.strip()
+
+    def test_uses_first_block_only(self):
+        raw = "```python\na = 1\n```\ntext\n```python\nb = 2\n```"
+        assert self.generator.clean_llm_response(raw) == "a = 1"
+
+    def test_strips_preamble_from_unfenced_code(self):
+        raw = "Here are the tests:\n\n# Generated at: now\nimport pytest\n"
+        assert self.generator.clean_llm_response(raw) == "# Generated at: now\nimport pytest"
+
+    def test_keeps_unfenced_code_that_parses(self):
+        raw = "x = 1\nimport os\n"
+        assert self.generator.clean_llm_response(raw) == raw.strip()
+
+    def test_keeps_unfenced_code_with_fence_literals(self):
+        raw = (
+            "import pytest\n\n"
+            "def test_render():\n"
+            '    assert render("```py\\nx\\n```")\n'
+            '    doc = """\n```python\nexample\n```\n"""\n'
+            "    assert doc\n"
+        )
+        assert self.generator.clean_llm_response(raw) == raw.strip()
+
+    def test_prose_then_fence_extracts_block(self):
+        raw = "Here you go:\n  ```python\nx = '```'\n```\nDone."
+        assert self.generator.clean_llm_response(raw) == "x = '```'"
+
     def test_handles_empty_string(self):
         assert self.generator.clean_llm_response("") == ""
 
@@ -43,18 +102,12 @@ class TestConsultTheJudge:
         self.generator = TestGenerator()
 
     def test_raises_when_context_missing(self, tmp_path):
-        import pytest
-
         with pytest.raises(FileNotFoundError):
             self.generator.consult_the_judge(
                 "", str(tmp_path), "test.py", str(tmp_path / "nonexistent.py"), {}
             )
 
     def test_raises_when_test_file_missing(self, tmp_path):
-        import json
-
-        import pytest
-
         ghost_dir = tmp_path / ".ghost"
         ghost_dir.mkdir()
         (ghost_dir / "context.json").write_text(
@@ -64,3 +117,456 @@ class TestConsultTheJudge:
             self.generator.consult_the_judge(
                 "", str(tmp_path), "test.py", str(tmp_path / "nonexistent.py"), {}
             )
+
+    def test_verdict_length_is_uncapped_by_default(self, temp_project_with_config):
+        (temp_project_with_config / ".ghost" / "context.json").write_text(json.dumps({}))
+        requests = []
+
+        class _Provider:
+            def chat(self, messages, model, temperature=0.1, max_tokens=None):
+                requests.append(max_tokens)
+                return "<think>the assertion is right</think>\nBUG_IN_CODE\n"
+
+        self.generator.config.ai.cache = False
+        self.generator._provider = _Provider()
+        verdict = self.generator.consult_the_judge(
+            "x = 1", str(temp_project_with_config), "app.py", "t.py", {}, test_code=""
+        )
+
+        assert verdict == "BUG_IN_CODE"
+        assert requests == [None]
+
+    def test_caps_verdict_length(self, temp_project_with_config):
+        (temp_project_with_config / ".ghost" / "context.json").write_text(json.dumps({}))
+        requests = []
+
+        class _Provider:
+            def chat(self, messages, model, temperature=0.1, max_tokens=None):
+                requests.append(max_tokens)
+                return "bug_in_code\n"
+
+        self.generator.config.ai.cache = False
+        self.generator.config.ai.judge_max_tokens = 16
+        self.generator._provider = _Provider()
+        verdict = self.generator.consult_the_judge(
+            "x = 1", str(temp_project_with_config), "app.py", "t.py", {}, test_code=""
+        )
+
+        assert verdict == "BUG_IN_CODE"
+        assert requests == [16]
+
+    def test_truncated_verdict_is_asked_again_without_cap(self, temp_project_with_config):
+        (temp_project_with_config / ".ghost" / "context.json").write_text(json.dumps({}))
+        requests = []
+
+        class _Provider:
+            def chat(self, messages, model, temperature=0.1, max_tokens=None):
+                requests.append(max_tokens)
+                return "<think>The test" if max_tokens else "<think>...</think> FIX_TEST"
+
+        self.generator.config.ai.cache = False
+        self.generator.config.ai.judge_max_tokens = 16
+        self.generator._provider = _Provider()
+        verdict = self.generator.consult_the_judge(
+            "x = 1", str(temp_project_with_config), "app.py", "t.py", {}, test_code=""
+        )
+
+        assert verdict == "FIX_TEST"
+        assert requests == [16, None]
+
+
+class _OverlapProvider:
+    """Answers only once the judge and the fix requests are both in flight."""
+
+    def __init__(self):
+        self.both_in_flight = threading.Barrier(2, timeout=10)
+
+    def chat(self, messages, model, temperature=0.1, max_tokens=None):
+        self.both_in_flight.wait()
+        if "defect analyzer" in messages[0]["content"]:
+            return "FIX_TEST"
+        return "def test_fixed():\n    assert True\n"
+
+
+class TestConsultTheJudgeWithFix:
+    def test_judge_and_fix_overlap(self, tmp_path):
+        (tmp_path / ".ghost").mkdir()
+        (tmp_path / ".ghost" / "context.json").write_text("{}")
+        (tmp_path / "ghost.toml").write_text('[tests]\nframework = "pytest"\n')
+        config = GhostConfig()
+        config.ai.cache = False
+        config.ai.rate_limit_rpm = 60_000
+        generator = TestGenerator(config=config)
+        generator._provider = _OverlapProvider()
+
+        # Sequential calls would break the barrier instead of meeting at it
+        verdict, fix = generator.consult_the_judge_with_fix(
+            "x = 1", str(tmp_path), "mod.py", str(tmp_path / "tests" / "test_mod.py"), {}, "old"
+        )
+
+        assert verdict == "FIX_TEST"
+        assert "def test_fixed" in fix.result()
+
+
+class TestConfigFileCache:
+    def test_reuses_parsed_toml_until_file_changes(self, tmp_path):
+        path = tmp_path / "ghost.toml"
+        path.write_text('[tests]\nframework = "pytest"\n')
+        first = _load_toml(str(path))
+        assert _load_toml(str(path)) is first
+
+        path.write_text('[tests]\nframework = "unittest"\n')
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        assert _load_toml(str(path))["tests"]["framework"] == "unittest"
+
+    def test_heal_loop_walks_project_tree_once(self, temp_project_with_config, monkeypatch):
+        (temp_project_with_config / ".ghost" / "context.json").write_text(json.dumps({}))
+        walks = []
+        real_append_tree = ghost.runner._append_tree
+
+        def counting_append_tree(lines, dir_stamps, path, *args):
+            if path == str(temp_project_with_config):
+                walks.append(path)
+            return real_append_tree(lines, dir_stamps, path, *args)
+
+        monkeypatch.setattr(ghost.runner, "_append_tree", counting_append_tree)
+        generator = TestGenerator()
+        for _ in range(3):
+            generator.create_prompt("x = 1", str(temp_project_with_config), "app.py")
+            generator.create_prompt_test(
+                "x = 1", str(temp_project_with_config), "app.py", "t.py", {}, existing_code=""
+            )
+
+        assert len(walks) == 1
+
+    def test_context_text_is_serialized_once_per_version(self, tmp_path):
+        path = tmp_path / "context.json"
+        path.write_text(json.dumps({"b.py": "y", "a.py": "x"}))
+        first = _load_context_text(str(path))
+
+        assert _load_context_text(str(path)) is first
+        assert json.loads(first) == {"b.py": "y", "a.py": "x"}
+        assert first.startswith('{\n  "b.py"')
+
+    def test_context_reloads_after_rewrite(self, tmp_path):
+        path = tmp_path / "context.json"
+        path.write_text(json.dumps({"a.py": "x"}))
+        assert _load_context(str(path)) == {"a.py": "x"}
+
+        path.write_text(json.dumps({"a.py": "x", "b.py": "y"}))
+        assert "b.py" in _load_context(str(path))
+
+
+class TestGetTestCodes:
+    def test_returns_results_in_order(self):
+        generator = TestGenerator()
+        generator.get_test_code = lambda source_code, **kwargs: f"# tests for {source_code}"
+
+        items = [{"source_code": name} for name in ("a", "b", "c")]
+        results = asyncio.run(generator.get_test_codes(items, max_concurrency=2))
+
+        assert results == ["# tests for a", "# tests for b", "# tests for c"]
+
+    def test_blocking_io_does_not_stall_event_loop(self):
+        generator = TestGenerator()
+
+        def slow_get_test_code(source_code, **kwargs):
+            time.sleep(0.2)  # stands in for file reads + the provider call
+            return source_code
+
+        generator.get_test_code = slow_get_test_code
+
+        async def main():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            task = asyncio.create_task(ticker())
+            await generator.get_test_codes([{"source_code": "a"}])
+            task.cancel()
+            return ticks
+
+        assert asyncio.run(main()) >= 5
+
+    def test_limits_concurrency(self):
+        generator = TestGenerator()
+        lock = threading.Lock()
+        active = {"now": 0, "peak": 0}
+
+        def fake_get_test_code(source_code, **kwargs):
+            with lock:
+                active["now"] += 1
+                active["peak"] = max(active["peak"], active["now"])
+            time.sleep(0.05)
+            with lock:
+                active["now"] -= 1
+            return source_code
+
+        generator.get_test_code = fake_get_test_code
+        items = [{"source_code": str(i)} for i in range(6)]
+        asyncio.run(generator.get_test_codes(items, max_concurrency=2))
+
+        assert active["peak"] <= 2
+
+
+class TestGetTestCodesBatched:
+    @pytest.fixture(autouse=True)
+    def context_file(self, temp_project_with_config):
+        (temp_project_with_config / ".ghost" / "context.json").write_text("{}")
+
+    def make_generator(self):
+        config = GhostConfig()
+        config.ai.cache = False
+        return TestGenerator(config=config)
+
+    def test_split_batch_response(self):
+        raw = (
+            "```python\n### FILE: test_a.py ###\nimport pytest\n\n"
+            "### FILE: test_b.py ###\ndef test_b():\n    assert True\n```"
+        )
+        sections = TestGenerator.split_batch_response(raw)
+        assert sections == {
+            "test_a.py": "import pytest",
+            "test_b.py": "def test_b():\n    assert True",
+        }
+
+    def test_packs_small_files_into_one_call(self, temp_project_with_config):
+        generator = self.make_generator()
+        prompts = []
+
+        def fake_call_api(messages, **kwargs):
+            prompts.append(messages[-1]["content"])
+            return "### FILE: test_a.py ###\n# a tests\n### FILE: test_b.py ###\n# b tests\n"
+
+        generator._call_api = fake_call_api
+        items = [
+            {
+                "source_code": "a = 1",
+                "source_path": str(temp_project_with_config),
+                "filename": "a.py",
+            },
+            {
+                "source_code": "b = 2",
+                "source_path": str(temp_project_with_config),
+                "filename": "b.py",
+            },
+        ]
+        results = generator.get_test_codes_batched(items)
+
+        assert results == ["# a tests", "# b tests"]
+        assert len(prompts) == 1
+        assert "### FILE: test_a.py ###" in prompts[0]
+        assert "### FILE: test_b.py ###" in prompts[0]
+
+    def test_files_with_the_same_name_are_not_batched_together(self, temp_project_with_config):
+        generator = self.make_generator()
+        generator._call_api = lambda messages, **kwargs: pytest.fail("names were batched")
+        generator.get_test_code = lambda source_code, source_path, filename: f"# {source_code}"
+        items = [
+            {
+                "source_code": code,
+                "source_path": str(temp_project_with_config),
+                "filename": "app.py",
+            }
+            for code in ("a = 1", "b = 2")
+        ]
+        results = generator.get_test_codes_batched(items)
+
+        assert results == ["# a = 1", "# b = 2"]
+
+    def test_oversized_files_fall_back_to_single_calls(self, temp_project_with_config):
+        generator = self.make_generator()
+        generator._call_api = lambda messages, **kwargs: "unused"
+        generator.get_test_code = lambda source_code, source_path, filename: f"# {filename}"
+
+        items = [
+            {
+                "source_code": "x" * 400,
+                "source_path": str(temp_project_with_config),
+                "filename": name,
+            }
+            for name in ("a.py", "b.py")
+        ]
+        results = generator.get_test_codes_batched(items, max_ctx=1)
+
+        assert results == ["# a.py", "# b.py"]
+
+    def test_missing_section_is_regenerated_alone(self, temp_project_with_config):
+        generator = self.make_generator()
+        generator._call_api = lambda messages, **kwargs: "### FILE: test_a.py ###\n# a tests\n"
+        generator.get_test_code = lambda source_code, source_path, filename: f"# alone {filename}"
+
+        items = [
+            {
+                "source_code": "a = 1",
+                "source_path": str(temp_project_with_config),
+                "filename": "a.py",
+            },
+            {
+                "source_code": "b = 2",
+                "source_path": str(temp_project_with_config),
+                "filename": "b.py",
+            },
+        ]
+        results = generator.get_test_codes_batched(items)
+
+        assert results == ["# a tests", "# alone b.py"]
+
+    def test_streamed_reply_with_fenced_sections_is_read_whole(self, temp_project_with_config):
+        # Each file fenced separately: the first closing fence is not the end
+        pieces = [
+            "```python\n### FILE: test_a.py ###\n",
+            "def test_a():\n    assert True\n```\n",
+            "```python\n### FILE: test_b.py ###\n",
+            "def test_b():\n    assert True\n```\n",
+        ]
+
+        class _StreamingProvider:
+            def chat(self, messages, model, temperature=0.1, stop_at_fence=True, **kwargs):
+                chunks = (
+                    SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=p))])
+                    for p in pieces
+                )
+                return _collect_stream(chunks, stop_at_fence)
+
+        def fail_alone(source_code, source_path, filename):
+            raise AssertionError(f"{filename} was regenerated alone")
+
+        generator = self.make_generator()
+        generator._provider = _StreamingProvider()
+        generator.get_test_code = fail_alone
+        items = [
+            {"source_code": code, "source_path": str(temp_project_with_config), "filename": name}
+            for code, name in (("a = 1", "a.py"), ("b = 2", "b.py"))
+        ]
+        results = generator.get_test_codes_batched(items)
+
+        assert results == ["def test_a():\n    assert True", "def test_b():\n    assert True"]
+
+
+class TestCreatePrompt:
+    def test_fills_in_template(self, temp_project_with_config, sample_python_source):
+        (temp_project_with_config / ".ghost" / "context.json").write_text(
+            json.dumps({"app.py": "Functions: hello(name)"})
+        )
+        generator = TestGenerator()
+        prompt = generator.create_prompt(
+            sample_python_source, str(temp_project_with_config), "app.py"
+        )
+
+        assert "testing framework: pytest" in prompt
+        assert "def add(a: int, b: int) -> int:" in prompt
+        assert '"app.py": "Functions: hello(name)"' in prompt
+        assert "{" + "framework}" not in prompt
+
+    def test_static_rules_come_before_request_values(self, temp_project_with_config):
+        (temp_project_with_config / ".ghost" / "context.json").write_text(json.dumps({}))
+        generator = TestGenerator()
+        first = generator.create_prompt("x = 1", str(temp_project_with_config), "a.py")
+        second = generator.create_prompt("y = 2", str(temp_project_with_config), "b.py")
+
+        prefix = first[: first.index("TARGET:")]
+        assert second.startswith(prefix)
+        assert "a.py" not in prefix
+        # The project tree and context are shared too, so they belong to the prefix
+        assert "PROJECT STRUCTURE:" in prefix
+        assert "GLOBAL CONTEXT" in prefix
+
+    def test_prompt_is_sent_as_one_user_message(self, temp_project_with_config):
+        (temp_project_with_config / ".ghost" / "context.json").write_text(json.dumps({}))
+        sent = []
+
+        def fake_call_api(messages, **kwargs):
+            sent.append(messages)
+            return "import pytest"
+
+        generator = TestGenerator()
+        generator._call_api = fake_call_api
+        generator.get_test_code("x = 1", str(temp_project_with_config), "a.py")
+
+        assert [m["role"] for m in sent[0]] == ["system", "user"]
+
+    def test_anthropic_splits_prompt_into_shared_and_target_blocks(self, temp_project_with_config):
+        (temp_project_with_config / ".ghost" / "context.json").write_text(json.dumps({}))
+        prompt = TestGenerator().create_prompt("x = 1", str(temp_project_with_config), "a.py")
+        _, messages = _to_anthropic_messages([{"role": "user", "content": prompt}])
+
+        assert len(messages) == 1
+        shared, target = messages[0]["content"]
+        assert shared["text"] + "\n" + target["text"] == prompt
+        assert target["text"].startswith("TARGET:")
+        assert "a.py" not in shared["text"]
+        assert shared["cache_control"] == {"type": "ephemeral"}
+
+    def test_trims_tree_and_context_over_budget(self, temp_project_with_config):
+        root = temp_project_with_config
+        deep = root / "pkg" / "sub" / "deeper"
+        deep.mkdir(parents=True)
+        (deep / "buried.py").write_text("")
+        context = {f"mod{i}.py": "Functions: " + "x" * 200 for i in range(100)}
+        context["helpers.py"] = "Functions: slugify(text)"
+        (root / ".ghost" / "context.json").write_text(json.dumps(context))
+        source = "from helpers import slugify\n"
+
+        generator = TestGenerator()
+        full = generator.create_prompt(source, str(root), "app.py")
+        assert "buried.py" in full and "mod0.py" in full
+
+        generator.config.ai.max_prompt_tokens = 2_000
+        trimmed = generator.create_prompt(source, str(root), "app.py")
+        assert "buried.py" not in trimmed
+        assert "mod0.py" not in trimmed
+        assert "slugify(text)" in trimmed
+        assert source in trimmed
+
+    def test_does_not_leak_file_handles(self, temp_project_with_config):
+        (temp_project_with_config / ".ghost" / "context.json").write_text(json.dumps({}))
+        test_file = temp_project_with_config / "test_app.py"
+        test_file.write_text("import pytest\n")
+        _parse_toml.cache_clear()
+        _parse_context.cache_clear()
+        generator = TestGenerator()
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always", ResourceWarning)
+            generator.create_prompt("x = 1", str(temp_project_with_config), "app.py")
+            generator.create_prompt_test(
+                "x = 1", str(temp_project_with_config), "app.py", str(test_file), {}
+            )
+            gc.collect()
+
+        assert not [w for w in caught if issubclass(w.category, ResourceWarning)]
+
+    def test_heal_prompt_uses_in_memory_test_code(self, temp_project_with_config):
+        (temp_project_with_config / ".ghost" / "context.json").write_text(json.dumps({}))
+        generator = TestGenerator()
+        prompt = generator.create_prompt_test(
+            "x = 1",
+            str(temp_project_with_config),
+            "app.py",
+            str(temp_project_with_config / "missing_test.py"),
+            {"stderr": "boom"},
+            existing_code="def test_x():\n    assert False\n",
+        )
+
+        assert "assert False" in prompt
+        assert "boom" in prompt
+
+
+class TestSharedProvider:
+    def test_generators_with_same_settings_share_provider(self):
+        config = GhostConfig()
+        config.ai.provider = "groq"
+        config.ai.api_key = "test-key"
+
+        first = TestGenerator(config=config).provider
+        second = TestGenerator(config=config).provider
+        assert first is second
+
+        config.ai.api_key = "other-key"
+        assert TestGenerator(config=config).provider is not first
@@ -0,0 +1,211 @@
+import sys
+import tomllib
+from pathlib import Path
+
+import click
+import pytest
+from click.testing import CliRunner
+
+from ghost import cli
+from ghost.chat import TestGenerator
+from ghost.cli import (
+    _create_ghost_config,
+    _read_toml_sections,
+    _resolve_path,
+    _save_api_key_to_env,
+    _update_config,
+)
+from ghost.init import DEFAULT_IGNORE_DIRS, DEFAULT_IGNORE_FILES
+
+
+class TestSaveApiKeyToEnv:
+    def test_creates_env_and_gitignore(self, tmp_path):
+        env_file = tmp_path / ".env"
+        _save_api_key_to_env(env_file, "GROQ_API_KEY", "gsk_123")
+
+        assert env_file.read_text() == 'GROQ_API_KEY="gsk_123"\n'
+        assert ".env" in (tmp_path / ".gitignore").read_text()
+
+    def test_replaces_existing_key(self, tmp_path):
+        env_file = tmp_path / ".env"
+        env_file.write_text('OTHER=1\nGROQ_API_KEY="old"\nLAST=2\n')
+        _save_api_key_to_env(env_file, "GROQ_API_KEY", "new")
+
+        assert env_file.read_text() == 'OTHER=1\nGROQ_API_KEY="new"\nLAST=2\n'
+
+    def test_appends_after_missing_trailing_newline(self, tmp_path):
+        env_file = tmp_path / ".env"
+        env_file.write_text("OTHER=1")
+        _save_api_key_to_env(env_file, "OPENAI_API_KEY", r"sk\1")
+
+        assert env_file.read_text() == 'OTHER=1\nOPENAI_API_KEY="sk\\1"\n'
+
+    def test_appends_to_existing_gitignore(self, tmp_path):
+        gitignore = tmp_path / ".gitignore"
+        gitignore.write_text("*.pyc")
+        _save_api_key_to_env(tmp_path / ".env", "GROQ_API_KEY", "x")
+
+        assert gitignore.read_text() == "*.pyc\n\n# Environment variables\n.env\n"
+
+    def test_does_not_duplicate_gitignore_entry(self, tmp_path):
+        gitignore = tmp_path / ".gitignore"
+        gitignore.write_text(".env\n")
+        _save_api_key_to_env(tmp_path / ".env", "GROQ_API_KEY", "x")
+
+        assert gitignore.read_text() == ".env\n"
+
+
+class TestUpdateConfig:
+    def test_rewrites_provider_and_model(self, tmp_path):
+        config_path = tmp_path / "ghost.toml"
+        config_path.write_text('[ai]\nprovider = "groq"\nmodel = "llama"\n')
+        _update_config(tmp_path, provider="openai", model="gpt-4o")
+
+        assert config_path.read_text() == '[ai]\nprovider = "openai"\nmodel = "gpt-4o"\n'
+
+    def test_leaves_unset_fields_alone(self, tmp_path):
+        config_path = tmp_path / "ghost.toml"
+        config_path.write_text('[ai]\nprovider = "groq"\nmodel = "llama"\n')
+        _update_config(tmp_path, model="mixtral")
+
+        assert 'provider = "groq"' in config_path.read_text()
+
+
+class TestMainFastPath:
+    @pytest.mark.parametrize("argv", [["version"], ["-v"], ["--version"]])
+    def test_version_skips_click(self, argv, monkeypatch, capsys):
+        monkeypatch.setattr(cli.sys, "argv", ["ghost", *argv])
+        monkeypatch.setattr(cli, "cli", lambda: pytest.fail("click group invoked"))
+
+        cli.main()
+
+        assert cli.__version__ in capsys.readouterr().out
+
+
+class TestCreateGhostConfig:
+    @pytest.mark.parametrize("provider,rpm", [("groq", 30), ("openrouter", 60), ("ollama", 500)])
+    def test_writes_valid_toml(self, tmp_path, provider, rpm):
+        _create_ghost_config(tmp_path, provider, "some-model", "unittest")
+        config = tomllib.loads((tmp_path / "ghost.toml").read_text())
+
+        assert config["project"]["name"] == tmp_path.name
+        assert config["ai"] == {"provider": provider, "model": "some-model", "rate_limit_rpm": rpm}
+        assert config["tests"]["framework"] == "unittest"
+
+    def test_scanner_defaults_match_init_module(self, tmp_path):
+        _create_ghost_config(tmp_path, "groq", "m", "pytest")
+        scanner = tomllib.loads((tmp_path / "ghost.toml").read_text())["scanner"]
+
+        assert scanner["ignore_dirs"] == list(DEFAULT_IGNORE_DIRS)
+        assert scanner["ignore_files"] == list(DEFAULT_IGNORE_FILES)
+
+
+class TestReadTomlSections:
+    def test_reads_only_requested_tables(self, tmp_path):
+        _create_ghost_config(tmp_path, "groq", "llama", "pytest")
+        config_path = tmp_path / "ghost.toml"
+        full = tomllib.loads(config_path.read_text())
+
+        config = _read_toml_sections(config_path, ("ai", "tests"))
+
+        assert config == {"ai": full["ai"], "tests": full["tests"]}
+
+    def test_falls_back_to_full_parse(self, tmp_path):
+        config_path = tmp_path / "ghost.toml"
+        # A nested array line looks like a table header and cuts [ai] short
+        config_path.write_text('[ai]\npairs = [\n  ["a"],\n]\n[tests]\nframework = "pytest"\n')
+
+        config = _read_toml_sections(config_path, ("ai",))
+
+        assert config["ai"]["pairs"] == [["a"]]
+
+
+class TestWatch:
+    def test_stops_when_init_is_cancelled(self, tmp_path, monkeypatch):
+        cancelled_init = click.Command(
+            "init", params=[click.Argument(["path"])], callback=lambda path: None
+        )
+        monkeypatch.setattr(cli, "init", cancelled_init)
+
+        result = CliRunner().invoke(cli.cli, ["watch", str(tmp_path)])
+
+        assert result.exit_code == 1
+        assert "Cannot watch without ghost.toml" in result.output
+
+
+class TestGenerate:
+    def _project(self, tmp_path):
+        (tmp_path / "ghost.toml").write_text('[ai]\nprovider = "groq"\n')
+        for name in ("a.py", "b.py"):
+            (tmp_path / name).write_text(f"X = '{name}'\n")
+        return tmp_path
+
+    def test_multiple_files_are_generated_in_one_request(self, tmp_path, monkeypatch):
+        project = self._project(tmp_path)
+        (project / ".ghost").mkdir()
+        (project / ".ghost" / "context.json").write_text("{}")
+        prompts = []
+
+        def fake_call_api(self, messages, **kwargs):
+            prompts.append(messages[-1]["content"])
+            return (
+                "### FILE: test_a.py ###\ndef test_a():\n    pass\n"
+                "### FILE: test_b.py ###\ndef test_b():\n    pass\n"
+            )
+
+        monkeypatch.setattr(TestGenerator, "_call_api", fake_call_api)
+        monkeypatch.setattr("ghost.runner.run_test", lambda *args: (0, "", ""))
+
+        result = CliRunner().invoke(
+            cli.cli, ["generate", str(project / "a.py"), str(project / "b.py")]
+        )
+
+        assert result.exit_code == 0, result.output
+        assert len(prompts) == 1
+        assert "def test_a" in (project / "tests" / "test_a.py").read_text()
+        assert "def test_b" in (project / "tests" / "test_b.py").read_text()
+
+    def test_output_needs_a_single_file(self, tmp_path):
+        project = self._project(tmp_path)
+        result = CliRunner().invoke(
+            cli.cli,
+            ["generate", str(project / "a.py"), str(project / "b.py"), "-o", "out.py"],
+        )
+
+        assert result.exit_code == 1
+        assert "--output can only be used with a single file" in result.output
+
+
+class TestDoctor:
+    def test_checks_packages_without_importing_them(self, monkeypatch):
+        monkeypatch.setattr("ghost.providers.list_available_providers", lambda: {})
+        monkeypatch.delitem(sys.modules, "groq", raising=False)
+
+        result = CliRunner().invoke(cli.cli, ["doctor"])
+
+        assert result.exit_code == 0
+        assert "click installed" in result.output
+        assert "groq" not in sys.modules
+
+
+class TestResolvePath:
+    def test_dot_is_cwd(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        assert _resolve_path(".") == Path.cwd()
+
+    def test_relative_path_is_resolved(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        assert _resolve_path("src/app.py") == tmp_path.resolve() / "src" / "app.py"
+
+    def test_absolute_path_is_kept(self, tmp_path):
+        assert _resolve_path(str(tmp_path / "app.py")) == tmp_path / "app.py"
+
+
+class TestPrintProviderStatus:
+    def test_renders_both_states(self, capsys):
+        cli._print_provider_status("Groq", True, "GROQ_API_KEY", "Free tier")
+        cli._print_provider_status("OpenAI", False, "OPENAI_API_KEY", "Paid")
+
+        available, missing = capsys.readouterr().out.splitlines()
+        assert "Groq" in available and "Available" in available
+        assert "OpenAI" in missing and "Not configured" in missing
@@ -1,4 +1,15 @@
-from ghost.config import GhostConfig, get_config
+import os
+
+import pytest
+
+from ghost import tomlio
+from ghost.config import (
+    GhostConfig,
+    find_project_root,
+    get_api_key,
+    get_config,
+    load_project_env,
+)
 
 
 class TestGhostConfig:
@@ -45,6 +56,21 @@ class TestGhostConfig:
         assert config.ai.model == "llama3.2"
         assert config.project_name == "my-project"
 
+    def test_from_dict_ignores_unknown_keys(self):
+        config = GhostConfig.from_dict({"ai": {"model": "gpt-4o", "unknown": 1}, "extra": {}})
+        assert config.ai.model == "gpt-4o"
+        assert not hasattr(config.ai, "unknown")
+
+    def test_from_dict_defaults_are_not_shared(self):
+        first = GhostConfig.from_dict({})
+        first.scanner.ignore_dirs.append("custom")
+        assert "custom" not in GhostConfig.from_dict({}).scanner.ignore_dirs
+
+    def test_sections_are_slotted(self):
+        config = GhostConfig()
+        for section in (config, config.ai, config.scanner, config.tests, config.watcher):
+            assert not hasattr(section, "__dict__")
+
     def test_get_config_returns_defaults_when_no_project(self):
         config = get_config(None)
         assert isinstance(config, GhostConfig)
@@ -72,3 +98,103 @@ class TestGhostConfig:
         assert "provider" in field_names
         assert "api_key" in field_names
         assert "max_retries" in field_names
+
+    def test_default_temperature_is_deterministic(self):
+        assert GhostConfig().ai.temperature == 0.0
+
+    def test_temperature_env_override(self, temp_project_with_config, monkeypatch):
+        monkeypatch.setenv("GHOST_TEMPERATURE", "0.3")
+        config = get_config(temp_project_with_config)
+        assert config.ai.temperature == 0.3
+
+    def test_invalid_temperature_env_is_ignored(self, temp_project_with_config, monkeypatch):
+        monkeypatch.setenv("GHOST_TEMPERATURE", "warm")
+        config = get_config(temp_project_with_config)
+        assert config.ai.temperature == 0.0
+
+
+class TestGetConfigCache:
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        get_config.cache_clear()
+        yield
+        get_config.cache_clear()
+
+    def test_unchanged_file_is_parsed_once(self, temp_project_with_config, monkeypatch):
+        calls = []
+        real_load = tomlio.load
+        monkeypatch.setattr(tomlio, "load", lambda f: calls.append(f) or real_load(f))
+        get_config(temp_project_with_config)
+        get_config(temp_project_with_config)
+        assert len(calls) == 1
+
+    def test_edit_invalidates_cache(self, temp_project_with_config):
+        assert get_config(temp_project_with_config).project_name == "test-project"
+        config_path = temp_project_with_config / "ghost.toml"
+        config_path.write_text('[project]\nname = "renamed-project"\n')
+        assert get_config(temp_project_with_config).project_name == "renamed-project"
+
+    def test_callers_get_independent_copies(self, temp_project_with_config):
+        first = get_config(temp_project_with_config)
+        first.ai.model = "mutated"
+        assert get_config(temp_project_with_config).ai.model == "llama3.2"
+
+    def test_env_overrides_apply_on_cache_hit(self, temp_project_with_config, monkeypatch):
+        get_config(temp_project_with_config)
+        monkeypatch.setenv("GHOST_TEMPERATURE", "0.7")
+        assert get_config(temp_project_with_config).ai.temperature == 0.7
+
+    def test_unchanged_dotenv_is_loaded_once(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("GHOST_TEST_DOTENV", "unset")
+        env_file = tmp_path / ".env"
+        env_file.write_text("GHOST_TEST_DOTENV=first\n")
+
+        assert load_project_env(env_file) is True
+        assert os.environ["GHOST_TEST_DOTENV"] == "first"
+        assert load_project_env(env_file) is False
+
+        env_file.write_text("GHOST_TEST_DOTENV=second\n")
+        st = os.stat(env_file)
+        os.utime(env_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        assert load_project_env(env_file) is True
+        assert os.environ["GHOST_TEST_DOTENV"] == "second"
+
+    def test_missing_dotenv_is_skipped(self, tmp_path):
+        assert load_project_env(tmp_path / ".env") is False
+
+    def test_find_project_root_revalidates_cached_root(self, temp_project_with_config):
+        nested = temp_project_with_config / "pkg"
+        nested.mkdir()
+        assert find_project_root(nested) == temp_project_with_config.resolve()
+        (temp_project_with_config / "ghost.toml").unlink()
+        assert find_project_root(nested) != temp_project_with_config.resolve()
+
+
+class TestGetApiKey:
+    @pytest.fixture(autouse=True)
+    def clean_env(self, monkeypatch):
+        for key in (
+            "GROQ_API_KEY",
+            "GROQ_API_KEY3",
+            "OPENAI_API_KEY",
+            "ANTHROPIC_API_KEY",
+            "OPENROUTER_API_KEY",
+        ):
+            monkeypatch.delenv(key, raising=False)
+
+    def test_provider_specific_key(self, monkeypatch):
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-openai")
+        monkeypatch.setenv("GROQ_API_KEY", "gsk-groq")
+        assert get_api_key("openai") == "sk-openai"
+
+    def test_legacy_groq_key(self, monkeypatch):
+        monkeypatch.setenv("GROQ_API_KEY3", "legacy")
+        assert get_api_key("GROQ") == "legacy"
+
+    def test_falls_back_to_any_key(self, monkeypatch):
+        monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-ant")
+        assert get_api_key("openai") == "sk-ant"
+        assert get_api_key() == "sk-ant"
+
+    def test_none_when_unset(self):
+        assert get_api_key("groq") is None
@@ -0,0 +1,42 @@
+import io
+import sys
+
+from ghost.console import Console
+
+
+class _CountingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+
+class TestBuffered:
+    def test_emits_block_in_one_write(self, monkeypatch):
+        stream = _CountingStream()
+        monkeypatch.setattr(sys, "stdout", stream)
+
+        with Console.buffered():
+            Console.print("one")
+            Console.section("Two")
+            Console.newline()
+
+        assert stream.writes == 1
+        assert stream.getvalue().startswith("one\n")
+        assert "Two" in stream.getvalue()
+
+    def test_flushes_output_on_error(self, monkeypatch):
+        stream = _CountingStream()
+        monkeypatch.setattr(sys, "stdout", stream)
+
+        try:
+            with Console.buffered():
+                Console.print("before error")
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        assert stream.getvalue() == "before error\n"
@@ -1,6 +1,21 @@
 import ast
+import json
+import os
 
-from ghost.init import CodeAnalyzer, add_parent_links, analyze_file
+import pytest
+
+import ghost.init
+from ghost.init import (
+    CodeAnalyzer,
+    analyze_file,
+    get_toml,
+    ghost_init,
+    iter_python_files,
+    preload_context,
+    walk_and_delete_json,
+    walk_and_generate_json,
+    walk_and_modify_json,
+)
 
 
 class TestCodeAnalyzer:
@@ -20,7 +35,6 @@ def bar(x, y):
     return x + y
 """
         tree = ast.parse(source)
-        add_parent_links(tree)
         analyzer = CodeAnalyzer()
         analyzer.visit(tree)
         assert "foo()" in analyzer.functions
@@ -34,7 +48,6 @@ def outer():
     return inner
 """
         tree = ast.parse(source)
-        add_parent_links(tree)
         analyzer = CodeAnalyzer()
         analyzer.visit(tree)
         assert "outer()" in analyzer.functions
@@ -50,7 +63,6 @@ class MyClass:
         pass
 """
         tree = ast.parse(source)
-        add_parent_links(tree)
         analyzer = CodeAnalyzer()
         analyzer.visit(tree)
         assert "MyClass" in analyzer.classes
@@ -63,12 +75,18 @@ class Empty:
     pass
 """
         tree = ast.parse(source)
-        add_parent_links(tree)
         analyzer = CodeAnalyzer()
         analyzer.visit(tree)
         assert "Empty" in analyzer.classes
         assert analyzer.classes["Empty"] == []
 
+    def test_ignores_functions_inside_classes(self):
+        tree = ast.parse("class A:\n    def method(self):\n        pass\n")
+        analyzer = CodeAnalyzer()
+        analyzer.visit(tree)
+        assert analyzer.functions == []
+        assert analyzer.classes == {"A": ["method"]}
+
 
 class TestAnalyzeFile:
     def test_analyzes_valid_python(self, tmp_path):
@@ -92,3 +110,170 @@ class Handler:
         py_file.write_text("def foo(:\n    pass\n")
         result = analyze_file(str(py_file))
         assert result is None
+
+    def test_reuses_result_until_file_changes(self, tmp_path, monkeypatch):
+        py_file = tmp_path / "module.py"
+        py_file.write_text("def one():\n    pass\n")
+        parses = []
+        real_parse = ast.parse
+        monkeypatch.setattr(ast, "parse", lambda src: parses.append(src) or real_parse(src))
+
+        assert analyze_file(str(py_file)) == (["one()"], {})
+        assert analyze_file(str(py_file)) == (["one()"], {})
+        assert len(parses) == 1
+
+        py_file.write_text("def two(x):\n    pass\n")
+        st = os.stat(py_file)
+        os.utime(py_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        assert analyze_file(str(py_file)) == (["two(x)"], {})
+
+
+class TestIterPythonFiles:
+    def test_matches_os_walk_and_prunes_ignored(self, tmp_path):
+        for rel in ("a.py", "pkg/b.py", "pkg/sub/c.py", "venv/d.py", "pkg/setup.py", "notes.txt"):
+            path = tmp_path / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text("")
+
+        found = list(iter_python_files(str(tmp_path), ["venv"], ["setup.py"]))
+
+        expected = []
+        for root, dirs, files in os.walk(tmp_path):
+            dirs[:] = [d for d in dirs if d != "venv"]
+            expected += [
+                (f, os.path.join(root, f)) for f in files if f.endswith(".py") and f != "setup.py"
+            ]
+        assert found == expected
+        assert sorted(name for name, _ in found) == ["a.py", "b.py", "c.py"]
+
+
+class TestWalkAndGenerateJson:
+    def test_skips_files_with_syntax_errors(self, temp_project_with_config):
+        (temp_project_with_config / "good.py").write_text("def ok(x):\n    return x\n")
+        (temp_project_with_config / "bad.py").write_text("def broken(:\n")
+
+        result = walk_and_generate_json(str(temp_project_with_config))
+
+        assert result == {"good.py": "Functions: ok(x); Classes: None"}
+
+    def test_explicit_ignore_lists_skip_toml(self, temp_project):
+        (temp_project / "app.py").write_text("def run():\n    pass\n")
+        (temp_project / "setup.py").write_text("def setup():\n    pass\n")
+
+        result = walk_and_generate_json(
+            str(temp_project), ignore_dirs=(), ignore_files=("setup.py",)
+        )
+
+        assert list(result) == ["app.py"]
+
+    def test_process_pool_matches_sequential_scan(self, temp_project, monkeypatch):
+        for i in range(6):
+            (temp_project / f"mod{i}.py").write_text(f"def f{i}(a, b):\n    pass\n")
+        (temp_project / "bad.py").write_text("def broken(:\n")
+
+        sequential = walk_and_generate_json(str(temp_project), ignore_dirs=(), ignore_files=())
+        monkeypatch.setattr(ghost.init, "PARALLEL_MIN_FILES", 1)
+        monkeypatch.setattr(ghost.init.os, "cpu_count", lambda: 2)
+        parallel = walk_and_generate_json(str(temp_project), ignore_dirs=(), ignore_files=())
+
+        assert parallel == sequential
+        assert list(parallel) == list(sequential)
+        assert parallel["mod3.py"] == "Functions: f3(a, b); Classes: None"
+
+
+class TestWalkAndModifyJson:
+    @pytest.fixture
+    def project(self, temp_project_with_config):
+        (temp_project_with_config / "a.py").write_text("def a():\n    pass\n")
+        (temp_project_with_config / "b.py").write_text("def b():\n    pass\n")
+        walk_and_generate_json(str(temp_project_with_config))
+        return temp_project_with_config
+
+    def _context(self, project):
+        return json.loads((project / ".ghost" / "context.json").read_text())
+
+    def test_updates_only_the_modified_entry(self, project):
+        (project / "a.py").write_text("def a2(x):\n    pass\n")
+
+        result = walk_and_modify_json(str(project), str(project / "a.py"), "a.py")
+
+        assert result == {"a.py": "Functions: a2(x); Classes: None"}
+        assert self._context(project) == {
+            "a.py": "Functions: a2(x); Classes: None",
+            "b.py": "Functions: b(); Classes: None",
+        }
+
+    def test_uses_supplied_source_without_reading(self, project):
+        source = b"def from_buffer(y):\n    pass\n"
+
+        result = walk_and_modify_json(str(project), str(project / "missing.py"), "a.py", source)
+
+        assert result == {"a.py": "Functions: from_buffer(y); Classes: None"}
+
+    def test_file_without_definitions_is_dropped(self, project):
+        (project / "a.py").write_text("X = 1\n")
+
+        assert walk_and_modify_json(str(project), str(project / "a.py"), "a.py") is None
+        assert list(self._context(project)) == ["b.py"]
+
+    def test_ignored_file_returns_none(self, project):
+        # temp_project_with_config lists setup.py under scanner.ignore_files
+        (project / "setup.py").write_text("def setup():\n    pass\n")
+
+        assert walk_and_modify_json(str(project), str(project / "setup.py"), "setup.py") is None
+        assert "setup.py" not in self._context(project)
+
+    def test_picks_up_external_rewrites(self, project):
+        context = project / ".ghost" / "context.json"
+        context.write_text(json.dumps({"c.py": "Functions: c(); Classes: None"}))
+        st = os.stat(context)
+        os.utime(context, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+        walk_and_modify_json(str(project), str(project / "a.py"), "a.py")
+
+        assert set(self._context(project)) == {"a.py", "c.py"}
+
+    def test_writes_are_atomic_replacements(self, project):
+        context = project / ".ghost" / "context.json"
+        inode = os.stat(context).st_ino
+        (project / "a.py").write_text("def a3():\n    pass\n")
+
+        walk_and_modify_json(str(project), str(project / "a.py"), "a.py")
+
+        assert os.stat(context).st_ino != inode
+        assert not list((project / ".ghost").glob("*.tmp"))
+
+    def test_preload_context_tolerates_missing_file(self, tmp_path):
+        preload_context(str(tmp_path))
+
+    def test_delete_removes_entry(self, project):
+        assert walk_and_delete_json(str(project), "a.py") is True
+        assert walk_and_delete_json(str(project), "a.py") is False
+        assert list(self._context(project)) == ["b.py"]
+
+
+class TestGetToml:
+    def test_reuses_parse_until_file_changes(self, tmp_path):
+        config = tmp_path / "ghost.toml"
+        config.write_text('[tests]\nframework = "pytest"\n')
+        first = get_toml(str(tmp_path))
+        assert get_toml(str(tmp_path)) is first
+
+        config.write_text('[tests]\nframework = "unittest"\n')
+        st = os.stat(config)
+        os.utime(config, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        assert get_toml(str(tmp_path))["tests"]["framework"] == "unittest"
+
+
+class TestGhostInit:
+    def test_reinit_leaves_unchanged_config_alone(self, tmp_path):
+        (tmp_path / "app.py").write_text("def run():\n    pass\n")
+        ghost_init(str(tmp_path))
+        config = tmp_path / "ghost.toml"
+        first = os.stat(config).st_mtime_ns
+
+        ghost_init(str(tmp_path))
+
+        assert os.stat(config).st_mtime_ns == first
+        assert get_toml(str(tmp_path))["project"]["name"] == "my-app"
+        assert "app.py" in json.loads((tmp_path / ".ghost" / "context.json").read_text())
@@ -1,3 +1,4 @@
+import threading
 import time
 
 from ghost.job_queue import JobQueue, JobState
@@ -77,6 +78,75 @@ class TestJobQueue:
 
         assert not queue._running
 
+    def test_path_already_queued_runs_once(self):
+        results = []
+        release = threading.Event()
+        queue = JobQueue(debounce_seconds=0.05, max_workers=1)
+        queue.start()
+
+        def slow(path):
+            release.wait(2.0)
+            results.append(path)
+
+        def callback(path):
+            results.append(path)
+
+        queue.submit("/test/slow.py", slow)
+        time.sleep(0.2)
+        # Both debounced events for b.py land while the worker is busy
+        queue.submit("/test/b.py", callback)
+        time.sleep(0.2)
+        queue.submit("/test/b.py", callback)
+        time.sleep(0.2)
+        release.set()
+        time.sleep(0.3)
+        queue.stop()
+
+        assert results == ["/test/slow.py", "/test/b.py"]
+
+    def test_same_path_never_runs_concurrently(self):
+        running = set()
+        overlaps = []
+        runs = []
+        queue = JobQueue(debounce_seconds=0.02, max_workers=3)
+        queue.start()
+
+        def callback(path):
+            if path in running:
+                overlaps.append(path)
+            running.add(path)
+            time.sleep(0.15)
+            running.discard(path)
+            runs.append(path)
+
+        queue.submit("/test/a.py", callback)
+        time.sleep(0.06)
+        queue.submit("/test/a.py", callback)
+        queue.submit("/test/b.py", callback)
+        time.sleep(0.6)
+        queue.stop()
+
+        assert overlaps == []
+        assert sorted(runs) == ["/test/a.py", "/test/a.py", "/test/b.py"]
+
+    def test_max_wait_releases_continuously_edited_path(self):
+        results = []
+        queue = JobQueue(debounce_seconds=0.2, max_workers=1, max_wait_seconds=0.3)
+        queue.start()
+
+        def callback(path):
+            results.append(time.monotonic())
+
+        start = time.monotonic()
+        # Saves every 0.1s never leave a 0.2s quiet period
+        for _ in range(8):
+            queue.submit("/test/file.py", callback)
+            time.sleep(0.1)
+        queue.stop()
+
+        assert results
+        assert results[0] - start < 0.6
+
 
 class TestJobState:
     def test_enum_values(self):
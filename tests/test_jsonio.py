@@ -0,0 +1,34 @@
+import json
+
+import ghost.jsonio
+from ghost.jsonio import dump_bytes, dumps_indented, loads
+
+
+class TestDumpsIndented:
+    def test_roundtrips(self):
+        data = {"app.py": "Functions: main()", "utils.py": "Classes: None"}
+        assert json.loads(dumps_indented(data)) == data
+
+    def test_uses_two_space_indent(self):
+        assert dumps_indented({"a": 1}) == '{\n  "a": 1\n}'
+
+    def test_keeps_unicode(self):
+        assert "é" in dumps_indented({"name": "café"})
+
+
+class TestDumpBytes:
+    def test_matches_text_form(self):
+        data = {"name": "café", "items": [1, 2]}
+        assert dump_bytes(data) == dumps_indented(data).encode("utf-8")
+
+    def test_stdlib_fallback_is_equivalent(self, monkeypatch):
+        data = {"name": "café", "items": [1, 2]}
+        expected = dump_bytes(data)
+        monkeypatch.setattr(ghost.jsonio, "orjson", None)
+        assert dump_bytes(data) == expected
+
+
+class TestLoads:
+    def test_accepts_bytes_and_text(self):
+        assert loads(b'{"a": 1}') == {"a": 1}
+        assert loads('{"a": 1}') == {"a": 1}
@@ -0,0 +1,183 @@
+import json
+import os
+import time
+
+from ghost.chat import TestGenerator
+from ghost.config import GhostConfig
+from ghost.llm_cache import ResponseCache, source_fingerprint
+
+
+class TestResponseCache:
+    def test_key_is_deterministic(self):
+        messages = [{"role": "user", "content": "hi"}]
+        assert ResponseCache.make_key("m", messages, 0.1) == ResponseCache.make_key(
+            "m", messages, 0.1
+        )
+
+    def test_key_depends_on_model_and_messages(self):
+        messages = [{"role": "user", "content": "hi"}]
+        key = ResponseCache.make_key("m", messages, 0.1)
+        assert key != ResponseCache.make_key("other", messages, 0.1)
+        assert key != ResponseCache.make_key("m", [{"role": "user", "content": "yo"}], 0.1)
+
+    def test_key_depends_on_provider(self):
+        messages = [{"role": "user", "content": "hi"}]
+        assert ResponseCache.make_key("m", messages, 0.1, provider="ollama") != (
+            ResponseCache.make_key("m", messages, 0.1, provider="lmstudio")
+        )
+
+    def test_key_depends_on_max_tokens(self):
+        messages = [{"role": "user", "content": "hi"}]
+        assert ResponseCache.make_key("m", messages, 0.0, max_tokens=16) != (
+            ResponseCache.make_key("m", messages, 0.0)
+        )
+
+    def test_miss_returns_none(self, tmp_path):
+        cache = ResponseCache(tmp_path)
+        assert cache.get("missing") is None
+
+    def test_roundtrip(self, tmp_path):
+        cache = ResponseCache.for_project(tmp_path)
+        cache.set("abc", "print('hi')")
+        assert cache.get("abc") == "print('hi')"
+        assert (tmp_path / ".ghost" / "llm_cache" / "abc.txt").exists()
+
+    def test_expired_entry_is_a_miss(self, tmp_path):
+        cache = ResponseCache(tmp_path, ttl=60)
+        cache.set("old", "stale")
+        past = time.time() - 120
+        os.utime(tmp_path / "old.txt", (past, past))
+        assert cache.get("old") is None
+        assert ResponseCache(tmp_path, ttl=None).get("old") == "stale"
+
+    def test_stats_count_hits_and_misses(self, tmp_path):
+        cache = ResponseCache(tmp_path)
+        cache.get("a")
+        cache.set("a", "x")
+        cache.get("a")
+        cache.get("a")
+        assert cache.stats() == {"hits": 2, "misses": 1}
+
+        cache.flush_stats()
+        assert json.loads((tmp_path / "stats.json").read_text()) == {"hits": 2, "misses": 1}
+        assert ResponseCache(tmp_path).stats() == {"hits": 2, "misses": 1}
+
+    def test_stats_are_not_rewritten_on_every_set(self, tmp_path):
+        cache = ResponseCache(tmp_path)
+        cache.get("a")
+        cache.set("a", "x")
+        cache.get("b")
+        cache.set("b", "y")
+
+        # The first write flushed; the second falls inside the flush interval
+        assert json.loads((tmp_path / "stats.json").read_text()) == {"hits": 0, "misses": 1}
+        assert cache.stats() == {"hits": 0, "misses": 2}
+
+    def test_source_key_depends_on_prompt_version(self):
+        args = ("m", "pytest", "a.py", "x = 1\n")
+        assert ResponseCache.make_source_key(*args, prompt_version="v1") != (
+            ResponseCache.make_source_key(*args, prompt_version="v2")
+        )
+
+    def test_high_temperature_not_cacheable(self):
+        assert ResponseCache.is_cacheable(0.1) is True
+        assert ResponseCache.is_cacheable(0.7) is False
+
+
+class _CountingProvider:
+    def __init__(self):
+        self.calls = 0
+
+    def chat(self, messages, model, temperature=0.1, max_tokens=None):
+        self.calls += 1
+        return "FIX_TEST"
+
+
+class TestCallApiCache:
+    def test_repeated_call_hits_cache(self, tmp_path):
+        generator = TestGenerator(config=GhostConfig())
+        provider = _CountingProvider()
+        generator._provider = provider
+        messages = [{"role": "user", "content": "judge this"}]
+
+        first = generator._call_api(messages, source_path=str(tmp_path))
+        second = generator._call_api(messages, source_path=str(tmp_path))
+
+        assert first == second == "FIX_TEST"
+        assert provider.calls == 1
+
+    def test_cache_disabled(self, tmp_path):
+        config = GhostConfig()
+        config.ai.cache = False
+        generator = TestGenerator(config=config)
+        provider = _CountingProvider()
+        generator._provider = provider
+        messages = [{"role": "user", "content": "judge this"}]
+
+        generator._call_api(messages, source_path=str(tmp_path))
+        generator._call_api(messages, source_path=str(tmp_path))
+
+        assert provider.calls == 2
+
+    def test_configured_ttl_expires_entries(self, tmp_path):
+        config = GhostConfig()
+        config.ai.cache_ttl_seconds = 60
+        generator = TestGenerator(config=config)
+        provider = _CountingProvider()
+        generator._provider = provider
+        messages = [{"role": "user", "content": "judge this"}]
+
+        generator._call_api(messages, source_path=str(tmp_path))
+        for entry in (tmp_path / ".ghost" / "llm_cache").glob("*.txt"):
+            os.utime(entry, (0, 0))
+        generator._call_api(messages, source_path=str(tmp_path))
+
+        assert provider.calls == 2
+
+
+class TestSourceFingerprint:
+    def test_ignores_formatting_and_comments(self):
+        a = "def add(a, b):\n    return a + b\n"
+        b = "# helper\ndef add(a,  b):\n\n    return a + b  # sum\n"
+        assert source_fingerprint(a) == source_fingerprint(b)
+
+    def test_detects_logic_change(self):
+        a = "def add(a, b):\n    return a + b\n"
+        b = "def add(a, b):\n    return a - b\n"
+        assert source_fingerprint(a) != source_fingerprint(b)
+
+    def test_ignores_docstrings_and_local_names(self):
+        a = 'def area(w, h):\n    """Area."""\n    result = w * h\n    return result\n'
+        b = "def area(w, h):\n    out = w * h\n    return out\n"
+        assert source_fingerprint(a) == source_fingerprint(b)
+
+    def test_parameter_and_global_names_matter(self):
+        base = "def area(w, h):\n    return w * h\n"
+        assert source_fingerprint(base) != source_fingerprint(
+            "def area(width, h):\n    return width * h\n"
+        )
+        a = "def bump():\n    global count\n    count = 1\n"
+        b = "def bump():\n    global total\n    total = 1\n"
+        assert source_fingerprint(a) != source_fingerprint(b)
+
+    def test_local_renames_stay_consistent(self):
+        # Swapping which local feeds the result is a logic change
+        a = "def f(v):\n    x = v\n    y = 0\n    return x\n"
+        b = "def f(v):\n    x = v\n    y = 0\n    return y\n"
+        assert source_fingerprint(a) != source_fingerprint(b)
+
+    def test_invalid_source_falls_back_to_text(self):
+        assert source_fingerprint("def broken(:") == source_fingerprint("def  broken(:")
+
+
+class TestSourceKeyCache:
+    def test_cosmetic_edit_reuses_generated_tests(self, tmp_path):
+        generator = TestGenerator(config=GhostConfig())
+        provider = _CountingProvider()
+        generator._provider = provider
+        generator.create_prompt = lambda source_code, source_path, filename: "prompt"
+
+        generator.get_test_code("x = 1\n", str(tmp_path), "app.py")
+        generator.get_test_code("x = 1  # tweak\n", str(tmp_path), "app.py")
+
+        assert provider.calls == 1
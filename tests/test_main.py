@@ -1,4 +1,22 @@
-from ghost.main import CheckPath, ReadFile, getFileNameFromPath
+import threading
+import time
+
+import pytest
+from watchdog.events import DirMovedEvent, FileModifiedEvent
+
+import ghost.init
+import ghost.main
+from ghost.main import (
+    MAX_SOURCE_BYTES,
+    CheckPath,
+    ReadFile,
+    ReadSource,
+    WriteTest,
+    getFileNameFromPath,
+    schedule_project_watches,
+    unwatch_top_level_dir,
+    watch_new_top_level_dir,
+)
 
 
 class TestGetFileNameFromPath:
@@ -53,6 +71,18 @@ class TestCheckPath:
         # This is handled in on_modified separately, but CheckPath doesn't reject pycache
         assert CheckPath("module.py", "/project/__pycache__/module.py") is True
 
+    def test_rejects_compiled_and_backup_names(self):
+        assert CheckPath("module.pyc") is False
+        assert CheckPath("module.py~") is False
+        assert CheckPath("module.py.bak") is False
+        assert CheckPath("module.pyi") is False
+
+    def test_tmp_in_directory_is_allowed(self):
+        assert CheckPath("app.py", "/tmp/project/app.py") is True
+
+    def test_windows_tests_directory(self):
+        assert CheckPath("utils.py", "C:\\project\\tests\\utils.py") is False
+
 
 class TestReadFile:
     def test_reads_existing_file(self, tmp_path):
@@ -72,3 +102,237 @@ class TestReadFile:
         result = ReadFile(str(test_file))
         assert result is not None
         assert "😊" in result
+
+
+class TestReadSource:
+    def test_reads_bytes(self, tmp_path):
+        f = tmp_path / "app.py"
+        f.write_bytes(b"x = 1\n")
+        assert ReadSource(str(f)) == b"x = 1\n"
+
+    def test_rejects_oversized_file(self, tmp_path):
+        f = tmp_path / "generated.py"
+        f.write_bytes(b"#" * (MAX_SOURCE_BYTES + 1))
+        with pytest.raises(ValueError, match="too large"):
+            ReadSource(str(f))
+
+    def test_missing_file_raises_oserror(self, tmp_path):
+        with pytest.raises(OSError):
+            ReadSource(str(tmp_path / "gone.py"))
+
+
+class _RecordingObserver:
+    def __init__(self):
+        self.watches = []
+
+    def schedule(self, handler, path, recursive):
+        self.watches.append((path, recursive))
+        return path
+
+    def unschedule(self, watch):
+        self.watches = [w for w in self.watches if w[0] != watch]
+
+
+class TestScheduleProjectWatches:
+    def test_skips_ignored_top_level_dirs(self, tmp_path):
+        for name in ("src", ".git", ".venv"):
+            (tmp_path / name).mkdir()
+        (tmp_path / "app.py").write_text("")
+        observer = _RecordingObserver()
+        watches = schedule_project_watches(observer, None, str(tmp_path), {".git", ".venv"})
+        assert sorted(observer.watches) == [
+            (str(tmp_path), False),
+            (str(tmp_path / "src"), True),
+        ]
+        assert list(watches) == [str(tmp_path / "src")]
+
+    def test_new_top_level_dir_is_watched(self, tmp_path):
+        observer = _RecordingObserver()
+        (tmp_path / "pkg" / "inner").mkdir(parents=True)
+        (tmp_path / "node_modules").mkdir()
+        watches = {}
+        for path in ("pkg", "pkg/inner", "node_modules", "pkg"):
+            watch_new_top_level_dir(
+                observer, None, str(tmp_path / path), str(tmp_path), {"node_modules"}, watches
+            )
+        # Nested dirs are already covered by their parent's recursive watch
+        assert observer.watches == [(str(tmp_path / "pkg"), True)]
+
+    def test_deleted_top_level_dir_is_unwatched(self, tmp_path):
+        (tmp_path / "pkg").mkdir()
+        observer = _RecordingObserver()
+        watches = schedule_project_watches(observer, None, str(tmp_path), set())
+        (tmp_path / "pkg").rmdir()
+        unwatch_top_level_dir(observer, str(tmp_path / "pkg"), watches)
+        unwatch_top_level_dir(observer, str(tmp_path / "pkg"), watches)
+        assert observer.watches == [(str(tmp_path), False)]
+        assert watches == {}
+
+
+class TestWriteTest:
+    def test_writes_into_tests_directory(self, tmp_path):
+        WriteTest(str(tmp_path / "pkg" / "app.py"), "def test_x():\n    pass\n", str(tmp_path))
+        written = tmp_path / "tests" / "test_app.py"
+        assert written.read_text() == "def test_x():\n    pass\n"
+
+    def test_reuses_existing_tests_directory(self, tmp_path):
+        (tmp_path / "tests").mkdir()
+        WriteTest("app.py", "# generated\n", str(tmp_path))
+        assert (tmp_path / "tests" / "test_app.py").read_text() == "# generated\n"
+
+
+class TestMakeTests:
+    def test_no_cosmetic_pauses(self, tmp_path, monkeypatch):
+        class _Generator:
+            def get_test_code(self, content, source_path, filename):
+                return "def test_ok():\n    pass\n"
+
+        checked = []
+        monkeypatch.setattr(ghost.main, "_generator", lambda source_path: _Generator())
+        monkeypatch.setattr(ghost.main, "check_test", lambda *args: checked.append(args))
+
+        start = time.monotonic()
+        ghost.main.make_tests(str(tmp_path / "app.py"), "x = 1\n", str(tmp_path), "app.py")
+
+        assert time.monotonic() - start < 1.0
+        assert (tmp_path / "tests" / "test_app.py").exists()
+        assert len(checked) == 1
+
+
+@pytest.fixture
+def watched_project(tmp_path, monkeypatch):
+    """
+    A project with one source file, watched through a fake observer.
+
+    Returns (source, watch). ``watch(done)`` runs start_watching, fires one
+    modify event for the source (or *path*; or dispatches *event*, after
+    calling *before_event*) and stops watching once *done* is set. It returns
+    the paths still being watched.
+    setup.py is listed in scanner.ignore_files.
+    """
+    (tmp_path / ".ghost").mkdir()
+    (tmp_path / "ghost.toml").write_text(
+        '[scanner]\nignore_files = ["setup.py"]\n\n[watcher]\ndebounce_seconds = 0.05\n'
+    )
+    source = tmp_path / "app.py"
+    source.write_text("def run():\n    pass\n")
+    ghost.init.walk_and_generate_json(str(tmp_path), ignore_dirs=(), ignore_files=())
+
+    def watch(done, after_event=lambda: None, path=source, event=None, before_event=None):
+        watched = []
+
+        class _Observer:
+            fired = False
+
+            def schedule(self, handler, path, recursive):
+                self.handler = handler
+                watched.append(path)
+                return path
+
+            def unschedule(self, watch):
+                watched.remove(watch)
+
+            def start(self):
+                pass
+
+            def is_alive(self):
+                return True
+
+            def join(self, timeout=None):
+                # Later joins come from start_watching's shutdown path
+                if self.fired:
+                    return
+                # An unbounded join can't be interrupted on Windows
+                assert timeout is not None
+                self.fired = True
+                if before_event is not None:
+                    before_event()
+                self.handler.dispatch(event or FileModifiedEvent(str(path)))
+                after_event()
+                assert done.wait(timeout=10)
+                raise KeyboardInterrupt
+
+            def stop(self):
+                pass
+
+        monkeypatch.setattr(ghost.main, "Observer", _Observer)
+        with pytest.raises(KeyboardInterrupt):
+            ghost.main.start_watching(str(tmp_path))
+        return watched
+
+    return source, watch
+
+
+class TestStartWatching:
+    def test_modify_event_generates_tests_once(self, watched_project, monkeypatch):
+        source, watch = watched_project
+        done = threading.Event()
+        calls = []
+
+        def _make_tests(*args):
+            calls.append(args)
+            done.set()
+
+        monkeypatch.setattr(ghost.main, "make_tests", _make_tests)
+        watch(done)
+
+        assert len(calls) == 1
+        assert calls[0][0] == str(source)
+
+    def test_source_is_read_off_the_event_thread(self, watched_project, monkeypatch):
+        _, watch = watched_project
+        done = threading.Event()
+        read_on = []
+        real_read = ghost.main.ReadSource
+
+        def _read(path):
+            read_on.append(threading.current_thread())
+            done.set()
+            return real_read(path)
+
+        monkeypatch.setattr(ghost.main, "make_tests", lambda *args: None)
+        monkeypatch.setattr(ghost.main, "ReadSource", _read)
+
+        def _nothing_read_yet():
+            # The event callback only queues the job; the disk read comes later
+            assert read_on == []
+
+        watch(done, after_event=_nothing_read_yet)
+
+        assert len(read_on) == 1
+        assert read_on[0] is not threading.current_thread()
+
+    def test_ignored_file_generates_no_tests(self, watched_project, tmp_path, monkeypatch):
+        _, watch = watched_project
+        ignored = tmp_path / "setup.py"
+        ignored.write_text("def setup():\n    pass\n")
+        done = threading.Event()
+        calls = []
+        real_modify = ghost.init.walk_and_modify_json
+
+        def _modify(*args, **kwargs):
+            try:
+                return real_modify(*args, **kwargs)
+            finally:
+                done.set()
+
+        monkeypatch.setattr(ghost.init, "walk_and_modify_json", _modify)
+        monkeypatch.setattr(ghost.main, "make_tests", lambda *args: calls.append(args))
+        watch(done, path=ignored)
+
+        assert calls == []
+
+    def test_moved_top_level_dir_is_watched_at_its_new_path(self, watched_project, tmp_path):
+        _, watch = watched_project
+        (tmp_path / "old").mkdir()
+        done = threading.Event()
+        done.set()
+
+        watched = watch(
+            done,
+            before_event=lambda: (tmp_path / "old").rename(tmp_path / "new"),
+            event=DirMovedEvent(str(tmp_path / "old"), str(tmp_path / "new")),
+        )
+
+        assert str(tmp_path / "new") in watched
+        assert str(tmp_path / "old") not in watched
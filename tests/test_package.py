@@ -0,0 +1,31 @@
+import subprocess
+import sys
+
+import pytest
+
+import ghost
+
+
+class TestLazyExports:
+    def test_public_names_resolve(self):
+        from ghost.config import GhostConfig
+        from ghost.job_queue import JobQueue
+
+        assert ghost.GhostConfig is GhostConfig
+        assert ghost.JobQueue is JobQueue
+        assert set(ghost.__all__) <= set(dir(ghost))
+
+    def test_unknown_attribute_raises(self):
+        with pytest.raises(AttributeError):
+            ghost.does_not_exist
+
+    def test_cli_import_skips_heavy_modules(self):
+        code = (
+            "import sys, ghost.cli; "
+            "print(sorted(m for m in ('ghost.providers', 'ghost.config', 'ghost.job_queue') "
+            "if m in sys.modules))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+        assert result.stdout.strip() == "[]"
@@ -1,8 +1,22 @@
+import logging
+import threading
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from ghost import providers
 from ghost.providers import (
+    GenerationCancelled,
     ModelConfig,
+    OllamaProvider,
     ProviderType,
+    _collect_stream,
+    _probe_local_server,
+    _to_anthropic_messages,
     get_provider,
     list_available_providers,
+    run_cancellable,
 )
 
 
@@ -58,8 +72,6 @@ class TestGetProvider:
         assert provider.__class__.__name__ == "CustomProvider"
 
     def test_unknown_provider_raises(self):
-        import pytest
-
         with pytest.raises(ValueError, match="Unknown provider"):
             get_provider("nonexistent")
 
@@ -83,3 +95,205 @@ class TestListAvailableProviders:
         status = list_available_providers()
         for key, value in status.items():
             assert isinstance(value, bool), f"{key} is not bool"
+
+
+class _Delta:
+    def __init__(self, content):
+        self.content = content
+
+
+class _Choice:
+    def __init__(self, content):
+        self.delta = _Delta(content)
+
+
+class _Chunk:
+    def __init__(self, content):
+        self.choices = [_Choice(content)]
+
+
+class _FakeStream:
+    def __init__(self, pieces):
+        self._pieces = pieces
+        self.consumed = 0
+        self.closed = False
+
+    def __iter__(self):
+        for piece in self._pieces:
+            self.consumed += 1
+            yield _Chunk(piece)
+
+    def close(self):
+        self.closed = True
+
+
+class TestToAnthropicMessages:
+    def test_marks_shared_prefix_for_caching(self):
+        system, messages = _to_anthropic_messages(
+            [
+                {"role": "system", "content": "rules"},
+                {"role": "user", "content": "project context"},
+                {"role": "user", "content": "TARGET: app.py"},
+            ]
+        )
+
+        assert system == [{"type": "text", "text": "rules", "cache_control": {"type": "ephemeral"}}]
+        assert messages == [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": "project context",
+                        "cache_control": {"type": "ephemeral"},
+                    },
+                    {"type": "text", "text": "TARGET: app.py"},
+                ],
+            }
+        ]
+
+
+class TestAnthropicStreaming:
+    def test_stops_reading_after_code_block(self):
+        read = []
+
+        class _Stream:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                self.closed = True
+
+            @property
+            def text_stream(self):
+                for piece in ["```python\n", "x = 1\n", "```", "\nAnd some prose"]:
+                    read.append(piece)
+                    yield piece
+
+        stream = _Stream()
+
+        class _Messages:
+            def stream(self, **request):
+                assert request["system"][0]["text"] == "rules"
+                return stream
+
+        provider = get_provider("anthropic", api_key="test-key")
+        provider._client = type("_Client", (), {"messages": _Messages()})()
+
+        text = provider.chat(
+            [{"role": "system", "content": "rules"}, {"role": "user", "content": "go"}],
+            model="claude",
+        )
+
+        assert text == "```python\nx = 1\n```"
+        assert len(read) == 3
+        assert stream.closed is True
+
+
+class TestStreamUsageLogging:
+    def test_reads_usage_chunk_when_debug_logging(self, caplog):
+        usage = SimpleNamespace(
+            prompt_tokens=100, prompt_tokens_details=SimpleNamespace(cached_tokens=80)
+        )
+        chunks = [_Chunk("```python\n"), _Chunk("x = 1\n"), _Chunk("```"), _Chunk("\nprose")]
+        chunks.append(SimpleNamespace(choices=[], usage=usage))
+        sent = []
+
+        def create(**request):
+            sent.append(request)
+            return iter(chunks)
+
+        provider = get_provider("openai", api_key="usage-key")
+        provider._client = SimpleNamespace(
+            chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+        )
+
+        with caplog.at_level(logging.DEBUG):
+            text = provider.chat([{"role": "user", "content": "go"}], model="gpt")
+
+        assert text == "```python\nx = 1\n```\nprose"
+        assert sent[0]["stream_options"] == {"include_usage": True}
+        assert "80/100 prompt tokens cached" in caplog.text
+
+
+class TestCollectStream:
+    def test_joins_deltas(self):
+        stream = _FakeStream(["import ", "pytest", None, "\n"])
+        assert _collect_stream(stream) == "import pytest\n"
+        assert stream.closed is False
+
+    def test_stops_after_closing_fence(self):
+        stream = _FakeStream(["```python\n", "x = 1\n", "```", "\nExplanation", " follows"])
+        assert _collect_stream(stream) == "```python\nx = 1\n```"
+        assert stream.closed is True
+        assert stream.consumed == 3
+
+    def test_cancel_drops_stream(self):
+        cancel = threading.Event()
+        cancel.set()
+        stream = _FakeStream(["```python\n", "x = 1\n", "```"])
+        with pytest.raises(GenerationCancelled):
+            run_cancellable(cancel, _collect_stream, stream)
+        assert stream.closed is True
+        assert stream.consumed == 1
+
+
+class TestSharedClient:
+    def test_providers_share_one_connection_pool(self):
+        openai_client = get_provider("openai", api_key="pool-key").client
+        groq_client = get_provider("groq", api_key="pool-key").client
+        assert openai_client._client is groq_client._client
+
+    def test_detects_fence_split_across_chunks(self):
+        stream = _FakeStream(["``", "`python\nx = 1\n`", "``", " trailing"])
+        assert _collect_stream(stream) == "```python\nx = 1\n```"
+        assert stream.closed is True
+
+    def test_inline_backticks_do_not_count_as_fence(self):
+        stream = _FakeStream(["use `x` and ", "``y``", " done"])
+        assert _collect_stream(stream) == "use `x` and ``y`` done"
+        assert stream.closed is False
+
+    def test_unfenced_code_with_backtick_literals_is_read_whole(self):
+        pieces = [
+            "def test_render():\n",
+            '    assert render("```py\\nx\\n```")\n',
+            '    doc = """\n```\nexample\n```\n"""\n',
+            "    assert doc\n",
+        ]
+        stream = _FakeStream(pieces)
+        assert _collect_stream(stream) == "".join(pieces)
+        assert stream.closed is False
+
+
+class TestLocalServerProbe:
+    def test_probe_runs_once_per_url(self, monkeypatch):
+        calls = []
+
+        def fake_get(url, timeout):
+            calls.append(url)
+            raise requests.ConnectionError("refused")
+
+        monkeypatch.setattr(requests, "get", fake_get)
+        _probe_local_server.cache_clear()
+        try:
+            provider = OllamaProvider(base_url="http://127.0.0.1:9")
+            assert provider.is_available() is False
+            assert provider.is_available() is False
+            assert calls == ["http://127.0.0.1:9/api/tags"]
+        finally:
+            _probe_local_server.cache_clear()
+
+    def test_local_servers_are_probed_concurrently(self, monkeypatch):
+        both_in_flight = threading.Barrier(2, timeout=10)
+
+        def overlapping_probe(url):
+            # Probing one server after the other would break the barrier
+            both_in_flight.wait()
+            return False
+
+        monkeypatch.setattr(providers, "_probe_local_server", overlapping_probe)
+
+        status = list_available_providers()
+
+        assert status["ollama"] is False and status["lmstudio"] is False
@@ -1,6 +1,7 @@
 import time
 
-from ghost.rate_limiter import RateLimiter
+from ghost import rate_limiter
+from ghost.rate_limiter import RateLimiter, estimate_tokens
 
 
 class TestRateLimiter:
@@ -8,6 +9,13 @@ class TestRateLimiter:
         RateLimiter.set_interval(0.01)
         assert RateLimiter.MIN_INTERVAL == 0.01
 
+    def test_set_interval_only_announces_changes(self, monkeypatch):
+        messages = []
+        monkeypatch.setattr(rate_limiter.Console, "info", messages.append)
+        RateLimiter.set_interval(0.02)
+        RateLimiter.set_interval(0.02)
+        assert len(messages) == 1
+
     def test_wait_allows_call_when_ready(self):
         RateLimiter.set_interval(0.01)
         start = time.time()
@@ -29,3 +37,115 @@ class TestRateLimiter:
         RateLimiter.wait()
         RateLimiter.wait()
         assert RateLimiter._last_call > 0
+
+
+class TestTokenBudget:
+    def setup_method(self):
+        RateLimiter.set_interval(0.0)
+        RateLimiter._token_log.clear()
+
+    def teardown_method(self):
+        RateLimiter.set_token_budget(0)
+        RateLimiter._token_log.clear()
+
+    def test_estimate_tokens(self):
+        messages = [{"role": "user", "content": "x" * 400}, {"role": "system", "content": ""}]
+        assert estimate_tokens(messages) == 100
+
+    def test_budget_disabled_does_not_track(self):
+        RateLimiter.set_token_budget(0)
+        RateLimiter.wait(1000)
+        assert len(RateLimiter._token_log) == 0
+
+    def test_waits_when_budget_exceeded(self, monkeypatch):
+        waits = []
+        monkeypatch.setattr(rate_limiter, "countdown", lambda seconds, msg: waits.append(seconds))
+        RateLimiter.set_token_budget(100)
+
+        RateLimiter.wait(60)
+        assert waits == []
+        RateLimiter.wait(60)
+        assert len(waits) == 1
+        assert 59.0 < waits[0] <= 60.0
+
+    def test_oversized_request_is_not_blocked_forever(self, monkeypatch):
+        waits = []
+        monkeypatch.setattr(rate_limiter, "countdown", lambda seconds, msg: waits.append(seconds))
+        RateLimiter.set_token_budget(10)
+        RateLimiter.wait(500)
+        assert waits == []
+
+
+class _RateLimitError(Exception):
+    def __init__(self, headers):
+        super().__init__("Error code: 429 - rate limit reached")
+        self.response = type("Response", (), {"headers": headers})()
+
+
+class TestRetryAfter:
+    def test_reads_retry_after_seconds(self):
+        assert rate_limiter.retry_after(_RateLimitError({"retry-after": "7"})) == 7.0
+
+    def test_prefers_millisecond_header(self):
+        error = _RateLimitError({"retry-after-ms": "1500", "retry-after": "2"})
+        assert rate_limiter.retry_after(error) == 1.5
+
+    def test_falls_back_to_reset_of_exhausted_budget(self):
+        error = _RateLimitError(
+            {
+                "x-ratelimit-remaining-requests": "12",
+                "x-ratelimit-reset-requests": "1m30.5s",
+                "x-ratelimit-remaining-tokens": "0",
+                "x-ratelimit-reset-tokens": "250ms",
+            }
+        )
+        assert rate_limiter.retry_after(error) == 0.25
+
+    def test_retry_after_wins_over_reset_headers(self):
+        error = _RateLimitError(
+            {
+                "retry-after": "3",
+                "x-ratelimit-remaining-requests": "0",
+                "x-ratelimit-reset-requests": "1m",
+            }
+        )
+        assert rate_limiter.retry_after(error) == 3.0
+
+    def test_no_hint_when_no_budget_is_exhausted(self):
+        error = _RateLimitError(
+            {"x-ratelimit-reset-requests": "1m30.5s", "x-ratelimit-reset-tokens": "250ms"}
+        )
+        assert rate_limiter.retry_after(error) is None
+
+    def test_no_hint_without_response(self):
+        assert rate_limiter.retry_after(ValueError("429")) is None
+
+
+class TestCallWithRetry:
+    def teardown_method(self):
+        RateLimiter._resume_at = 0.0
+
+    def test_waits_at_least_as_long_as_the_provider_asks(self, monkeypatch):
+        waits = []
+        monkeypatch.setattr(rate_limiter, "countdown", lambda seconds, msg: waits.append(seconds))
+        monkeypatch.setattr(rate_limiter.Console, "rate_limited", lambda *args: None)
+        calls = []
+
+        @rate_limiter.call_with_retry(max_retries=3, base_delay=0.01)
+        def flaky():
+            calls.append(1)
+            if len(calls) == 1:
+                raise _RateLimitError({"retry-after": "20"})
+            return "ok"
+
+        assert flaky() == "ok"
+        assert waits == [20.0]
+
+    def test_hint_pauses_other_callers(self, monkeypatch):
+        waits = []
+        monkeypatch.setattr(rate_limiter, "countdown", lambda seconds, msg: waits.append(seconds))
+        RateLimiter.set_interval(0.0)
+        RateLimiter.pause(30.0)
+        RateLimiter.wait()
+        assert len(waits) == 1
+        assert 29.0 < waits[0] <= 30.0
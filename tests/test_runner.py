@@ -1,4 +1,8 @@
-from ghost.runner import classify_error, get_project_tree
+import os
+
+import pytest
+
+from ghost.runner import classify_error, get_project_tree, run_test, run_test_cached
 
 
 class TestClassifyError:
@@ -71,3 +75,111 @@ class TestGetProjectTree:
         (tmp_path / "build/output.py").write_text("# built")
         result = get_project_tree(str(tmp_path), ignore_dirs={"build"})
         assert "build/" not in result
+
+    def test_nested_layout(self, tmp_path):
+        root = tmp_path / "proj"
+        (root / "pkg" / "sub").mkdir(parents=True)
+        (root / "app.py").write_text("")
+        (root / "pkg" / "mod.py").write_text("")
+        (root / "pkg" / "sub" / "deep.py").write_text("")
+        result = get_project_tree(str(root))
+        assert result == (
+            "PROJECT STRUCTURE:\n"
+            "proj/\n"
+            "    app.py\n"
+            "    pkg/\n"
+            "        mod.py\n"
+            "        sub/\n"
+            "            deep.py\n"
+        )
+
+    def test_repeat_call_reuses_cached_tree(self, tmp_path, monkeypatch):
+        (tmp_path / "app.py").write_text("")
+        first = get_project_tree(str(tmp_path))
+        monkeypatch.setattr(
+            "ghost.runner._append_tree", lambda *a: pytest.fail("tree was re-walked")
+        )
+        assert get_project_tree(str(tmp_path)) == first
+
+    def test_new_file_in_subdir_invalidates_cache(self, tmp_path):
+        (tmp_path / "pkg").mkdir()
+        assert "late.py" not in get_project_tree(str(tmp_path))
+        (tmp_path / "pkg" / "late.py").write_text("")
+        os.utime(tmp_path / "pkg", ns=(0, 0))
+        assert "late.py" in get_project_tree(str(tmp_path))
+
+
+class TestRunTest:
+    def test_runs_in_subprocess_without_cache_dir(self, tmp_path):
+        (tmp_path / "app.py").write_text("def one():\n    return 1\n")
+        test_file = tmp_path / "test_app.py"
+        test_file.write_text("from app import one\n\ndef test_one():\n    assert one() == 1\n")
+        return_code, stdout, _ = run_test(str(test_file), str(tmp_path))
+        assert return_code == 0
+        assert "1 passed" in stdout
+        assert not (tmp_path / ".pytest_cache").exists()
+
+
+class TestRunTestCached:
+    def _project(self, tmp_path):
+        source = tmp_path / "app.py"
+        source.write_text("def one():\n    return 1\n")
+        test_file = tmp_path / "tests" / "test_app.py"
+        test_file.parent.mkdir()
+        test_file.write_text("def test_one():\n    assert True\n")
+        return source, test_file
+
+    def test_unchanged_files_reuse_result(self, tmp_path, monkeypatch):
+        source, test_file = self._project(tmp_path)
+        runs = []
+        monkeypatch.setattr(
+            "ghost.runner.run_test", lambda *args: runs.append(args) or (1, "out", "err")
+        )
+        first = run_test_cached(str(test_file), str(tmp_path), str(source))
+        second = run_test_cached(str(test_file), str(tmp_path), str(source))
+        assert first == second == (1, "out", "err")
+        assert len(runs) == 1
+
+    def test_changed_source_reruns(self, tmp_path, monkeypatch):
+        source, test_file = self._project(tmp_path)
+        runs = []
+        monkeypatch.setattr("ghost.runner.run_test", lambda *args: runs.append(args) or (0, "", ""))
+        run_test_cached(str(test_file), str(tmp_path), str(source))
+        source.write_text("def one():\n    return 2\n")
+        run_test_cached(str(test_file), str(tmp_path), str(source))
+        assert len(runs) == 2
+
+    def test_changed_project_module_reruns(self, tmp_path, monkeypatch):
+        source, test_file = self._project(tmp_path)
+        helper = tmp_path / "helpers.py"
+        helper.write_text("VALUE = 1\n")
+        runs = []
+        monkeypatch.setattr("ghost.runner.run_test", lambda *args: runs.append(args) or (0, "", ""))
+        run_test_cached(str(test_file), str(tmp_path), str(source))
+        helper.write_text("VALUE = 2\n")
+        st = helper.stat()
+        os.utime(helper, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        run_test_cached(str(test_file), str(tmp_path), str(source))
+        assert len(runs) == 2
+
+    def test_results_are_stored_without_cache_stats(self, tmp_path, monkeypatch):
+        source, test_file = self._project(tmp_path)
+        monkeypatch.setattr("ghost.runner.run_test", lambda *args: (0, "out", ""))
+        run_test_cached(str(test_file), str(tmp_path), str(source))
+        stored = list((tmp_path / ".ghost" / "test_results").iterdir())
+        assert [p.suffix for p in stored] == [".json"]
+
+    def test_keeps_only_the_tail_of_long_output(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("ghost.runner.MAX_TEST_OUTPUT_BYTES", 2048)
+        test_file = tmp_path / "test_noisy.py"
+        test_file.write_text(
+            "def test_noisy():\n"
+            "    for i in range(2000):\n"
+            "        print('line', i)\n"
+            "    assert False\n"
+        )
+        return_code, stdout, _ = run_test(str(test_file), str(tmp_path))
+        assert return_code == 1
+        assert stdout.startswith("[... earlier output truncated ...]\n")
+        assert "1 failed" in stdout
+        assert len(stdout.encode()) <= 2048 + 64
@@ -0,0 +1,21 @@
+import io
+
+import pytest
+
+from ghost import tomlio
+
+
+class TestLoads:
+    def test_parses_tables(self):
+        data = tomlio.loads('[ai]\nprovider = "groq"\nrate_limit_rpm = 30\n')
+        assert data == {"ai": {"provider": "groq", "rate_limit_rpm": 30}}
+
+    def test_invalid_toml_raises_decode_error(self):
+        with pytest.raises(tomlio.DecodeError):
+            tomlio.loads("[ai\nprovider = ")
+
+
+class TestLoad:
+    def test_reads_binary_file(self):
+        fp = io.BytesIO('[project]\nname = "café"\n'.encode("utf-8"))
+        assert tomlio.load(fp) == {"project": {"name": "café"}}